@@ -1,18 +1,19 @@
 import sys
 from cravat import BaseAnnotator
 from cravat import InvalidData
-from pyliftover import LiftOver
 
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
 
+    # Columns of the row annotate_row takes
+    row_columns = ['Frequencies']
+
     def setup(self):
         pass
 
     def annotate(self, input_data, secondary_data=None):
-        out = {}
         input_chrom = input_data['chrom'].lower().replace('chr','')
         input_pos = input_data['pos']
         input_ref = input_data['ref_base']
@@ -20,7 +21,11 @@ class CravatAnnotator(BaseAnnotator):
         sql_q = 'SELECT Frequencies FROM abraom WHERE Chr="%s" AND Start=%s AND Ref="%s" and Alt="%s";' \
                 %(input_chrom, input_pos, input_ref, input_alt)
         self.cursor.execute(sql_q)
-        sql_q_result = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.cursor.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, sql_q_result):
+        out = {}
         if sql_q_result:
             out['allele_freq'] = sql_q_result[0]
             return out
@@ -1,16 +1,27 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the row annotate_row takes
+    row_columns = ['total']
+
+    def setup(self):
+        self.batch = get_module('sqlitebatch')().exact_match(self, self.row_columns)
+
+    def annotate_batch(self, batch_input):
+        self.batch.load(batch_input)
+        return super().annotate_batch(batch_input)
+
     def annotate(self, input_data, secondary_data=None):
+        return self.annotate_row(input_data, self.batch.fetchone(input_data))
+
+    @staticmethod
+    def annotate_row(input_data, row):
         out = {}
-        q = 'select total from {chrom} where pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chrom = input_data["chrom"], pos = int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
         if row:
             total = str(row[0]).split(':')
             total_total = int(total[0])
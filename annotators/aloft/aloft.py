@@ -1,15 +1,21 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.batch = get_module('sqlitebatch')().exact_match(
+            self, ['transcript', 'transcripts_affected', 'prob_tolerant', 'prob_recessive', 'prob_dominant', 'pred', 'confidence'])
+
+    def annotate_batch(self, batch_input):
+        self.batch.load(batch_input)
+        return super().annotate_batch(batch_input)
+
     def annotate(self, input_data, secondary_data=None):
-        q = 'select transcript, transcripts_affected, prob_tolerant, prob_recessive, prob_dominant, pred, confidence from {chr} where pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chr = input_data['chrom'], pos = int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
-        self.cursor.execute(q)
-        rows = self.cursor.fetchall()
+        rows = self.batch.fetchall(input_data)
         if rows:
             precomp_data = []
             for row in rows:
@@ -1,15 +1,17 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.table = get_module('dbtier')().open(self, 'arrvars', ['chrom', 'pos', 'ref', 'alt'],
+            ['brs_penetrance', 'lqt_penetrance', 'brs_structure', 'lqt_structure', 'function', 'lqt', 'brs', 'unaff', 'other', 'var', 'hugo'])
+
     def annotate(self, input_data, secondary_data=None):
-        q = 'select brs_penetrance, lqt_penetrance, brs_structure, lqt_structure, function, lqt, brs, unaff, other, var, hugo from arrvars where chrom = "{chrom}" and pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chrom = input_data["chrom"], pos=int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.table.fetchone(input_data['chrom'], int(input_data['pos']), input_data['ref_base'], input_data['alt_base'])
         if row:
             var = row[9]
             if var == None:
@@ -21,7 +23,7 @@ class CravatAnnotator(BaseAnnotator):
             return {'brs_penetrance': row[0], 'lqt_penetrance': row[1], 'brs_structure': row[2], 'lqt_structure': row[3], 'function': row[4], 'lqt' : row[5], 'brs': row[6], 'unaff': row[7], 'other': row[8], 'link': link }
     
     def cleanup(self):
-        pass
+        self.table.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
@@ -1,20 +1,22 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.table = get_module('dbtier')().open(self, 'cgi', ['chrom', 'pos', 'ref', 'alt'],
+            ['association', 'biomarker', 'drug', 'evidence', 'source', 'tumor'])
+
     def annotate(self, input_data, secondary_data=None):
-        q = 'select association, biomarker, drug, evidence, source, tumor from cgi where chrom = "{chrom}" and pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chrom = input_data["chrom"], pos = int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.table.fetchone(input_data['chrom'], int(input_data['pos']), input_data['ref_base'], input_data['alt_base'])
         if row:
             return {'association': row[0], 'biomarker': row[1], 'drug': row[2], 'evidence': row[3], 'source': row[4], 'tumor': row[5]}
 
     def cleanup(self):
-        pass
+        self.table.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
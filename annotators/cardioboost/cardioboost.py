@@ -1,16 +1,17 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
     
+    def setup(self):
+        self.table = get_module('dbtier')().open(self, 'cardio', ['chrom', 'pos', 'ref', 'alt'], ['pathogenicity', 'classification', 'Phenotype'])
+
     def annotate(self, input_data, secondary_data=None):
-        q = 'select pathogenicity, classification, Phenotype from cardio where chrom = "{chrom}" and pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chrom = input_data["chrom"] ,pos=int(input_data["pos"]), alt = input_data["alt_base"], ref = input_data["ref_base"])
-        self.cursor.execute(q)
-        rows = self.cursor.fetchall()
+        rows = self.table.fetchall(input_data['chrom'], int(input_data['pos']), input_data['ref_base'], input_data['alt_base'])
         out = {}
         for row in rows:
             if row[2] == 'Cardiomyopathy':
@@ -23,7 +24,7 @@ class CravatAnnotator(BaseAnnotator):
         return out
     
     def cleanup(self):
-        pass
+        self.table.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
@@ -3,19 +3,19 @@ from cravat import BaseAnnotator
 from cravat import InvalidData
 import sqlite3
 import os
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.overlap = get_module('binquery')().overlap(
+            self, 'screen', ['acc_d', 'acc_e', '_group', 'bound'])
+
     def annotate(self, input_data, secondary_data=None):
         chrom = input_data['chrom']
         pos = input_data['pos']
         if chrom is None or pos is None:
             return
-        lowbin = get_ucsc_bins(pos)[0]
-        q = 'select acc_d, acc_e, _group, bound from screen where chrom = "{chrom}" and bin={bin} and beg<={pos} and end>={pos}'.format(
-            chrom = chrom ,pos = pos, bin=lowbin)
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.overlap.fetchone(chrom, pos)
         if row:
             if row[3] == 'CTCF-bound':
                 bound = 'Yes'
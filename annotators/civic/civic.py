@@ -1,7 +1,7 @@
 import sys
 from cravat import BaseAnnotator
 from cravat import constants, InvalidData
-from pyliftover import LiftOver
+from cravat import get_module
 import sqlite3
 import requests
 import json
@@ -12,7 +12,7 @@ class CravatAnnotator(BaseAnnotator):
 
     def setup(self):
         self.civicdata = {}
-        lifter = LiftOver(constants.liftover_chain_paths['hg19'])
+        lifter = get_module('fastliftover')().open(constants.liftover_chain_paths['hg19'])
         page_url = 'https://civicdb.org/api/variants?count=500&page=1'
         while page_url is not None:
             try:
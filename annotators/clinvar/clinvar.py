@@ -1,18 +1,22 @@
 import sys
 import os
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 
 class CravatAnnotator(BaseAnnotator):
 
+    def setup(self):
+        self.batch = get_module('sqlitebatch')().exact_match(
+            self, ['sig', 'disease_refs', 'disease_names', 'rev_stat', 'id'])
+
+    def annotate_batch(self, batch_input):
+        self.batch.load(batch_input)
+        return super().annotate_batch(batch_input)
+
     def annotate(self, input_data):
-        chrom = input_data['chrom']
-        self.cursor.execute(
-            f'select sig, disease_refs, disease_names, rev_stat, id from {chrom} where pos=? and ref=? and alt=?;',
-            (input_data['pos'], input_data['ref_base'], input_data['alt_base'])
-        )
-        qr = self.cursor.fetchone()
+        qr = self.batch.fetchone(input_data)
         if qr is not None:
             return {
                 'sig':qr[0],
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -9,7 +10,7 @@ class CravatAnnotator(BaseAnnotator):
     def setup(self):
         dir_path = os.path.dirname(os.path.realpath(__file__))
         datafile_path = os.path.join(dir_path, "data", "cscape.bed.bgz")
-        self.tb = tabix.open(datafile_path)
+        self.tb = get_module('tabixsweep')().open(datafile_path)
         pass
 
     def annotate(self, input_data, secondary_data=None):
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -9,7 +10,7 @@ class CravatAnnotator(BaseAnnotator):
 
     def setup(self): 
         datafile = os.path.join(self.data_dir,'dann.tsv.bgz')
-        self.tb = tabix.open(datafile) 
+        self.tb = get_module('tabixsweep')().open(datafile)
     
     def annotate(self, input_data, secondary_data=None):
         chrom = input_data['chrom'][3:]
@@ -0,0 +1,9 @@
+import sys
+from cravat import get_module
+
+class CravatAnnotator(get_module('fusedstore').FusedAnnotator):
+    pass
+
+if __name__ == '__main__':
+    annotator = CravatAnnotator(sys.argv)
+    annotator.run()
@@ -5,11 +5,17 @@ import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the row annotate_row takes
+    row_columns = ['ada_score', 'rf_score']
+
     def annotate(self, input_data, secondary_data=None):
         q = 'select ada_score, rf_score from {chr} where pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
             chr = input_data["chrom"], pos = int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
         self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.cursor.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, row):
         if row:
             out = {'ada_score': row[0], 'rf_score': row[1]}
         else:
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -7,11 +8,15 @@ from cravat.util import get_ucsc_bins, reverse_complement
 
 class CravatAnnotator(BaseAnnotator):
 
+    def setup(self):
+        self.batch = get_module('sqlitebatch')().exact_match(self, ['snp'])
+
+    def annotate_batch(self, batch_input):
+        self.batch.load(batch_input)
+        return super().annotate_batch(batch_input)
+
     def annotate(self, input_data, secondary_data=None):
-        q = 'select snp from {chrom} where pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chrom = input_data["chrom"], pos = int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.batch.fetchone(input_data)
         if row:
             rsid = 'rs' + str(row[0])
             return {'rsid': rsid}
@@ -1,10 +1,15 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.memo = get_module('genememo')().memo(self, 'gene', ['geneA', 'Aallele_one_protein'],
+            ['id', 'name', 'effect', 'relation', 'familial', 'functional', 'dist', 'pub', 'geneB', 'Ballele_one_cdna', 'Ballele_one_protein', 'Ballele_two_cdna', 'Ballele_two_protein', 'Aallele_two_cdna', 'Aallele_two_protein'])
+
     def annotate(self, input_data, secondary_data=None):
         out = {}
         achange = input_data['achange']
@@ -17,10 +22,7 @@ class CravatAnnotator(BaseAnnotator):
         'Ter': '*','':''}
         for key, value in aa_321.items():
             achange = achange.replace(key, value)
-        q = 'select id, name, effect, relation, familial, functional, dist, pub, geneB,Ballele_one_cdna, Ballele_one_protein,Ballele_two_cdna, Ballele_two_protein,Aallele_two_cdna, Aallele_two_protein from gene where geneA = "{hugo}" and Aallele_one_protein = "{achange}"'.format(
-            hugo = input_data['hugo'], achange = achange)
-        self.cursor.execute(q)
-        rows = self.cursor.fetchall()
+        rows = self.memo.fetchall(input_data['hugo'], achange)
         if rows:
             data = []
             for row in rows:
@@ -63,7 +65,8 @@ class CravatAnnotator(BaseAnnotator):
             return out
 
     def cleanup(self):
-        pass
+        self.memo.log_stats()
+        self.memo.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
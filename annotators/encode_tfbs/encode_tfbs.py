@@ -1,11 +1,14 @@
 import sys
 from cravat import BaseAnnotator
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
 
     def setup(self):
-        pass
+        self.overlap = get_module('binquery')().overlap(
+            self, '{chrom} as c join studies as s on c.study=s.id',
+            ['s.cell', 's.quality', 's.antibody', 's.dccAccession', 's.factor'],
+            chrom_col=None, beg_col='c.beg', end_col='c.end', bin_col='c.bin', half_open=True)
     
     def annotate(self, input_data, secondary_data=None):
         if not secondary_data or len(secondary_data['hg19']) == 0:
@@ -14,12 +17,7 @@ class CravatAnnotator(BaseAnnotator):
         pos = secondary_data['hg19'][0]['pos']
         if chrom is None or pos is None:
             return
-        lowbin = get_ucsc_bins(pos)[0]
-        self.cursor.execute(
-            f'select s.cell, s.quality, s.antibody, s.dccAccession, s.factor from {chrom} as c join studies as s on c.study=s.id where c.bin=? and c.beg<=? and c.end>?',
-            [lowbin, pos, pos],
-        )
-        rows = self.cursor.fetchall()
+        rows = self.overlap.fetchall(chrom, pos)
         if rows:
             studies = sorted([list(v) for v in rows], key=lambda x: x[2])
             factor = sorted(list(set(map(lambda x: x[4], rows))), key=str.lower)
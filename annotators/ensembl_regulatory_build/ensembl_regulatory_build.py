@@ -3,7 +3,7 @@ from cravat import BaseAnnotator
 from cravat import InvalidData
 import sqlite3
 import os
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
 
@@ -13,17 +13,14 @@ class CravatAnnotator(BaseAnnotator):
             self.supported_chroms |= {r[0] for r in self.cursor}
         else:
             self.supported_chroms = {r[0] for r in self.cursor}
+        self.overlap = get_module('binquery')().overlap(self, 'ensembl', ['region', 'ensr'])
             
     def annotate(self, input_data, secondary_data=None):
         chrom = input_data["chrom"]
         pos = input_data["pos"]
         if chrom is None or pos is None:
             return
-        lowbin = get_ucsc_bins(pos)[0]
-        q = 'select region, ensr from ensembl where chrom = "{chrom}" and bin = {bin} and beg<={pos} and end>={pos}'.format(
-            chrom = chrom, pos= pos, bin = lowbin)
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.overlap.fetchone(chrom, pos)
         if row:
             out = {'region': row[0], 'ensr': row[1]}
         else:
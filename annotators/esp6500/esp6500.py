@@ -5,21 +5,23 @@ from cravat import InvalidData
 import sqlite3
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the row annotate_row takes
+    row_columns = ['ea_pop_af', 'aa_pop_af']
 
     def annotate(self, input_data):
-        out = {}
         chrom = input_data['chrom'].lower()
         pos = input_data['pos']
         ref = input_data['ref_base']
         alt = input_data['alt_base']
         
-        aa = ''
-        ea = ''
-        
         q = 'select ea_pop_af, aa_pop_af from esp6500_%s where position=%s and refbase="%s" and altbase="%s";' \
             %(chrom, pos, ref, alt)
         self.cursor.execute(q)
-        qr = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.cursor.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, qr):
+        out = {}
         if qr:
             ea = qr[0]
             aa = qr[1]
@@ -6,6 +6,9 @@ import os
 
 class CravatAnnotator(BaseAnnotator):
 
+    # Columns of the row annotate_row takes
+    row_columns = ['ens_tid', 'ens_pid', 'fathmm_score', 'fathmm_rscore', 'fathmm_pred']
+
     def setup(self): 
         dir_path = os.path.dirname(os.path.realpath(__file__))
         db_path = os.path.join(dir_path, "data", "FATHMM.db")
@@ -20,10 +23,13 @@ class CravatAnnotator(BaseAnnotator):
             self.supported_chroms = {r[0] for r in self.curs}
     
     def annotate(self, input_data, secondary_data=None):
-        out = {}
         stmt = 'SELECT ens_tid, ens_pid, fathmm_score, fathmm_rscore, fathmm_pred FROM {chr} WHERE pos = {pos} AND alt = "{alt}"'.format(chr=input_data["chrom"], pos=int(input_data["pos"]), alt = input_data["alt_base"])
         self.curs.execute(stmt)
-        row = self.curs.fetchone()
+        return self.annotate_row(input_data, self.curs.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, row):
+        out = {}
         if row is not None:
             out['ens_tid'] = row[0]
             out['ens_pid'] = row[1]
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -9,9 +10,9 @@ class CravatAnnotator(BaseAnnotator):
 
     def setup(self): 
         gz_coding = os.path.join(self.data_dir,'fathmm_xf_coding_hg38.vcf.gz')
-        self.tb_coding = tabix.open(gz_coding) 
+        self.tb_coding = get_module('tabixsweep')().open(gz_coding)
         gz_noncoding = os.path.join(self.data_dir,'fathmm_xf_noncoding_hg38.vcf.gz')
-        self.tb_noncoding = tabix.open(gz_noncoding) 
+        self.tb_noncoding = get_module('tabixsweep')().open(gz_noncoding)
 
     def annotate(self, input_data, secondary_data=None):
         chrom = input_data['chrom'][3:]
@@ -1,16 +1,20 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 import tabix
 import re
 
+motif_re = re.compile(r'(.+)#(\w+)#(\w+[.]\w+)#(\w+[.]\w+)')
+motif_name_re = re.compile(r'#(\w+)#((\d+(?:\.\d+)?))#(\d+(?:\.\d+)?)')
+
 class CravatAnnotator(BaseAnnotator): 
     def setup(self):
         dir_path = os.path.dirname(os.path.realpath(__file__))
         datafile_path = os.path.join(dir_path, "data", "funseq2.bed.bgz")
-        self.tb = tabix.open(datafile_path)
+        self.tb = get_module('tabixsweep')().open(datafile_path)
         pass
 
     def annotate(self, input_data, secondary_data=None):
@@ -38,18 +42,16 @@ class CravatAnnotator(BaseAnnotator):
                     motif = str(record[6])
                     motif = motif.replace(',M', ';M')
                     for m in motif.split(';'):
-                        match = re.search(r'(MOTIFBR)', m)
-                        if match:
+                        if 'MOTIFBR' in m:
                             motif_type = "MOTIFBR"
-                        matched = re.search(r'(MOTIFG)', m)
-                        if matched:
+                        if 'MOTIFG' in m:
                             motif_type = "MOTIFG"
                         mots = m.strip().split(',')
                         for motifs in mots:
                             motifs = motifs.replace(motif_type + '=', '')
                             if motif_type == "MOTIFG":
                                 motifs = ' #' + motifs
-                            a = re.search(r'(.+)#(\w+)#(\w+[.]\w+)#(\w+[.]\w+)', motifs)
+                            a = motif_re.search(motifs)
                             if a:
                                 tf_name = a.group(1)
                                 if tf_name == ' ':
@@ -59,7 +61,7 @@ class CravatAnnotator(BaseAnnotator):
                                 ref_score = a.group(4)
                             elif motif != '':
                                 tf_name = motifs
-                                name = re.search(r'#(\w+)#((\d+(?:\.\d+)?))#(\d+(?:\.\d+)?)', motif)
+                                name = motif_name_re.search(motif)
                                 motif_name = name.group(1)
                                 alt_score = name.group(2)
                                 ref_score = name.group(3)
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -14,12 +15,16 @@ class CravatAnnotator(BaseAnnotator):
             self.supported_chroms |= {r[0] for r in self.cursor}
         else:
             self.supported_chroms = {r[0] for r in self.cursor}
+        self.scores = get_module('densescores')().open(os.path.join(self.data_dir, 'dense'))
     
     def annotate(self, input_data, secondary_data=None):
         out = {}
-        stmt = 'SELECT gerp_nr, gerp_rs, gerp_rs_rank FROM {chr} WHERE pos = {pos} AND alt = "{alt}"'.format(chr=input_data["chrom"], pos=int(input_data["pos"]), alt = input_data["alt_base"])
-        self.cursor.execute(stmt)
-        row = self.cursor.fetchone()
+        if self.scores is not None and self.scores.has_alt(input_data["alt_base"]):
+            row = self.scores.get(input_data["chrom"], int(input_data["pos"]), input_data["alt_base"])
+        else:
+            stmt = 'SELECT gerp_nr, gerp_rs, gerp_rs_rank FROM {chr} WHERE pos = {pos} AND alt = "{alt}"'.format(chr=input_data["chrom"], pos=int(input_data["pos"]), alt = input_data["alt_base"])
+            self.cursor.execute(stmt)
+            row = self.cursor.fetchone()
         if row is not None:
             out['gerp_nr'] = self.myCast(row[0])
             out['gerp_rs'] = self.myCast(row[1])
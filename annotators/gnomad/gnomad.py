@@ -5,23 +5,27 @@ from cravat import InvalidData
 import sqlite3
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the row annotate_row takes
+    row_columns = ['af','af_afr','af_amr','af_asj','af_eas',
+                   'af_fin','af_nfe','af_oth', 'af_sas']
 
     def annotate(self, input_data):
-        af_col_names = ['af','af_afr','af_amr','af_asj','af_eas',
-                        'af_fin','af_nfe','af_oth', 'af_sas']
-        out = {x:'' for x in af_col_names}
-
         chrom = input_data['chrom']
         if chrom == 'chrY':
-            return out
+            return self.annotate_row(input_data, None)
         pos = input_data['pos']
         ref = input_data['ref_base']
         alt = input_data['alt_base']
         
         q = 'select %s from %s where pos=%s and ref="%s" and alt="%s";' \
-            %(', '.join(af_col_names), chrom, pos, ref, alt)
+            %(', '.join(self.row_columns), chrom, pos, ref, alt)
         self.cursor.execute(q)
-        qr = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.cursor.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, qr):
+        af_col_names = CravatAnnotator.row_columns
+        out = {x:'' for x in af_col_names}
         if qr:
             for i, k in enumerate(af_col_names):
                 out[k] = qr[i]
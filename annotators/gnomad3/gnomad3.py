@@ -1,27 +1,30 @@
 import sys
 import os
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the row annotate_row takes
+    row_columns = ['af','af_afr','af_amr','af_asj','af_eas',
+                   'af_fin','af_nfe','af_oth', 'af_sas']
+
+    def setup(self):
+        self.batch = get_module('sqlitebatch')().exact_match(self, self.row_columns)
+
+    def annotate_batch(self, batch_input):
+        self.batch.load(batch_input)
+        return super().annotate_batch(batch_input)
 
     def annotate(self, input_data):
-        af_col_names = ['af','af_afr','af_amr','af_asj','af_eas',
-                        'af_fin','af_nfe','af_oth', 'af_sas']
+        return self.annotate_row(input_data, self.batch.fetchone(input_data))
+
+    @staticmethod
+    def annotate_row(input_data, qr):
+        af_col_names = CravatAnnotator.row_columns
         out = {x:'' for x in af_col_names}
 
-        chrom = input_data['chrom']
-        pos = input_data['pos']
-        ref = input_data['ref_base']
-        alt = input_data['alt_base']
-        
-        q = 'select {} from {} where pos=? and ref=? and alt=?'.format(
-            ', '.join(af_col_names),
-            chrom
-        )
-        self.cursor.execute(q, (pos, ref, alt))
-        qr = self.cursor.fetchone()
         if qr:
             for i, k in enumerate(af_col_names):
                 out[k] = qr[i]
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -9,12 +10,13 @@ class CravatAnnotator(BaseAnnotator):
     def setup(self): 
         assert isinstance(self.dbconn, sqlite3.Connection)
         assert isinstance(self.cursor, sqlite3.Cursor)
+        self.table = get_module('dbtier')().open(self, 'genes', ['gname'],
+            ['transcript', 'oe_lof', 'oe_mis', 'oe_syn', 'lof_z', 'mis_z', 'syn_z', 'pLI', 'pRec', 'pNull'])
     
     def annotate(self, input_data, secondary_data=None):
         out = {}
         hugo = input_data['hugo']
-        self.cursor.execute('SELECT transcript,oe_lof,oe_mis,oe_syn,lof_z,mis_z,syn_z,pLI,pRec,pNull FROM genes WHERE gname= ?;', [hugo])
-        rows = self.cursor.fetchall()
+        rows = self.table.fetchall(hugo)
         if rows is not None:
             transcript = None
             oe_lof = None
@@ -69,7 +71,7 @@ class CravatAnnotator(BaseAnnotator):
         return out
     
     def cleanup(self):
-        pass
+        self.table.close()
     
     def myCast(self, item):
         if item is None:
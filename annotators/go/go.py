@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -8,13 +9,11 @@ class CravatAnnotator(BaseAnnotator):
     def setup(self): 
         self.cursor.execute('select go_id, name from go_name;')
         self.mid2mech = {row[0]:row[1] for row in self.cursor}
+        self.table = get_module('dbtier')().open(self, 'go_annotation', ['hugo'], ['hugo', 'go_id', 'go_aspect'])
 
     def annotate(self, input_data, secondary_data=None):
         out = {}
-        q = 'select hugo, go_id, go_aspect from go_annotation where hugo = "{hugo}"'.format(
-            hugo = input_data['hugo'])
-        self.cursor.execute(q)
-        rows = self.cursor.fetchall()
+        rows = self.table.fetchall(input_data['hugo'])
         if rows is not None:
             bpo_names = []
             cco_names = []
@@ -43,7 +42,7 @@ class CravatAnnotator(BaseAnnotator):
             return out
 
     def cleanup(self):
-        pass
+        self.table.close()
     
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
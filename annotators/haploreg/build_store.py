@@ -0,0 +1,36 @@
+"""
+Builds data/haploreg.sqlite from the installed haploreg_afr, haploreg_amr,
+haploreg_asn and haploreg_eur modules.
+"""
+
+import os
+import sys
+from cravat import get_module
+
+sources = ['haploreg_afr', 'haploreg_amr', 'haploreg_asn', 'haploreg_eur']
+
+def build(batch_size=100000):
+    fusedstore = get_module('fusedstore')()
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    installed = []
+    for source in sources:
+        db_path = fusedstore.source_db_path(source)
+        if db_path is not None:
+            installed.append((source, db_path))
+    def copy_source(store, sid, source, conn):
+        cursor = conn.execute('select qsnp, ldsnp, r2, dprime from haploreg')
+        fusedstore.copy_rows(cursor, store, 'insert into haploreg values (?, ?, ?, ?, ?)',
+            lambda r: (r[0], sid, r[1], r[2], r[3]), batch_size=batch_size)
+        return ()
+    fusedstore.merge_sources(os.path.join(data_dir, 'haploreg.sqlite'), installed,
+        ['create table sources (id integer primary key, name text)',
+         'create table haploreg (qsnp integer, source integer, ldsnp integer, r2 real, dprime real)'],
+        ['create index haploreg_idx on haploreg (qsnp)'],
+        copy_source)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 1:
+        print('Usage: python build_store.py')
+        sys.exit(1)
+    build()
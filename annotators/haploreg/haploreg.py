@@ -0,0 +1,47 @@
+import sys
+from cravat import BaseAnnotator
+
+class CravatAnnotator(BaseAnnotator):
+
+    def setup(self):
+        include = self.conf.get('include')
+        if isinstance(include, str):
+            include = [v.strip() for v in include.split(',') if v.strip()]
+        self.cursor.execute('select id, name from sources')
+        self.sources = {sid: name for sid, name in self.cursor if not include or name in include}
+        self.max_params = 500
+
+    def annotate(self, input_data, secondary_data=None):
+        if not secondary_data['dbsnp']:
+            return None
+        rsnums = [int(rsid.replace('rs','')) for rsid in secondary_data['dbsnp'][0]['rsid'].split(',')]
+        # All populations' rows for all of the variant's rsIDs in one query
+        # (or one per max_params rsIDs), grouped by population and rsID
+        found = {}
+        qsnps = sorted(set(rsnums))
+        for i in range(0, len(qsnps), self.max_params):
+            chunk = qsnps[i:i + self.max_params]
+            q = 'select qsnp, source, ldsnp, r2, dprime from haploreg where qsnp in ({})'.format(
+                ', '.join(['?'] * len(chunk)))
+            self.cursor.execute(q, chunk)
+            for qsnp, sid, ldsnp, r2, dprime in self.cursor:
+                if sid in self.sources:
+                    found.setdefault((sid, qsnp), []).append(['rs'+str(ldsnp), r2, dprime])
+        out = {}
+        for sid, name in self.sources.items():
+            all = []
+            for rsnum in rsnums:
+                all += found.get((sid, rsnum), [])
+            if all:
+                out[name + '_all'] = all
+        if out:
+            return out
+        else:
+            return None
+
+    def cleanup(self):
+        pass
+
+if __name__ == '__main__':
+    annotator = CravatAnnotator(sys.argv)
+    annotator.run()
@@ -3,13 +3,17 @@ from cravat import BaseAnnotator
 from cravat import InvalidData
 import sqlite3
 import os
-from pyliftover import LiftOver
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
 
     def setup(self): 
         chain_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'hg38ToHg19.over.chain')
-        self.liftover = LiftOver(chain_path)
+        self.liftover = get_module('fastliftover')().batch(chain_path)
+
+    def annotate_batch(self, batch_input):
+        self.liftover.load(batch_input)
+        return super().annotate_batch(batch_input)
     
     def annotate(self, input_data, secondary_data=None):
         out = {}
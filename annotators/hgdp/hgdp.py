@@ -6,12 +6,13 @@ import os
 
 class CravatAnnotator(BaseAnnotator):
 
+    # Columns of the row annotate_row takes
+    row_columns = ['African', 'European', 'Middle_Eastern', 'CS_Asian', 'East_Asian', 'Oceanian', 'Native_American']
+
     def setup(self):
         pass
 
     def annotate(self, input_data, secondary_data=None):
-        out = {}
-
         # get input details
         input_chrom = input_data['chrom'].lower().replace('chr','')
         input_pos = input_data['pos']
@@ -21,7 +22,11 @@ class CravatAnnotator(BaseAnnotator):
         sql_q = 'SELECT  African, European, Middle_Eastern, CS_Asian, East_Asian, Oceanian, Native_American FROM hgdp_table WHERE CHR="%s" AND POS=%s AND REF="%s" and ALT="%s";' \
             %(input_chrom, input_pos, input_ref, input_alt)
         self.cursor.execute(sql_q)
-        sql_q_result = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.cursor.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, sql_q_result):
+        out = {}
         if sql_q_result:
             out['african_allele_freq'] = sql_q_result[0]
             out['european_allele_freq'] = sql_q_result[1]
@@ -3,29 +3,32 @@ import os
 import sqlite3
 from cravat import BaseAnnotator
 from cravat import InvalidData
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 import pickle
 
 class CravatAnnotator (BaseAnnotator):
 
     def setup(self):
-        pickle_path = os.path.join(self.data_dir, 'javierre_promoters.pickle')
-        self.data = pickle.load(open(pickle_path,'rb'))
+        self.index = get_module('intervalindex')().open(os.path.join(self.data_dir, 'javierre_promoters.index'),
+            records=index_records(self.data_dir), sources=[os.path.join(self.data_dir, 'javierre_promoters.pickle')])
 
     def annotate(self, input_data):
         out = {}
         chrom = input_data['chrom']
         pos = input_data['pos']
-        it = self.data.get(chrom)
-        if it:
-            regions = [iv.data for iv in it[pos]]
-        else:
-            regions = []
+        regions = self.index.query(chrom, pos)
         if regions:
             out['regions'] = ';'.join(regions)
             return out
         else:
             return None
+
+def index_records(data_dir):
+    pickle_path = os.path.join(data_dir, 'javierre_promoters.pickle')
+    data = pickle.load(open(pickle_path,'rb'))
+    for chrom, tree in data.items():
+        for iv in tree:
+            yield chrom, iv.begin, iv.end, iv.data
         
 if __name__ == '__main__':
     module = CravatAnnotator(sys.argv)
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -9,18 +10,18 @@ class CravatAnnotator(BaseAnnotator):
     def setup(self): 
         assert isinstance(self.dbconn, sqlite3.Connection)
         assert isinstance(self.cursor, sqlite3.Cursor)
+        self.table = get_module('dbtier')().open(self, 'genes', ['gname'], ['loftool_score'])
     
     def annotate(self, input_data, secondary_data=None):
         out = {}
         hugo = input_data['hugo']
-        self.cursor.execute('SELECT loftool_score FROM genes WHERE gname= ?;', [hugo])
-        row = self.cursor.fetchone()
+        row = self.table.fetchone(hugo)
         if row is not None:
             out['loftool_score'] = float(row[0])
         return out
     
     def cleanup(self):
-        pass
+        self.table.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
@@ -1,23 +1,24 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.memo = get_module('genememo')().memo(self, 'mavedb', ['hugo', 'hgvs_pro'], ['score', 'accession'])
+
     def annotate(self, input_data, secondary_data=None):
         hugo = input_data['hugo']
         achange = input_data['achange']
-        q = 'select score, accession from mavedb where hugo = "{hugo}" and hgvs_pro = "{achange}"'.format(
-            hugo = hugo, achange = achange)
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
-        accession = row[1]
+        row = self.memo.fetchone(hugo, achange)
         if row:
-            return {'score': row[0], 'accession': accession}
+            return {'score': row[0], 'accession': row[1]}
 
     def cleanup(self):
-        pass
+        self.memo.log_stats()
+        self.memo.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
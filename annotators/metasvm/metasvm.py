@@ -6,11 +6,17 @@ import os
 
 class CravatAnnotator(BaseAnnotator):
     
+    # Columns of the row annotate_row takes
+    row_columns = ['metasvm_score', 'metasvm_rankscore', 'metasvm_pred']
+
     def annotate(self, input_data, secondary_data=None):
         q = 'select metasvm_score, metasvm_rankscore, metasvm_pred from {chr} where pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
             chr = input_data["chrom"] ,pos=int(input_data["pos"]), alt = input_data["alt_base"], ref = input_data["ref_base"])
         self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.cursor.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, row):
         if row:
             if row[2] == 'T':
                 pred = 'Tolerated'
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -13,21 +14,19 @@ class CravatAnnotator(BaseAnnotator):
             self.supported_chroms |= {r[0] for r in self.cursor}
         else:
             self.supported_chroms = {r[0] for r in self.cursor}
+        self.table = get_module('dbtier')().open(self, 'chrM', ['pos', 'ref', 'alt'], ['disease', 'status', 'pubmed', 'score', 'quartile'])
 
     def annotate(self, input_data, secondary_data=None):
         if input_data['chrom'] != 'chrM':
             return {}
-        q = 'select disease, status, pubmed, score, quartile from {chrom} where pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chrom = input_data["chrom"], pos = int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.table.fetchone(int(input_data['pos']), input_data['ref_base'], input_data['alt_base'])
         if row:
             out = {"disease": row[0], "status": row[1], "pubmed": row[2], "score": row[3], "quartile": row[4]}
             return out
 
     
     def cleanup(self):
-        pass
+        self.table.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
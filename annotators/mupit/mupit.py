@@ -1,10 +1,16 @@
 import sys
 import os
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 
 class CravatAnnotator(BaseAnnotator):
 
+    def setup (self):
+        self.overlap = get_module('binquery')().overlap(
+            self, 'mupit', ['chrom'],
+            beg_col='start', end_col='stop', bin_col=None, preload_rows=100000)
+
     def annotate (self, input_data):
         out = {}
         '''
@@ -20,12 +26,7 @@ class CravatAnnotator(BaseAnnotator):
         '''
         chrom = input_data['chrom']
         pos = str(input_data['pos'])
-        sql = 'select * from mupit where ' +\
-            'chrom="' + chrom + '" and ' +\
-            'start<=' + pos + ' and ' +\
-            'stop>=' + pos
-        self.cursor.execute(sql)
-        ret = self.cursor.fetchone()
+        ret = self.overlap.fetchone(chrom, input_data['pos'])
         if ret != None:
             link = 'http://www.cravat.us/MuPIT_Interactive?gm=' +\
                 chrom + ':' + pos
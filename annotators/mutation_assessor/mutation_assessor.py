@@ -3,33 +3,49 @@ from cravat import BaseAnnotator
 from cravat import InvalidData
 import sqlite3
 import os
+import re
+import json
+
+aa_321 = {
+    'Asp': 'D', 'Ser': 'S', 'Gln': 'Q', 'Lys': 'K',
+    'Trp': 'W', 'Asn': 'N', 'Pro': 'P', 'Thr': 'T',
+    'Phe': 'F', 'Ala': 'A', 'Gly': 'G', 'Cys': 'C',
+    'Ile': 'I', 'Leu': 'L', 'His': 'H', 'Arg': 'R',
+    'Met': 'M', 'Val': 'V', 'Glu': 'E', 'Tyr': 'Y',
+    'Ter': '*'}
+aa_321_re = re.compile('|'.join(aa_321))
+
+def to_one_letter(achange):
+    return aa_321_re.sub(lambda m: aa_321[m.group(0)], achange.replace('p.', ''))
 
 class CravatAnnotator(BaseAnnotator):    
     def annotate(self, input_data, secondary_data=None):
         out = {}
         achanges = []
         subs = {'H':'High', 'M':'Medium', 'L':'Low', 'N':'Neutral'}
-        allmappings = eval(input_data['all_mappings'])
+        allmappings = json.loads(input_data['all_mappings'])
         hugo = input_data['hugo']
         if hugo:
             precomp = []
-            for i in range(len(allmappings[hugo])):
-                transcript = allmappings[hugo][i][3]
-                achange = allmappings[hugo][i][1]
-                achange = str(achange).replace('p.','')
-                aa_321 = {
-                'Asp': 'D', 'Ser': 'S', 'Gln': 'Q', 'Lys': 'K',
-                'Trp': 'W', 'Asn': 'N', 'Pro': 'P', 'Thr': 'T',
-                'Phe': 'F', 'Ala': 'A', 'Gly': 'G', 'Cys': 'C',
-                'Ile': 'I', 'Leu': 'L', 'His': 'H', 'Arg': 'R',
-                'Met': 'M', 'Val': 'V', 'Glu': 'E', 'Tyr': 'Y',
-                'Ter': '*','':''}
-                for key, value in aa_321.items():
-                    achange = achange.replace(key, value)
-                stmt = 'SELECT impact, score, rankscore FROM genes where gene = "{hugo}" and annotation = "{achange}"'.format(
-                    hugo = input_data['hugo'], achange = achange)
-                self.cursor.execute(stmt)
-                row = self.cursor.fetchone()
+            # Transcripts of a gene mostly share a few protein changes
+            one_letter = {}
+            mappings = []
+            for m in allmappings.get(hugo, []):
+                achange = str(m[1])
+                if achange not in one_letter:
+                    one_letter[achange] = to_one_letter(achange)
+                mappings.append((m[3], one_letter[achange]))
+            achanges = sorted({achange for _, achange in mappings})
+            rows = {}
+            if achanges:
+                # One query for all of the gene's protein changes
+                stmt = 'SELECT annotation, impact, score, rankscore FROM genes where gene = ? and annotation in ({})'.format(
+                    ', '.join(['?'] * len(achanges)))
+                self.cursor.execute(stmt, [hugo] + achanges)
+                for row in self.cursor.fetchall():
+                    rows.setdefault(row[0], row[1:])
+            for transcript, achange in mappings:
+                row = rows.get(achange)
                 if row:
                     impact = row[0]
                     score = row[1]
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of mutation_assessor's annotate on a synthetic genes
+table, for variants in genes with many transcripts. Reports microseconds
+per variant. --module times another copy of mutation_assessor.py, e.g. an
+older version, and checks it gives the same output. Run from any
+directory, e.g.
+
+    python bench_mutation_assessor.py --transcripts 40 --module /tmp/mutation_assessor_old.py
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import importlib.util
+
+aa_3 = ['Ala', 'Arg', 'Asn', 'Asp', 'Cys', 'Gln', 'Glu', 'Gly', 'His', 'Ile',
+        'Leu', 'Lys', 'Met', 'Phe', 'Pro', 'Ser', 'Thr', 'Trp', 'Tyr', 'Val']
+aa_1 = 'ARNDCQEGHILKMFPSTWYV'
+
+def load_module(path):
+    spec = importlib.util.spec_from_file_location('mutation_assessor', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_db(path, n_genes, n_changes, seed=1):
+    # A genes table with n_changes scored protein changes per gene
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute('create table genes (gene text, annotation text, impact text, score real, rankscore real)')
+    rows = []
+    for g in range(n_genes):
+        for _ in range(n_changes):
+            ref, alt = rng.sample(range(20), 2)
+            annotation = '{}{}{}'.format(aa_1[ref], rng.randrange(1, 1000), aa_1[alt])
+            rows.append(('GENE{}'.format(g), annotation, rng.choice('HMLN'), round(rng.uniform(-5, 5), 3), round(rng.random(), 5)))
+    conn.executemany('insert into genes values (?, ?, ?, ?, ?)', rows)
+    conn.execute('create index genes_idx on genes (gene, annotation)')
+    conn.commit()
+    return conn
+
+def random_inputs(conn, n, n_genes, n_transcripts, seed=2):
+    # Variants whose gene has n_transcripts transcripts. The transcripts
+    # share a few protein changes, some of them in the table.
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(n):
+        hugo = 'GENE{}'.format(rng.randrange(n_genes))
+        stored = [r[0] for r in conn.execute('select annotation from genes where gene=? limit 50', (hugo,))]
+        changes = []
+        for _ in range(rng.randrange(1, 6)):
+            if stored and rng.random() < 0.7:
+                change = rng.choice(stored)
+                ref, pos, alt = aa_1.index(change[0]), change[1:-1], aa_1.index(change[-1])
+            else:
+                ref, alt = rng.sample(range(20), 2)
+                pos = rng.randrange(1, 1000)
+            changes.append('p.{}{}{}'.format(aa_3[ref], pos, aa_3[alt]))
+        mappings = [['Q{:05d}'.format(t), rng.choice(changes), 'MIS', 'ENST{:011d}'.format(t), 'c.{}A>G'.format(t)]
+            for t in range(n_transcripts)]
+        inputs.append({'hugo': hugo, 'all_mappings': json.dumps({hugo: mappings})})
+    return inputs
+
+def run(label, module, conn, inputs):
+    annotator = module.CravatAnnotator.__new__(module.CravatAnnotator)
+    annotator.cursor = conn.cursor()
+    start = time.perf_counter()
+    results = [annotator.annotate(input_data) for input_data in inputs]
+    elapsed = time.perf_counter() - start
+    print('{:<50} {:8.1f} us/variant'.format(label, elapsed / len(inputs) * 1e6))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='mutation_assessor micro-benchmark')
+    parser.add_argument('--genes', type=int, default=2000)
+    parser.add_argument('--changes', type=int, default=500, help='scored protein changes per gene')
+    parser.add_argument('--transcripts', type=int, default=40, help='transcripts of each variant\'s gene')
+    parser.add_argument('--variants', type=int, default=5000, help='variants annotated')
+    parser.add_argument('--module', help='another mutation_assessor.py to time')
+    args = parser.parse_args()
+    current = load_module(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'mutation_assessor.py'))
+    with tempfile.TemporaryDirectory() as work_dir:
+        conn = make_db(os.path.join(work_dir, 'mutation_assessor.sqlite'), args.genes, args.changes)
+        inputs = random_inputs(conn, args.variants, args.genes, args.transcripts)
+        print('{} genes with {} changes each, {} variants with {} transcripts each'.format(
+            args.genes, args.changes, args.variants, args.transcripts))
+        expected = run('mutation_assessor.py', current, conn, inputs)
+        print('{} with a result'.format(sum([r is not None for r in expected])))
+        if args.module:
+            results = run(args.module, load_module(args.module), conn, inputs)
+            print('same output: {}'.format(results == expected))
+        conn.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,11 +5,17 @@ import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):    
+    # Columns of the rows annotate_rows takes
+    row_columns = ['transcript', 'score', 'rankscore', 'prediction', 'model']
+
     def annotate(self, input_data, secondary_data=None):
         q = 'select transcript, score, rankscore, prediction, model from {chrom} where pos = {pos} and alt = "{alt}"'.format(
             chrom = input_data["chrom"], pos = int(input_data["pos"]), alt = input_data["alt_base"])
         self.cursor.execute(q)
-        rows = self.cursor.fetchall()
+        return self.annotate_rows(input_data, self.cursor.fetchall())
+
+    @staticmethod
+    def annotate_rows(input_data, rows):
         if rows:
             precomp_data = []
             out = {}
@@ -1,16 +1,18 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 import webbrowser
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.table = get_module('dbtier')().open(self, 'Genes', ['Hugo'],
+            ['No_Cancer_Types', 'M_Frequency', 'Best_Q_Value', 'Supporting_Literature', 'TCGA_Marker_Papers', 'dNdS_Study', 'Tumor_Portal', 'Bailey_Database', 'Cancer_Types'])
+
     def annotate(self, input_data):
-        q ='select No_Cancer_Types, M_Frequency, Best_Q_Value, Supporting_Literature, TCGA_Marker_Papers, dNdS_Study, Tumor_Portal, Bailey_Database, Cancer_Types ' + \
-                            'from Genes where Hugo="%s";'%input_data['hugo']
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.table.fetchone(input_data['hugo'])
 
         if row:
             out = {'No_Cancer_Types': row[0] , 'Max_Frequency': row[1], 'Best_Q_Value': row[2], 'Supporting_Literature': row[3], 'TCGA_Marker_Papers': row[4], 'dNdS_Study': row[5] , 'Tumorportal' : row[6], 'Bailey_Database': row[7], 'Cancer_Type': row[8]}
@@ -46,7 +48,7 @@ class CravatAnnotator(BaseAnnotator):
         
     
     def cleanup(self):
-        pass
+        self.table.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
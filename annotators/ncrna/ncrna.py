@@ -4,25 +4,24 @@ from cravat import InvalidData
 import sqlite3
 import os
 import pickle
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
 
     def setup(self): 
-        pickle_path = os.path.join(self.data_dir,'ncrna.pickle')
-        with open(pickle_path,'rb') as f:
-            self.data = pickle.load(f)
+        self.index = get_module('intervalindex')().open(os.path.join(self.data_dir, 'ncrna.index'),
+            records=index_records(self.data_dir), sources=[os.path.join(self.data_dir, 'ncrna.pickle')])
     
     def annotate(self, input_data, secondary_data=None):
         
         chrom = input_data['chrom']
-        if chrom in self.data:
+        if chrom in self.index:
             pos = input_data['pos']
-            ivs = self.data[chrom][pos]
             classes = []
             names = []
-            for iv in ivs:
-                classes.append(iv.data[1])
-                names.append(iv.data[2])
+            for data in self.index.query(chrom, pos):
+                classes.append(data[1])
+                names.append(data[2])
             if classes and names:
                 out = {
                     'ncrnaclass': ','.join(classes),
@@ -33,6 +32,14 @@ class CravatAnnotator(BaseAnnotator):
 
     def cleanup(self):
         pass
+
+def index_records(data_dir):
+    pickle_path = os.path.join(data_dir,'ncrna.pickle')
+    with open(pickle_path,'rb') as f:
+        data = pickle.load(f)
+    for chrom, tree in data.items():
+        for iv in tree:
+            yield chrom, iv.begin, iv.end, iv.data
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
@@ -1,15 +1,16 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.table = get_module('dbtier')().open(self, 'omim', ['chr', 'pos', 'ref', 'alt'], ['omim_id'])
+
     def annotate(self, input_data, secondary_data=None):
-        q = 'select omim_id from omim where chr = "{chr}" and pos = {pos} and ref = "{ref}" and alt = "{alt}"'.format(
-            chr = input_data["chrom"], pos=int(input_data["pos"]), ref = input_data["ref_base"], alt = input_data["alt_base"])
-        self.cursor.execute(q)
-        row = self.cursor.fetchone()
+        row = self.table.fetchone(input_data['chrom'], int(input_data['pos']), input_data['ref_base'], input_data['alt_base'])
         if row:
             omim_id = str(row[0]).replace('|', '; ')
             out = {'omim_id': omim_id}
@@ -18,7 +19,7 @@ class CravatAnnotator(BaseAnnotator):
         return out
     
     def cleanup(self):
-        pass
+        self.table.close()
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
@@ -4,21 +4,19 @@ from cravat import InvalidData
 import sqlite3
 import os
 import pickle
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
 
     def setup(self): 
-        data_path = os.path.join(self.data_dir, 'pharmgkb.pickle')
-        self.data = pickle.load(open(data_path,'rb'))
+        self.index = get_module('intervalindex')().open(os.path.join(self.data_dir, 'pharmgkb.index'),
+            records=index_records(self.data_dir), sources=[os.path.join(self.data_dir, 'pharmgkb.pickle')])
     
     def annotate(self, input_data, secondary_data=None):
-        key = ':'.join(map(str, [
-            input_data['chrom'],
-            input_data['pos'],
-            input_data['ref_base'],
-            input_data['alt_base'],
-        ]))
-        hits = self.data.get(key)
+        hits = None
+        for ref, alt, variant_hits in self.index.query(input_data['chrom'], input_data['pos']):
+            if ref == input_data['ref_base'] and alt == input_data['alt_base']:
+                hits = variant_hits
         if hits:
             pharmgkb_id = hits[0]['pharmgkb_id']
             assocs = []
@@ -57,6 +55,15 @@ class CravatAnnotator(BaseAnnotator):
     
     def cleanup(self):
         pass
+
+def index_records(data_dir):
+    # The pickle is keyed by chrom:pos:ref:alt. Each variant is indexed as
+    # a one-base interval with its ref, alt and hits.
+    data_path = os.path.join(data_dir, 'pharmgkb.pickle')
+    data = pickle.load(open(data_path,'rb'))
+    for key, hits in data.items():
+        chrom, pos, ref, alt = key.split(':')
+        yield chrom, int(pos), int(pos) + 1, (ref, alt, hits)
         
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
@@ -1,5 +1,6 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
@@ -18,12 +19,16 @@ class CravatAnnotator(BaseAnnotator):
             self.supported_chroms |= {r[0] for r in self.curs}
         else:
             self.supported_chroms = {r[0] for r in self.curs}
+        self.scores = get_module('densescores')().open(os.path.join(dir_path, 'data', 'dense'))
     
     def annotate(self, input_data, secondary_data=None):
         out = {}
-        stmt = 'SELECT phastcons100_vert, phastcons100_vert_r, phastcons30_mamm, phastcons30_mamm_r,phastcons17way_primate,phastcons17way_primate_r FROM {chr} WHERE pos = {pos} AND alt = "{alt}"'.format(chr=input_data["chrom"], pos=int(input_data["pos"]), alt = input_data["alt_base"])
-        self.curs.execute(stmt)
-        row = self.curs.fetchone()
+        if self.scores is not None and self.scores.has_alt(input_data["alt_base"]):
+            row = self.scores.get(input_data["chrom"], int(input_data["pos"]), input_data["alt_base"])
+        else:
+            stmt = 'SELECT phastcons100_vert, phastcons100_vert_r, phastcons30_mamm, phastcons30_mamm_r,phastcons17way_primate,phastcons17way_primate_r FROM {chr} WHERE pos = {pos} AND alt = "{alt}"'.format(chr=input_data["chrom"], pos=int(input_data["pos"]), alt = input_data["alt_base"])
+            self.curs.execute(stmt)
+            row = self.curs.fetchone()
         if row is not None:
             out['phastcons100_vert'] = float(row[0])
             out['phastcons100_vert_r'] = float(row[1])
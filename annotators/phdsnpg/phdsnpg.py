@@ -6,6 +6,9 @@ import os
 
 class CravatAnnotator(BaseAnnotator):
 
+    # Columns of the row annotate_row takes
+    row_columns = ['pathogenic', 'score', 'fdr']
+
     def setup(self): 
         assert isinstance(self.dbconn, sqlite3.Connection)
         assert isinstance(self.cursor, sqlite3.Cursor)
@@ -17,7 +20,6 @@ class CravatAnnotator(BaseAnnotator):
             self.supported_chroms = {r[0] for r in self.cursor}
     
     def annotate(self, input_data, secondary_data=None):
-        out = {}
         chrom = input_data['chrom']
         alt = input_data['alt_base'].replace('-','')
         pos = input_data['pos']
@@ -28,14 +30,19 @@ class CravatAnnotator(BaseAnnotator):
                 alt = alt,
             )
             self.cursor.execute(main_query)
-            row = self.cursor.fetchone()
-            if row is not None:
-                if row[0] == 1:
-                    out['prediction'] = 'Pathogenic'
-                else:
-                    out['prediction'] = 'Benign'
-                out['score'] = row[1]
-                out['fdr'] = row[2]
+            return self.annotate_row(input_data, self.cursor.fetchone())
+        return {}
+
+    @staticmethod
+    def annotate_row(input_data, row):
+        out = {}
+        if row is not None:
+            if row[0] == 1:
+                out['prediction'] = 'Pathogenic'
+            else:
+                out['prediction'] = 'Benign'
+            out['score'] = row[1]
+            out['fdr'] = row[2]
         return out
     
     def cleanup(self):
@@ -7,15 +7,20 @@ import os
 pred_order = {'D': 1, 'P': 2, 'B': 3}
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the rows annotate_rows takes
+    row_columns = ['uniprot', 'hdiv_score', 'hdiv_rankscore', 'hdiv_prediction', 'hvar_score', 'hvar_rankscore', 'hvar_prediction', 'trans']
 
     def setup(self): 
         pass
     
     def annotate(self, input_data, secondary_data=None):
-        global pred_order
         q = f'select uniprot, hdiv_score, hdiv_rankscore, hdiv_prediction, hvar_score, hvar_rankscore, hvar_prediction, trans from {input_data["chrom"]} where pos=? and alt=?'
         self.cursor.execute(q, (input_data['pos'], input_data['alt_base']))
-        rows = self.cursor.fetchall()
+        return self.annotate_rows(input_data, self.cursor.fetchall())
+
+    @staticmethod
+    def annotate_rows(input_data, rows):
+        global pred_order
         if len(rows) > 0:
             precomp_data = []
             for r in rows:
@@ -2,25 +2,22 @@ import sys
 import os
 import sqlite3
 from cravat import BaseAnnotator
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 import pickle
 
 class CravatAnnotator (BaseAnnotator):
 
     def setup(self):
-        pickle_path = os.path.join(self.data_dir, 'pseudogene.pickle')
-        self.data = pickle.load(open(pickle_path,'rb'))
+        self.index = get_module('intervalindex')().open(os.path.join(self.data_dir, 'pseudogene.index'),
+            records=index_records(self.data_dir), sources=[os.path.join(self.data_dir, 'pseudogene.pickle')])
 
     def annotate(self, input_data):
         chrom = input_data['chrom']
         pos = input_data['pos']
-        if chrom in self.data.tids:
-            ivs = self.data.tids[chrom][pos]
+        if chrom in self.index:
             ensts = []
             hugos = []
-            for iv in ivs:
-                tid = iv.data
-                enst, hugo = self.data.tinfo.get(tid,(None,None))
+            for enst, hugo in self.index.query(chrom, pos):
                 if enst and hugo:
                     ensts.append(enst)
                     hugos.append(hugo)
@@ -31,6 +28,14 @@ class CravatAnnotator (BaseAnnotator):
                 }
                 return out
 
+def index_records(data_dir):
+    # Transcript info is stored with each interval instead of by tid
+    pickle_path = os.path.join(data_dir, 'pseudogene.pickle')
+    data = pickle.load(open(pickle_path,'rb'))
+    for chrom, tree in data.tids.items():
+        for iv in tree:
+            yield chrom, iv.begin, iv.end, data.tinfo.get(iv.data,(None,None))
+
 if __name__ == '__main__':
     module = CravatAnnotator(sys.argv)
     module.run()
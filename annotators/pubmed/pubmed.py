@@ -1,22 +1,27 @@
 import sys
 import os
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 
 class CravatAnnotator(BaseAnnotator):
 
+    def setup (self):
+        self.table = get_module('dbtier')().open(self, 'pubmed', ['hugo'], ['n', 'term'])
+
     def annotate (self, input_data):
         out = {}
         hugo = input_data['hugo']
-        sql = 'select n, term from pubmed where hugo="' + hugo + '"'
-        self.cursor.execute(sql)
-        ret = self.cursor.fetchone()
+        ret = self.table.fetchone(hugo)
         if ret != None and ret[0] != 0:
             (n, term) = ret
             out = {'n': n, 
                    'term': 'http://www.ncbi.nlm.nih.gov/pubmed?term=' + term}
         return out
 
+    def cleanup (self):
+        self.table.close()
+
 if __name__ == '__main__':
     annotator = CravatAnnotator(sys.argv)
     annotator.run()
\ No newline at end of file
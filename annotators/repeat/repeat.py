@@ -3,10 +3,15 @@ import os
 import sqlite3
 from cravat import BaseAnnotator
 from cravat import InvalidData
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 
 class CravatAnnotator (BaseAnnotator):
 
+    def setup(self):
+        self.overlap = get_module('binquery')().overlap(
+            self, 'repeat', ['class', 'family', 'name'],
+            beg_col='start', bin_col='binno')
+
     def annotate(self, input_data):
         out = {}
         
@@ -30,25 +35,13 @@ class CravatAnnotator (BaseAnnotator):
                'repeatname': []}
         
         has_annotation = False
-        bins = get_ucsc_bins(start, end)
-        for bin in bins:
-            query = 'select class, family, name ' +\
-                'from repeat ' +\
-                'where binno=' + str(bin) + ' and ' +\
-                'chrom="' + chrom + '" and ' +\
-                'start<=' + str(end) + ' and end>=' + str(start)
-            self.cursor.execute(query) 
-            results = self.cursor.fetchall()
-            
-            if len(results) == 0:
-                continue
-            
-            for result in results:
-                has_annotation = True
-                (repeat_class, repeat_family, repeat_name) = result
-                out['repeatclass'].append(repeat_class)
-                out['repeatfamily'].append(repeat_family)
-                out['repeatname'].append(repeat_name)
+        results = self.overlap.fetchall(chrom, start, end)
+        for result in results:
+            has_annotation = True
+            (repeat_class, repeat_family, repeat_name) = result
+            out['repeatclass'].append(repeat_class)
+            out['repeatfamily'].append(repeat_family)
+            out['repeatname'].append(repeat_name)
         if has_annotation:
             out['repeatclass'] = ','.join(out['repeatclass'])
             out['repeatfamily'] = ','.join(out['repeatfamily'])
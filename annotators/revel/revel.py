@@ -5,8 +5,10 @@ import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the rows annotate_rows takes
+    row_columns = ['trans', 'score', 'rank']
+
     def annotate(self, input_data, secondary_data=None):
-        out = None
         # Don't run on alt contigs
         if len(input_data['chrom']) > 5: return None
         # Dont run on non-missense mutations
@@ -19,8 +21,11 @@ class CravatAnnotator(BaseAnnotator):
             alt = input_data['alt_base'],
             )
         self.cursor.execute(q)
+        return self.annotate_rows(input_data, self.cursor.fetchall())
+
+    @staticmethod
+    def annotate_rows(input_data, rows):
         out = {}
-        rows = self.cursor.fetchall()
         if rows:
             precomp_data = []
             for row in rows:
@@ -3,7 +3,7 @@ from cravat import BaseAnnotator
 from cravat import InvalidData
 import sqlite3
 import os
-from cravat import get_ucsc_bins
+from cravat import get_module
 
 
 class CravatAnnotator(BaseAnnotator):
@@ -14,19 +14,17 @@ class CravatAnnotator(BaseAnnotator):
             self.supported_chroms |= {r[0] for r in self.cursor}
         else:
             self.supported_chroms = {r[0] for r in self.cursor}
+        self.overlap = get_module('binquery')().overlap(
+            self, '{chrom}', ['sum_score', 'mean_score'],
+            chrom_col=None, beg_col='start', half_open=True)
     
     def annotate(self, input_data, secondary_data=None):
         out = {}
         chrom = input_data['chrom']
         pos = input_data['pos']
-        bins = get_ucsc_bins(pos)
-        for bin in bins:
-            q = 'select sum_score, mean_score from {} where bin=? and start<=? and end>?'.format(chrom)
-            self.cursor.execute(q,[bin,pos,pos])
-            r = self.cursor.fetchone()
-            if r:
-                out['sum_score'], out['mean_score'] = r
-                return out
+        r = self.overlap.fetchone(chrom, pos)
+        if r:
+            out['sum_score'], out['mean_score'] = r
         return out
     
     def cleanup(self):
@@ -1,14 +1,22 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the rows annotate_rows takes
+    row_columns = ['transcript', 'score', 'rankscore', 'med', 'seqs']
 
     def setup(self): 
         pass
         self.chroms = set(['chr'+str(n) for n in range(1,23)]+['chrX','chrY','chrM'])
+        self.batch = get_module('sqlitebatch')().exact_match(self, self.row_columns)
+
+    def annotate_batch(self, batch_input):
+        self.batch.load(batch_input)
+        return super().annotate_batch(batch_input)
     
     def annotate(self, input_data, secondary_data=None):
         out = {}
@@ -18,8 +26,11 @@ class CravatAnnotator(BaseAnnotator):
         alt = input_data['alt_base']
         if (len(ref) != 1 and len(alt) != 1) or (chrom not in self.chroms):
             return out
-        self.cursor.execute(f'select transcript, score, rankscore, med, seqs from {chrom} where pos=? and ref=? and alt=?', [pos, ref, alt])
-        rows = self.cursor.fetchall()
+        return self.annotate_rows(input_data, self.batch.fetchall(input_data))
+
+    @staticmethod
+    def annotate_rows(input_data, rows):
+        out = {}
         if rows:
             precomp_data = []
             for row in rows:
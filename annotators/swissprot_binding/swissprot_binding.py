@@ -3,19 +3,19 @@ from cravat import BaseAnnotator
 from cravat import InvalidData
 import sqlite3
 import os
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.overlap = get_module('binquery')().overlap(
+            self, 'binding', ['uniprotkb', 'desc', 'pubmed', 'filenames'])
+
     def annotate(self, input_data, secondary_data=None):
         chrom = input_data['chrom']
         pos = input_data['pos']
         if chrom is None or pos is None:
             return
-        lowbin = get_ucsc_bins(pos)[0]
-        q = 'select uniprotkb, desc, pubmed, filenames from binding where chrom = "{chrom}" and bin={bin} and beg<={pos} and end>={pos}'.format(
-            chrom = chrom ,pos = pos, bin=lowbin)
-        self.cursor.execute(q)
-        rows = self.cursor.fetchall()
+        rows = self.overlap.fetchall(chrom, pos)
         if rows is not None:
             act_, binding_, ca_, dna_, metal_, np_, zn_, uniprots, pubmed = set(),set(), set(),set(),set(), set(),set(),set(), set()
             all_results = []
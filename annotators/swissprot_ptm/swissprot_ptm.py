@@ -3,9 +3,13 @@ from cravat import BaseAnnotator
 from cravat import InvalidData
 import sqlite3
 import os
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 
 class CravatAnnotator(BaseAnnotator):
+    def setup(self):
+        self.overlap = get_module('binquery')().overlap(
+            self, 'ptm', ['uniprotkb', 'desc', 'pubmed', 'filenames'])
+
     def annotate(self, input_data, secondary_data=None):
         chrom = input_data['chrom']
         pos = input_data['pos']
@@ -13,11 +17,7 @@ class CravatAnnotator(BaseAnnotator):
         so = input_data['so']
         if chrom is None or pos is None:
             return
-        lowbin = get_ucsc_bins(pos)[0]
-        q = 'select uniprotkb, desc, pubmed, filenames from ptm where chrom = "{chrom}" and bin={bin} and beg<={pos} and end>={pos}'.format(
-            chrom = chrom ,pos = pos, bin=lowbin)
-        self.cursor.execute(q)
-        rows = self.cursor.fetchall()
+        rows = self.overlap.fetchall(chrom, pos)
         if rows is not None:
             crosslnk_ ,disulfid_, carbohyd_, init_, lipid_, mod_, propep_, pubmed, signal_, transit_, uniprots = set(),set(),set(),set(),set(),set(),set(),set(),set(),set(),set()
             crosslnk, disulfid, carbohyd, init,lipid,mod,propep, pubmeds,signal, transit = '','','','','','','','','',''
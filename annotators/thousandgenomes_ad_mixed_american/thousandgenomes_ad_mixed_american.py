@@ -1,21 +1,27 @@
 import sys
 from cravat import BaseAnnotator
+from cravat import get_module
 from cravat import InvalidData
 import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
 
+    # Columns of the row annotate_row takes
+    row_columns = ['CLM', 'MXL', 'PEL', 'PUR']
+
+    def setup(self):
+        self.batch = get_module('sqlitebatch')().exact_match(self, self.row_columns)
+
+    def annotate_batch(self, batch_input):
+        self.batch.load(batch_input)
+        return super().annotate_batch(batch_input)
+
     def annotate(self, input_data):
-        chrom = input_data['chrom']
-        pos = input_data['pos']
-        ref = input_data['ref_base']
-        alt = input_data['alt_base']
-        q = 'select CLM, MXL, PEL, PUR from '\
-            +'%s where pos=%s and ref="%s" and alt="%s";' \
-            %(chrom, pos, ref, alt)
-        self.cursor.execute(q)
-        result = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.batch.fetchone(input_data))
+
+    @staticmethod
+    def annotate_row(input_data, result):
         if result:
             return {
                 'clm_af': result[0],
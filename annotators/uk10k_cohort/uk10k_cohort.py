@@ -5,30 +5,36 @@ import sqlite3
 import os
 
 class CravatAnnotator(BaseAnnotator):
+    # Columns of the row annotate_row takes
+    row_columns = ['uk10k_twins_ac', 'uk10k_twins_af', 'uk10k_alspac_ac', 'uk10k_alspac_af', 'uk10k_ac', 'uk10k_af']
 
     def setup(self): 
         assert isinstance(self.dbconn, sqlite3.Connection)
         assert isinstance(self.cursor, sqlite3.Cursor)
     
     def annotate(self, input_data, secondary_data=None):
-        out = {}
         stmt = 'SELECT uk10k_twins_ac, uk10k_twins_af, uk10k_alspac_ac, uk10k_alspac_af, uk10k_ac, uk10k_af FROM {chr} WHERE pos = {pos} AND alt = "{alt}"'.format(chr=input_data["chrom"], pos=int(input_data["pos"]), alt = input_data["alt_base"])
         self.cursor.execute(stmt)
-        row = self.cursor.fetchone()
+        return self.annotate_row(input_data, self.cursor.fetchone())
+
+    @staticmethod
+    def annotate_row(input_data, row):
+        out = {}
         if row is not None:
-            out['uk10k_twins_ac'] = self.myCast(row[0])
-            out['uk10k_twins_af'] = self.myCast(row[1])
-            out['uk10k_alspac_ac'] = self.myCast(row[2])
-            out['uk10k_alspac_af'] = self.myCast(row[3])
-            out['uk10k_ac'] = self.myCast(row[4])
-            out['uk10k_af'] = self.myCast(row[5])
+            out['uk10k_twins_ac'] = CravatAnnotator.myCast(row[0])
+            out['uk10k_twins_af'] = CravatAnnotator.myCast(row[1])
+            out['uk10k_alspac_ac'] = CravatAnnotator.myCast(row[2])
+            out['uk10k_alspac_af'] = CravatAnnotator.myCast(row[3])
+            out['uk10k_ac'] = CravatAnnotator.myCast(row[4])
+            out['uk10k_af'] = CravatAnnotator.myCast(row[5])
         return out
     
     def cleanup(self):
         self.dbconn.close()
         pass
 
-    def myCast(self, item):
+    @staticmethod
+    def myCast(item):
         if item is None:
             return item
         else:
@@ -3,10 +3,15 @@ import os
 import sqlite3
 from cravat import BaseAnnotator
 from cravat import InvalidData
-from cravat.util import get_ucsc_bins
+from cravat import get_module
 
 class CravatAnnotator (BaseAnnotator):
 
+    def setup(self):
+        self.overlap = get_module('binquery')().overlap(
+            self, 'data', ['features', 'element'],
+            beg_col='start', bin_col=None, preload_rows=100000)
+
     def annotate(self, input_data):
         out = {}
         
@@ -14,12 +19,7 @@ class CravatAnnotator (BaseAnnotator):
         pos = input_data['pos']
         features = []
         element = ""
-        q = 'select features, element from data where chrom="{chrom}" and start<={pos} and end>={pos};'.format(
-            chrom=chrom,
-            pos=pos
-        )
-        self.cursor.execute(q)
-        for r in self.cursor:
+        for r in self.overlap.fetchall(chrom, pos):
             if r[0] is not None:
                 features.append(r[0].strip())
                 element = r[1].strip()
@@ -0,0 +1,150 @@
+from bisect import bisect_right
+from cravat import BaseCommonModule
+from cravat.util import get_ucsc_bins
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def overlap (self, annotator, table, columns, chrom_col='chrom', beg_col='beg', end_col='end',
+            bin_col='bin', half_open=False, preload_rows=0):
+        return BinnedOverlap(annotator, table, columns, chrom_col=chrom_col, beg_col=beg_col,
+            end_col=end_col, bin_col=bin_col, half_open=half_open, preload_rows=preload_rows)
+
+class BinnedOverlap (object):
+    """
+    Rows of an interval table that overlap a position or a range.
+
+    For binned tables, one query covers every UCSC bin level containing
+    the range with bin in (...), so intervals stored in the larger bins
+    are found as well as those in the lowest-level bin. Rows come back in
+    bin order, lowest level first, which is the order the per-bin queries
+    returned them in, and by begin and end within a bin (or, for unbinned
+    tables, throughout), from the interval index and the query alike.
+
+    table is either a table with a chrom_col column or a per-chromosome
+    table name containing {chrom} (chrom_col None). bin_col None means an
+    unbinned table, queried with the range alone, which begin may not be
+    further before its start than the chromosome's longest interval.
+    Intervals include end unless half_open is set.
+
+    Chromosomes with at most preload_rows rows (the preload_rows module
+    option overrides the annotator's default) are read into a sorted
+    interval index on first use and served from memory.
+    """
+
+    def __init__ (self, annotator, table, columns, chrom_col='chrom', beg_col='beg', end_col='end',
+            bin_col='bin', half_open=False, preload_rows=0):
+        self.cursor = annotator.dbconn.cursor()
+        self.table = table
+        self.chrom_col = chrom_col
+        self.bin_col = bin_col
+        self.half_open = half_open
+        self.preload_rows = int(annotator.conf.get('preload_rows', preload_rows))
+        self.indexes = {}
+        self.max_lens = {}
+        self.beg_col = beg_col
+        self.end_col = end_col
+        self.ncol = len(columns)
+        self.select = ', '.join(columns + [bin_col or 'null', beg_col, end_col])
+        where = []
+        if chrom_col is not None:
+            where.append('{}=?'.format(chrom_col))
+        self.chrom_where = ' and '.join(where) if where else '1'
+        where.append('{}<=?'.format(beg_col))
+        where.append('{}{}?'.format(end_col, '>' if half_open else '>='))
+        if bin_col is None:
+            where.append('{}>=?'.format(beg_col))
+        self.where = ' and '.join(where)
+        self.order = ' order by {}, {}'.format(beg_col, end_col)
+
+    def from_table (self, chrom):
+        return self.table.replace('{chrom}', chrom)
+
+    def chrom_args (self, chrom):
+        return [chrom] if self.chrom_col is not None else []
+
+    def fetchall (self, chrom, start, end=None):
+        if end is None:
+            end = start
+        bins = get_ucsc_bins(start, end + 1) if self.bin_col is not None else []
+        if self.preload_rows > 0:
+            if chrom not in self.indexes:
+                self.indexes[chrom] = self.load_index(chrom)
+            index = self.indexes[chrom]
+            if index is not None:
+                rows = index.overlap(start, end, self.half_open)
+                return self.in_bin_order(rows, bins)
+        q = 'select {} from {} where {}'.format(self.select, self.from_table(chrom), self.where)
+        args = self.chrom_args(chrom) + [end, start]
+        if bins:
+            # Placeholders keep the statement text, and so SQLite's cached
+            # statement, the same for every range spanning as many bins
+            q += ' and {} in ({})'.format(self.bin_col, ', '.join(['?'] * len(bins)))
+            args += bins
+        elif self.bin_col is None:
+            if chrom not in self.max_lens:
+                self.max_lens[chrom] = self.max_len(chrom)
+            args.append(start - self.max_lens[chrom])
+        self.cursor.execute(q + self.order, args)
+        return self.in_bin_order(self.cursor.fetchall(), bins)
+
+    def fetchone (self, chrom, start, end=None):
+        rows = self.fetchall(chrom, start, end=end)
+        if rows:
+            return rows[0]
+        else:
+            return None
+
+    def in_bin_order (self, rows, bins):
+        if len(bins) > 1:
+            rank = {b: i for i, b in enumerate(bins)}
+            rows = sorted(rows, key=lambda r: rank.get(r[self.ncol], len(bins)))
+        return [r[:self.ncol] for r in rows]
+
+    def max_len (self, chrom):
+        self.cursor.execute('select max({} - {}) from {} where {}'.format(self.end_col, self.beg_col,
+            self.from_table(chrom), self.chrom_where), self.chrom_args(chrom))
+        return self.cursor.fetchone()[0] or 0
+
+    def load_index (self, chrom):
+        table = self.from_table(chrom)
+        self.cursor.execute('select count(*) from {} where {}'.format(table, self.chrom_where), self.chrom_args(chrom))
+        if self.cursor.fetchone()[0] > self.preload_rows:
+            return None
+        self.cursor.execute('select {} from {} where {}'.format(self.select, table, self.chrom_where), self.chrom_args(chrom))
+        return IntervalIndex(self.cursor.fetchall(), self.ncol + 1)
+
+class IntervalIndex (object):
+    # Rows grouped by length, lengths within a factor of four of each
+    # other, each group sorted by begin and searched back from the last row
+    # beginning at or before the end of the range as far as its longest
+    # interval reaches. A few long intervals then only widen the search of
+    # their own group.
+    def __init__ (self, rows, beg_idx):
+        self.beg_idx = beg_idx
+        groups = {}
+        for row in rows:
+            length = max(row[beg_idx + 1] - row[beg_idx], 1)
+            groups.setdefault(length.bit_length() // 2, []).append(row)
+        self.groups = []
+        for group in groups.values():
+            group.sort(key=self.order)
+            self.groups.append((group, [r[beg_idx] for r in group],
+                max([r[beg_idx + 1] - r[beg_idx] for r in group])))
+
+    def order (self, row):
+        return (row[self.beg_idx], row[self.beg_idx + 1])
+
+    def overlap (self, start, end, half_open):
+        hits = []
+        for rows, begs, max_len in self.groups:
+            i = bisect_right(begs, end) - 1
+            while i >= 0 and begs[i] >= start - max_len:
+                row = rows[i]
+                row_end = row[self.beg_idx + 1]
+                if row_end > start or (not half_open and row_end == start):
+                    hits.append(row)
+                i -= 1
+        hits.sort(key=self.order)
+        return hits
@@ -0,0 +1,93 @@
+"""
+Benchmark of overlap queries for a mix of point variants and indels on
+synthetic interval tables, binned and unbinned, against the queries the
+annotators made before: the lowest-level bin only, one query per bin
+level, and the plain range scan. Reports variants/s and rows found of
+each, cold (page cache dropped, needs root) with --cold. Run from any
+directory, e.g.
+
+    python bench_binquery.py --rows 20000 --variants 20000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+from cravat.util import get_ucsc_bins
+
+chroms = ['chr1', 'chr2', 'chr3']
+
+def drop_page_cache():
+    # Needs root. The table is read from disk again by the next run.
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+def lowest_bin(conn):
+    q = 'select name from regions where chrom=? and bin=? and beg<=? and end>=?'
+    def fetch(chrom, start, end):
+        return conn.execute(q, (chrom, get_ucsc_bins(start, end + 1)[0], end, start)).fetchall()
+    return fetch
+
+def bin_loop(conn):
+    q = 'select name from regions where chrom=? and bin=? and beg<=? and end>=?'
+    def fetch(chrom, start, end):
+        rows = []
+        for b in get_ucsc_bins(start, end + 1):
+            rows.extend(conn.execute(q, (chrom, b, end, start)).fetchall())
+        return rows
+    return fetch
+
+def range_scan(conn):
+    q = 'select name from regions where chrom=? and beg<=? and end>=?'
+    def fetch(chrom, start, end):
+        return conn.execute(q, (chrom, end, start)).fetchall()
+    return fetch
+
+def overlap(module, db_path, binned, preload_rows):
+    annotator = harness.Annotator(db_path)
+    query = module.BinnedOverlap(annotator, 'regions', ['name'], bin_col='bin' if binned else None,
+        preload_rows=preload_rows)
+    return query.fetchall
+
+def run(name, fetch, queries, expected, cold):
+    if cold:
+        drop_page_cache()
+    start = time.perf_counter()
+    results = [fetch(chrom, start, end) for chrom, start, end in queries]
+    elapsed = time.perf_counter() - start
+    found = [sorted(r) for r in results]
+    print('{:<28} {:8.2f} s {:10.0f} variants/s {:8d} rows, same rows: {}'.format(
+        name, elapsed, len(queries) / elapsed, sum([len(r) for r in found]), found == expected))
+
+def main():
+    parser = argparse.ArgumentParser(description='binquery benchmark')
+    parser.add_argument('--rows', type=int, default=20000, help='intervals per chromosome')
+    parser.add_argument('--chrom-len', type=int, default=100000000)
+    parser.add_argument('--variants', type=int, default=20000, help='variants looked up')
+    parser.add_argument('--cold', action='store_true', help='drop the page cache before each run (needs root)')
+    args = parser.parse_args()
+    module = harness.load_binquery()
+    queries = sorted(harness.random_queries(args.variants, chroms, args.chrom_len))
+    with tempfile.TemporaryDirectory() as work_dir:
+        for binned in (True, False):
+            db_path = os.path.join(work_dir, 'regions_{}.sqlite'.format(binned))
+            harness.make_table(db_path, chroms, args.rows, args.chrom_len, binned=binned)
+            print('{} table, {} rows per chromosome, {:.0f} MB'.format(
+                'binned' if binned else 'unbinned', args.rows, os.path.getsize(db_path) / 1e6))
+            annotator = harness.Annotator(db_path)
+            runs = [('lowest bin only', lowest_bin(annotator.dbconn)), ('query per bin', bin_loop(annotator.dbconn))] \
+                if binned else [('range scan', range_scan(annotator.dbconn))]
+            runs += [('binquery', overlap(module, db_path, binned, 0)),
+                     ('binquery, preloaded', overlap(module, db_path, binned, args.rows))]
+            # Rows are compared with those the binquery query finds
+            expected = [sorted(runs[-2][1](*q)) for q in queries]
+            for name, fetch in runs:
+                run(name, fetch, queries, expected, args.cold)
+            annotator.dbconn.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import os
+import sys
+import random
+import sqlite3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'test'))
+import testutil
+
+def load_binquery():
+    return testutil.load_common('binquery')
+
+# UCSC bin levels, lowest first: (offset, shift)
+bin_levels = [(585, 17), (73, 20), (9, 23), (1, 26), (0, 29)]
+
+def ucsc_bin(beg, end):
+    # The smallest bin holding all of [beg, end)
+    last = max(beg, end - 1)
+    for offset, shift in bin_levels:
+        if beg >> shift == last >> shift:
+            return offset + (beg >> shift)
+    raise ValueError('{}-{} is beyond the largest bin'.format(beg, end))
+
+def feature_length(rng):
+    # Mostly short features with a tail of long ones reaching the larger
+    # bins, as in the regulatory and repeat tables
+    r = rng.random()
+    if r < 0.9:
+        return rng.randrange(1, 2000)
+    elif r < 0.995:
+        return rng.randrange(2000, 100000)
+    else:
+        return rng.randrange(100000, 2000000)
+
+def make_table(path, chroms, n, chrom_len, binned=True, seed=1):
+    # An interval table with chrom, beg, end, name and (if binned) bin
+    # columns and the index the annotators' tables have. Returns the
+    # intervals of each chromosome as (beg, end, name).
+    conn = sqlite3.connect(path)
+    cols = 'chrom text, beg integer, end integer, name text' + (', bin integer' if binned else '')
+    conn.execute('create table regions ({})'.format(cols))
+    stored = {}
+    for i, chrom in enumerate(chroms):
+        rows = []
+        for j, (beg, end) in enumerate(testutil.random_intervals(n, chrom_len, random.Random(seed + i), feature_length)):
+            name = '{}_{}'.format(chrom, j)
+            row = (chrom, beg, end, name) + ((ucsc_bin(beg, end + 1),) if binned else ())
+            rows.append(row)
+            stored.setdefault(chrom, []).append((beg, end, name))
+        conn.executemany('insert into regions values ({})'.format(', '.join(['?'] * len(rows[0]))), rows)
+    if binned:
+        conn.execute('create index regions_idx on regions (chrom, bin)')
+    else:
+        conn.execute('create index regions_idx on regions (chrom, beg)')
+    conn.commit()
+    conn.close()
+    return stored
+
+def random_queries(n, chroms, chrom_len, seed=2):
+    # Point variants and indels: short insertions and deletions and a few
+    # deletions of a kilobase or more
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        chrom = rng.choice(chroms)
+        start = rng.randrange(1, chrom_len)
+        r = rng.random()
+        if r < 0.7:
+            end = start
+        elif r < 0.97:
+            end = start + rng.randrange(1, 50)
+        else:
+            end = start + rng.randrange(1000, 20000)
+        queries.append((chrom, start, end))
+    return queries
+
+class Annotator(object):
+    # What BinnedOverlap uses of an annotator
+    def __init__(self, db_path, conf=None):
+        self.dbconn = sqlite3.connect(db_path)
+        self.conf = conf or {}
@@ -0,0 +1,82 @@
+"""
+Tests that overlap queries find every interval overlapping point variants
+and indels, with and without the interval index. Run with
+
+    python -m pytest commons/binquery/test
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+
+class BinQueryTest(unittest.TestCase):
+
+    chroms = ['chr1', 'chr2']
+    chrom_len = 20000000
+
+    def setUp(self):
+        self.module = harness.load_binquery()
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def expected(self, stored, chrom, start, end, half_open):
+        return sorted([name for beg, row_end, name in stored.get(chrom, [])
+            if beg <= end and (row_end > start or (not half_open and row_end == start))])
+
+    def check(self, binned, half_open=False):
+        db_path = os.path.join(self.work_dir, 'regions_{}_{}.sqlite'.format(binned, half_open))
+        stored = harness.make_table(db_path, self.chroms, 5000, self.chrom_len, binned=binned)
+        bin_col = 'bin' if binned else None
+        annotator = harness.Annotator(db_path)
+        scan = self.module.BinnedOverlap(annotator, 'regions', ['name', 'beg'], bin_col=bin_col, half_open=half_open)
+        index = self.module.BinnedOverlap(annotator, 'regions', ['name', 'beg'], bin_col=bin_col, half_open=half_open,
+            preload_rows=10000)
+        # Queries starting and ending on interval bounds as well as random
+        # ones, and a chromosome the table does not have
+        queries = harness.random_queries(2000, self.chroms + ['chrY'], self.chrom_len)
+        for beg, end, _ in stored['chr1'][:200]:
+            queries += [('chr1', beg, beg), ('chr1', end, end), ('chr1', end, end + 10), ('chr1', beg - 5, beg)]
+        found = 0
+        for chrom, start, end in queries:
+            scan_rows = scan.fetchall(chrom, start, end)
+            index_rows = index.fetchall(chrom, start, end)
+            self.assertEqual(sorted([r[0] for r in scan_rows]), self.expected(stored, chrom, start, end, half_open))
+            self.assertEqual(index_rows, scan_rows, (chrom, start, end))
+            self.assertEqual(index.fetchone(chrom, start, end), scan_rows[0] if scan_rows else None)
+            if not binned:
+                self.assertEqual([r[1] for r in scan_rows], sorted([r[1] for r in scan_rows]))
+            found += len(scan_rows)
+        self.assertGreater(found, len(queries))
+        annotator.dbconn.close()
+
+    def test_binned(self):
+        self.check(True)
+
+    def test_unbinned(self):
+        self.check(False)
+
+    def test_half_open(self):
+        self.check(True, half_open=True)
+        self.check(False, half_open=True)
+
+    def test_preload_rows_option(self):
+        db_path = os.path.join(self.work_dir, 'regions.sqlite')
+        harness.make_table(db_path, self.chroms, 100, self.chrom_len)
+        annotator = harness.Annotator(db_path, conf={'preload_rows': '0'})
+        overlap = self.module.BinnedOverlap(annotator, 'regions', ['name'], preload_rows=1000)
+        overlap.fetchall('chr1', 1000)
+        self.assertEqual(overlap.indexes, {})
+        annotator.conf['preload_rows'] = '50'
+        overlap = self.module.BinnedOverlap(annotator, 'regions', ['name'], preload_rows=1000)
+        overlap.fetchall('chr1', 1000)
+        self.assertEqual(overlap.indexes, {'chr1': None})
+        annotator.dbconn.close()
+
+if __name__ == '__main__':
+    unittest.main()
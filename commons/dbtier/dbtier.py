@@ -0,0 +1,144 @@
+import os
+import sqlite3
+from urllib.request import pathname2url
+from cravat import BaseCommonModule
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def open (self, annotator, table, key_cols, columns, small_bytes=32 * 1024 * 1024):
+        return TieredTable(annotator, table, key_cols, columns, small_bytes=small_bytes)
+
+def available_memory ():
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def database_path (dbconn):
+    # File of the main database, or None for an in-memory one
+    for _, name, path in dbconn.execute('pragma database_list'):
+        if name == 'main':
+            return path or None
+    return None
+
+class TieredTable (object):
+    """
+    Exact-match lookups on one table of an annotator's database, with
+    the access strategy chosen from the database file size and available
+    memory.
+
+    memory: the file is at most small_bytes and 1/16 of available
+        memory, and the key columns have text or integer affinity and
+        binary collation. The table is read into a dict at setup, where
+        str keys of text columns and int keys of integer columns are
+        looked up. Other keys, such as None, which SQLite compares with
+        its own rules, are queried.
+    mmap: the file is at most 1/4 of available memory. It is opened
+        again read-only and immutable, memory-mapped in full, with a page
+        cache as large as the file.
+    disk: larger files are opened again read-only with query_only, a
+        256 MB mmap window, a 64 MB page cache and in-memory temp storage.
+
+    The annotator's connection is left as it is. The chosen tier is
+    written to the annotator's log, and close releases the second
+    connection.
+    """
+
+    def __init__ (self, annotator, table, key_cols, columns, small_bytes=32 * 1024 * 1024):
+        self.table = table
+        self.key_cols = key_cols
+        self.columns = columns
+        self.preloaded = None
+        self.conn = None
+        self.cursor = annotator.dbconn.cursor()
+        self.query = 'select {} from {} where {}'.format(
+            ', '.join(columns), table, ' and '.join(['{}=?'.format(c) for c in key_cols]))
+        self.key_types = self.column_types()
+        db_path = database_path(annotator.dbconn)
+        size = os.path.getsize(db_path) if db_path else None
+        avail = available_memory()
+        if size is None:
+            self.tier = 'disk'
+        elif size <= small_bytes and (avail is None or size <= avail // 16) and None not in self.key_types:
+            self.tier = 'memory'
+        elif avail is not None and size <= avail // 4:
+            self.tier = 'mmap'
+        else:
+            self.tier = 'disk'
+        if self.tier == 'memory':
+            self.preload()
+        elif self.tier == 'mmap':
+            self.connect(db_path, 'mode=ro&immutable=1', size, -(size // 1024 + 1))
+        elif db_path:
+            self.connect(db_path, 'mode=ro', 256 * 1024 * 1024, -65536)
+        annotator.logger.info('{} db tier: {} ({} bytes, {} available)'.format(table, self.tier, size, avail))
+
+    def column_types (self):
+        # The Python type of key values that compare as they do in a dict:
+        # str for columns with text affinity and int for integer affinity,
+        # if the table has no collating sequence. None for other columns.
+        self.cursor.execute('select sql from sqlite_master where name=?', (self.table,))
+        row = self.cursor.fetchone()
+        if row is None or row[0] is None or 'collate' in row[0].lower():
+            return [None] * len(self.key_cols)
+        self.cursor.execute('pragma table_info({})'.format(self.table))
+        types = dict([(r[1].lower(), (r[2] or '').upper()) for r in self.cursor.fetchall()])
+        key_types = []
+        for col in self.key_cols:
+            col_type = types.get(col.lower(), '')
+            if 'INT' in col_type:
+                key_types.append(int)
+            elif any([x in col_type for x in ('CHAR', 'CLOB', 'TEXT')]):
+                key_types.append(str)
+            else:
+                key_types.append(None)
+        return key_types
+
+    def is_plain (self, key):
+        return all([type(x) is t for x, t in zip(key, self.key_types)])
+
+    def preload (self):
+        self.preloaded = {}
+        nkey = len(self.key_cols)
+        self.cursor.execute('select {} from {}'.format(', '.join(self.key_cols + self.columns), self.table))
+        for row in self.cursor:
+            key = tuple(row[:nkey])
+            # NULL, blob and other stored types never equal a plain key
+            if self.is_plain(key):
+                self.preloaded.setdefault(key, []).append(row[nkey:])
+
+    def connect (self, db_path, mode, mmap_size, cache_size):
+        self.conn = sqlite3.connect('file:{}?{}'.format(pathname2url(db_path), mode), uri=True)
+        self.conn.execute('pragma query_only=1')
+        self.conn.execute('pragma mmap_size={}'.format(mmap_size))
+        self.conn.execute('pragma cache_size={}'.format(cache_size))
+        self.conn.execute('pragma temp_store=memory')
+        self.cursor = self.conn.cursor()
+
+    def fetchall (self, *key):
+        if self.preloaded is not None and self.is_plain(key):
+            return self.preloaded.get(key, [])
+        self.cursor.execute(self.query, key)
+        return self.cursor.fetchall()
+
+    def fetchone (self, *key):
+        rows = self.fetchall(*key)
+        if rows:
+            return rows[0]
+        else:
+            return None
+
+    def close (self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            self.cursor = None
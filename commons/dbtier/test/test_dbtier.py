@@ -0,0 +1,96 @@
+"""
+Tests that dbtier lookups return the rows of the per-key query in each
+tier. Run with
+
+    python -m pytest commons/dbtier/test
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import logging
+import unittest
+import importlib.util
+
+def load_dbtier():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'dbtier.py')
+    spec = importlib.util.spec_from_file_location('dbtier', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class Annotator(object):
+    def __init__(self, create, db_path):
+        self.dbconn = sqlite3.connect(db_path)
+        self.dbconn.execute(create)
+        rows = [('TP53', 'a'), ('tp53', 'b'), ('TP53', 'c'), (None, 'd'), ('12', 'e'), (12, 'f'), ('1.5', 'g'), (b'TP53', 'h')]
+        self.dbconn.executemany('insert into genes values (?, ?)', rows)
+        self.dbconn.commit()
+        self.logger = logging.getLogger('dbtier_test')
+
+class DbTierTest(unittest.TestCase):
+    keys = ['TP53', 'tp53', 'BRCA1', None, '12', 12, 12.0, 1.5, '1.5', b'TP53']
+
+    def setUp(self):
+        self.module = load_dbtier()
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def check(self, create, tier, available=8 * 1024 ** 3, db_name='genes.sqlite'):
+        self.module.available_memory = lambda: available
+        annotator = Annotator(create, os.path.join(self.work_dir, db_name))
+        with self.assertLogs('dbtier_test', level='INFO') as logs:
+            table = self.module.TieredTable(annotator, 'genes', ['gname'], ['acc'])
+        self.assertEqual(table.tier, tier)
+        self.assertIn('genes db tier: {}'.format(tier), logs.output[0])
+        self.assertEqual(table.preloaded is not None, tier == 'memory')
+        cursor = annotator.dbconn.cursor()
+        for key in self.keys:
+            cursor.execute('select acc from genes where gname=?', (key,))
+            self.assertEqual(table.fetchall(key), cursor.fetchall(), repr(key))
+        self.assertEqual(table.fetchone('BRCA1'), None)
+        # The annotator's connection is left as it was
+        self.assertEqual(annotator.dbconn.execute('pragma query_only').fetchone()[0], 0)
+        table.close()
+        self.assertIsNone(table.conn)
+        annotator.dbconn.close()
+        return table
+
+    def test_text(self):
+        self.check('create table genes (gname text, acc text)', 'memory')
+
+    def test_varchar(self):
+        self.check('create table genes (gname varchar(20), acc text)', 'memory')
+
+    def test_integer(self):
+        self.check('create table genes (gname integer, acc text)', 'memory')
+
+    def test_collate_nocase(self):
+        # Keys SQLite compares with its own rules are not held in a dict
+        self.check('create table genes (gname text collate nocase, acc text)', 'mmap')
+
+    def test_real(self):
+        self.check('create table genes (gname real, acc text)', 'mmap')
+
+    def test_no_type(self):
+        self.check('create table genes (gname, acc)', 'mmap')
+
+    def test_mmap(self):
+        # Too large for 1/16 of available memory, small enough for 1/4.
+        # The path needs quoting in a URI.
+        self.check('create table genes (gname text, acc text)', 'mmap', available=100000, db_name='genes #1?.sqlite')
+
+    def test_disk(self):
+        self.check('create table genes (gname text, acc text)', 'disk', available=10000, db_name='genes #1?.sqlite')
+
+    def test_in_memory_database(self):
+        self.module.available_memory = lambda: 8 * 1024 ** 3
+        annotator = Annotator('create table genes (gname text, acc text)', ':memory:')
+        table = self.module.TieredTable(annotator, 'genes', ['gname'], ['acc'])
+        self.assertEqual(table.tier, 'disk')
+        self.assertEqual(table.fetchall('TP53'), [('a',), ('c',)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import json
+import sqlite3
+import argparse
+import numpy as np
+from urllib.request import pathname2url
+from cravat import BaseCommonModule
+
+alt_slots = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def open (self, score_dir):
+        if not os.path.exists(os.path.join(score_dir, 'index.json')):
+            return None
+        return DenseScores(score_dir)
+
+class DenseScores (object):
+    """
+    Per-base scores converted from an annotator's per-chromosome SQLite
+    tables into fixed-width arrays, opened with mmap.
+
+    Chromosomes where most of the position range has a score are stored
+    densely and read by offset from the first position. Sparse ones keep
+    a sorted key array next to the values and are read by binary search.
+    Scores keyed by alt base have one slot per A, C, G and T. NULL is
+    stored as NaN and read back as None.
+    """
+
+    def __init__ (self, score_dir):
+        with open(os.path.join(score_dir, 'index.json')) as f:
+            index = json.load(f)
+        self.columns = index['columns']
+        self.by_alt = index['by_alt']
+        self.nslot = 4 if self.by_alt else 1
+        ncol = len(self.columns)
+        dtype = np.dtype(index['dtype'])
+        self.chroms = {}
+        for chrom, info in index['chroms'].items():
+            val_path = os.path.join(score_dir, chrom + '.val')
+            if info['layout'] == 'dense':
+                vals = np.memmap(val_path, dtype=dtype, mode='r', shape=(info['n'], self.nslot, ncol))
+                keys = None
+            else:
+                vals = np.memmap(val_path, dtype=dtype, mode='r', shape=(info['n'], ncol))
+                keys = np.memmap(os.path.join(score_dir, chrom + '.key'), dtype=np.uint64, mode='r', shape=(info['n'],))
+            # Plain ndarray views index faster than memmap objects
+            self.chroms[chrom] = (info['start'], info['n'], None if keys is None else keys.view(np.ndarray), vals.view(np.ndarray))
+
+    def has_alt (self, alt):
+        return not self.by_alt or alt in alt_slots
+
+    def get (self, chrom, pos, alt=None):
+        entry = self.chroms.get(chrom)
+        if entry is None:
+            return None
+        start, n, keys, vals = entry
+        slot = alt_slots[alt] if self.by_alt else 0
+        if keys is None:
+            i = pos - start
+            if i < 0 or i >= n:
+                return None
+            row = vals[i, slot].tolist()
+        else:
+            key = pos * self.nslot + slot
+            i = int(keys.searchsorted(np.uint64(key)))
+            if i == n or keys[i] != key:
+                return None
+            row = vals[i].tolist()
+        # NaN, for NULL, is the only value not equal to itself
+        row = tuple([None if v != v else v for v in row])
+        if row.count(None) == len(row):
+            return None
+        return row
+
+def write_sparse (cursor, by_alt, key_path, val_path, dtype, batch_size=100000):
+    # Writes the rows of a cursor sorted by pos and alt as a sorted key
+    # array and a value array, a batch at a time. The first row of a key
+    # is kept. Returns the number of keys.
+    nslot = 4 if by_alt else 1
+    n = 0
+    last_key = None
+    with open(key_path, 'wb') as key_f, open(val_path, 'wb') as val_f:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            keys = []
+            vals = []
+            for row in rows:
+                if by_alt and row[1] not in alt_slots:
+                    continue
+                key = row[0] * nslot + (alt_slots[row[1]] if by_alt else 0)
+                if key == last_key:
+                    continue
+                last_key = key
+                keys.append(key)
+                vals.append([np.nan if v is None else float(v) for v in row[2:]])
+            if keys:
+                np.array(keys, dtype=np.uint64).tofile(key_f)
+                np.array(vals, dtype=dtype).tofile(val_f)
+                n += len(keys)
+    return n
+
+def build (db_path, score_dir, columns, by_alt=True, dtype='f8', dense_fraction=0.25, batch_size=1000000):
+    os.makedirs(score_dir, exist_ok=True)
+    nslot = 4 if by_alt else 1
+    ncol = len(columns)
+    conn = sqlite3.connect('file:{}?mode=ro'.format(pathname2url(db_path)), uri=True)
+    cursor = conn.cursor()
+    cursor.execute('select name from sqlite_master where type="table"')
+    tables = [r[0] for r in cursor.fetchall()]
+    index = {'columns': columns, 'by_alt': by_alt, 'dtype': np.dtype(dtype).str, 'chroms': {}}
+    for chrom in tables:
+        cursor.execute('pragma table_info({})'.format(chrom))
+        table_cols = {r[1] for r in cursor.fetchall()}
+        if 'pos' not in table_cols or not set(columns) <= table_cols:
+            continue
+        # Rows come sorted by key, with the first row of a key by rowid
+        # first, so a chromosome is never held in memory
+        if by_alt:
+            q = 'select pos, alt, {} from {} where pos is not null order by pos, alt, rowid'
+        else:
+            q = 'select pos, 0, {} from {} where pos is not null order by pos, rowid'
+        cursor.execute(q.format(', '.join(columns), chrom))
+        key_path = os.path.join(score_dir, chrom + '.key')
+        val_path = os.path.join(score_dir, chrom + '.val')
+        n = write_sparse(cursor, by_alt, key_path, val_path, dtype)
+        if n == 0:
+            os.remove(key_path)
+            os.remove(val_path)
+            continue
+        keys = np.memmap(key_path, dtype=np.uint64, mode='r', shape=(n,))
+        start = int(keys[0]) // nslot
+        span = int(keys[-1]) // nslot - start + 1
+        if n >= dense_fraction * span * nslot:
+            # Scattered into a dense array a batch of keys at a time
+            sparse_vals = np.memmap(val_path, dtype=dtype, mode='r', shape=(n, ncol))
+            dense_path = os.path.join(score_dir, chrom + '.dense')
+            vals = np.memmap(dense_path, dtype=dtype, mode='w+', shape=(span, nslot, ncol))
+            vals[:] = np.nan
+            for i in range(0, n, batch_size):
+                batch = keys[i:i + batch_size]
+                vals[batch // np.uint64(nslot) - np.uint64(start), batch % np.uint64(nslot)] = sparse_vals[i:i + batch_size]
+            vals.flush()
+            del vals, sparse_vals, keys
+            os.remove(key_path)
+            os.replace(dense_path, val_path)
+            index['chroms'][chrom] = {'layout': 'dense', 'start': start, 'n': span}
+        else:
+            del keys
+            index['chroms'][chrom] = {'layout': 'sparse', 'start': start, 'n': n}
+    conn.close()
+    # The index is written last so a partial build is never opened
+    with open(os.path.join(score_dir, 'index.json'), 'w') as f:
+        json.dump(index, f)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert per-chromosome SQLite scores to mmap arrays')
+    parser.add_argument('db_path')
+    parser.add_argument('score_dir')
+    parser.add_argument('columns', nargs='+')
+    parser.add_argument('--no-alt', dest='by_alt', action='store_false', help='scores do not depend on the alt base')
+    parser.add_argument('--dtype', default='f8', help='value type, e.g. f4 or f2 to quantize')
+    args = parser.parse_args()
+    build(args.db_path, args.score_dir, args.columns, by_alt=args.by_alt, dtype=args.dtype)
@@ -0,0 +1,104 @@
+"""
+Benchmark of densescores on a synthetic phyloP-style database with a row
+for each alt of every base: build time and peak memory, array sizes next
+to the SQLite file, and lookups per second against the per-variant SQLite
+query. --module builds with other copies of densescores.py as well, e.g.
+an older version. Run from any directory, e.g.
+
+    python bench_densescores.py --length 2000000 --chroms 2
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import resource
+import tempfile
+import subprocess
+import importlib.util
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+columns = ['phylop100_vert', 'phylop100_vert_r', 'phylop30_mamm', 'phylop30_mamm_r', 'phylop17_primate', 'phylop17_primate_r']
+
+def load_module(path):
+    spec = importlib.util.spec_from_file_location('densescores', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_db(path, n_chroms, length, seed=1):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    for i in range(1, n_chroms + 1):
+        chrom = 'chr{}'.format(i)
+        conn.execute('create table {} (pos integer, alt text, {})'.format(chrom, ', '.join([c + ' real' for c in columns])))
+        def rows():
+            for pos in range(10001, 10001 + length):
+                ref = rng.choice('ACGT')
+                for alt in 'ACGT':
+                    if alt != ref:
+                        yield [pos, alt] + [round(rng.uniform(-5, 5), 3) for _ in columns]
+        conn.executemany('insert into {} values ({})'.format(chrom, ', '.join(['?'] * (len(columns) + 2))), rows())
+        conn.execute('create index {0}_idx on {0} (pos, alt)'.format(chrom))
+    conn.commit()
+    conn.close()
+
+def timed_build(module_path, db_path, score_dir, dtype):
+    # In a child process, so its peak RSS is its own
+    code = ('import sys, time, resource, importlib.util\n'
+        'spec = importlib.util.spec_from_file_location("densescores", sys.argv[1])\n'
+        'module = importlib.util.module_from_spec(spec)\n'
+        'spec.loader.exec_module(module)\n'
+        'start = time.perf_counter()\n'
+        'module.build(sys.argv[2], sys.argv[3], sys.argv[5:], dtype=sys.argv[4])\n'
+        'print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n')
+    out = subprocess.check_output([sys.executable, '-c', code, module_path, db_path, score_dir, dtype] + columns)
+    elapsed, rss = out.split()
+    return float(elapsed), int(rss) / 1024
+
+def dir_size(path):
+    return sum([os.path.getsize(os.path.join(path, x)) for x in os.listdir(path)])
+
+def main():
+    parser = argparse.ArgumentParser(description='densescores benchmark')
+    parser.add_argument('--length', type=int, default=2000000, help='bases per chromosome')
+    parser.add_argument('--chroms', type=int, default=2)
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--module', nargs='+', default=[os.path.join(test_dir, os.pardir, 'densescores.py')], help='densescores.py files to build with')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'phylop.sqlite')
+        make_db(db_path, args.chroms, args.length)
+        print('{} chromosomes x {} bases, {} rows, SQLite {:.0f} MB'.format(
+            args.chroms, args.length, args.chroms * args.length * 3, os.path.getsize(db_path) / 1e6))
+        for module_path in args.module:
+            for dtype in ('f8', 'f4'):
+                score_dir = os.path.join(work_dir, 'dense_' + dtype)
+                elapsed, rss = timed_build(module_path, db_path, score_dir, dtype)
+                print('build {:<3} {:<36} {:7.1f} s {:8.0f} MB peak RSS {:8.0f} MB arrays'.format(
+                    dtype, os.path.relpath(module_path)[-36:], elapsed, rss, dir_size(score_dir) / 1e6))
+        rng = random.Random(2)
+        queries = [('chr{}'.format(rng.randint(1, args.chroms)), 10001 + rng.randrange(args.length), rng.choice('ACGT')) for _ in range(args.lookups)]
+        queries.sort()
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        expected = []
+        for chrom, pos, alt in queries:
+            cursor.execute('select {} from {} where pos = ? and alt = ?'.format(', '.join(columns), chrom), (pos, alt))
+            expected.append(cursor.fetchone())
+        elapsed = time.perf_counter() - start
+        print('{:<46} {:7.2f} s {:10.0f} lookups/s'.format('SQLite query', elapsed, len(queries) / elapsed))
+        module = load_module(args.module[0])
+        for dtype in ('f8', 'f4'):
+            scores = module.DenseScores(os.path.join(work_dir, 'dense_' + dtype))
+            start = time.perf_counter()
+            got = [scores.get(chrom, pos, alt) for chrom, pos, alt in queries]
+            elapsed = time.perf_counter() - start
+            print('{:<46} {:7.2f} s {:10.0f} lookups/s'.format('densescores ' + dtype, elapsed, len(queries) / elapsed))
+            if dtype == 'f8':
+                print('same rows as SQLite: {}'.format(got == expected))
+
+if __name__ == '__main__':
+    sys.exit(main())
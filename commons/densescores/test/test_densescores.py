@@ -0,0 +1,102 @@
+"""
+Tests that densescores arrays return the row the per-variant SQLite
+query returns first. Run with
+
+    python -m pytest commons/densescores/test
+"""
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import importlib.util
+
+def load_densescores():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'densescores.py')
+    spec = importlib.util.spec_from_file_location('densescores', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_db(path, by_alt, seed=1):
+    # chr1 has a score at most positions and chr2 at few. Rows are
+    # inserted out of order, with repeated keys, NULL scores and alts that
+    # are not a single base.
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    rows = {}
+    for chrom, n, span in (('chr1', 3000, 1000), ('chr2', 300, 1000000)):
+        if by_alt:
+            conn.execute('create table {} (pos integer, ref text, alt text, s1 real, s2 real)'.format(chrom))
+        else:
+            conn.execute('create table {} (pos integer, s1 real, s2 real)'.format(chrom))
+        chrom_rows = []
+        for _ in range(n):
+            pos = 5000 + rng.randint(0, span)
+            s1 = None if rng.random() < 0.05 else rng.uniform(-10, 10)
+            s2 = rng.uniform(0, 1)
+            if by_alt:
+                chrom_rows.append((pos, 'N', rng.choice(['A', 'C', 'G', 'T', 'T', 'AT']), s1, s2))
+            else:
+                chrom_rows.append((pos, s1, s2))
+        rng.shuffle(chrom_rows)
+        conn.executemany('insert into {} values ({})'.format(chrom, ', '.join(['?'] * len(chrom_rows[0]))), chrom_rows)
+        rows[chrom] = chrom_rows
+    conn.commit()
+    conn.close()
+    return rows
+
+class DenseScoresTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.module = load_densescores()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def check(self, by_alt, dtype='f8', batch_size=1000000, db_name='scores.sqlite'):
+        db_path = os.path.join(self.work_dir, db_name)
+        rows = make_db(db_path, by_alt)
+        score_dir = os.path.join(self.work_dir, 'dense')
+        self.module.build(db_path, score_dir, ['s1', 's2'], by_alt=by_alt, dtype=dtype, batch_size=batch_size)
+        scores = self.module.DenseScores(score_dir)
+        self.assertEqual(dict([(c, scores.chroms[c][2] is None) for c in scores.chroms]), {'chr1': True, 'chr2': False})
+        conn = sqlite3.connect(db_path)
+        for chrom, chrom_rows in rows.items():
+            positions = set([r[0] for r in chrom_rows])
+            queries = [(pos + d, alt) for pos in positions for d in (-1, 0) for alt in (['A', 'C', 'G', 'T'] if by_alt else [None])]
+            for pos, alt in queries:
+                if by_alt:
+                    q = conn.execute('select s1, s2 from {} where pos=? and alt=? order by rowid'.format(chrom), (pos, alt))
+                else:
+                    q = conn.execute('select s1, s2 from {} where pos=? order by rowid'.format(chrom), (pos,))
+                row = q.fetchone()
+                got = scores.get(chrom, pos, alt)
+                if row is None or all([v is None for v in row]):
+                    self.assertIsNone(got, (chrom, pos, alt))
+                else:
+                    expected = [None if v is None else float(self.module.np.array(v, dtype=dtype)) for v in row]
+                    self.assertEqual(list(got), expected, (chrom, pos, alt))
+        self.assertIsNone(scores.get('chr3', 5000, 'A' if by_alt else None))
+        conn.close()
+
+    def test_by_alt(self):
+        self.check(True)
+
+    def test_no_alt(self):
+        self.check(False)
+
+    def test_quantized(self):
+        self.check(True, dtype='f4')
+
+    def test_small_batches(self):
+        # Dense arrays filled a few keys at a time
+        self.check(True, batch_size=7)
+
+    def test_uri_characters(self):
+        # The database is opened read-only through a file: URI
+        self.check(False, db_name='scores #1?.sqlite')
+
+if __name__ == '__main__':
+    unittest.main()
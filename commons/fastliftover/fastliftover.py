@@ -0,0 +1,208 @@
+import gzip
+import numpy as np
+from cravat import BaseCommonModule
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def open (self, chain_path):
+        return ChainLiftOver(chain_path)
+
+    def batch (self, chain_path):
+        return LiftOverBatch(ChainLiftOver(chain_path))
+
+class ChainLiftOver (object):
+    """
+    liftOver with a UCSC .over.chain file, giving the same results as
+    pyliftover's LiftOver.convert_coordinate.
+
+    The chain blocks of each source chromosome are kept as NumPy arrays
+    sorted by start, with the running maximum of block ends. A position's
+    block is found by binary search, and positions with no earlier block
+    reaching past them (nearly all of them) are converted in one
+    vectorized step by convert_many. The rest walk back through the
+    overlapping blocks one position at a time. Results are lists of
+    (target chrom, target pos, target strand, chain score), best score
+    first, and None for a chromosome the chain file does not cover.
+    Chains of equal score come in the order pyliftover's interval tree
+    gives them (see tree_order). Positions are 0-based.
+    """
+
+    def __init__ (self, chain_path):
+        opener = gzip.open if chain_path.lower().endswith('.gz') else open
+        target_names = []
+        target_sizes = []
+        target_minus = []
+        scores = []
+        blocks = {}
+        source_sizes = {}
+        with opener(chain_path, 'rt') as f:
+            for line in f:
+                if not line.startswith('chain'):
+                    continue
+                fields = line.split()
+                chain_id = len(scores)
+                scores.append(int(fields[1]))
+                source_name = fields[2]
+                source_sizes.setdefault(source_name, int(fields[3]))
+                target_names.append(fields[7])
+                target_sizes.append(int(fields[8]))
+                target_minus.append(fields[9] == '-')
+                sfrom, tfrom = int(fields[5]), int(fields[10])
+                chrom_blocks = blocks.setdefault(source_name, [])
+                while True:
+                    fields = f.readline().split()
+                    size = int(fields[0])
+                    if size > 0:
+                        chrom_blocks.append((sfrom, sfrom + size, tfrom, chain_id, len(chrom_blocks)))
+                    if len(fields) != 3:
+                        break
+                    sfrom += size + int(fields[1])
+                    tfrom += size + int(fields[2])
+        self.target_names = target_names
+        self.target_sizes = np.array(target_sizes, dtype=np.int64)
+        self.target_minus = np.array(target_minus, dtype=bool)
+        self.scores = scores
+        self.source_sizes = source_sizes
+        self.chroms = {}
+        # File order of each chromosome's blocks, for tree_order
+        self.block_orders = {}
+        for chrom, chrom_blocks in blocks.items():
+            a = np.array(chrom_blocks, dtype=np.int64).reshape(-1, 5)
+            a = a[np.argsort(a[:, 0], kind='stable')]
+            self.chroms[chrom] = (a[:, 0].copy(), a[:, 1].copy(), np.maximum.accumulate(a[:, 1]), a[:, 2].copy(), a[:, 3].copy())
+            self.block_orders[chrom] = a[:, 4].copy()
+
+    def result (self, chain_id, position, strand):
+        minus = self.target_minus[chain_id]
+        if minus:
+            position = int(self.target_sizes[chain_id]) - 1 - position
+        if strand == '+':
+            target_strand = '-' if minus else '+'
+        else:
+            target_strand = '+' if minus else '-'
+        return (self.target_names[chain_id], position, target_strand, self.scores[chain_id])
+
+    def convert_coordinate (self, chrom, position, strand='+'):
+        blocks = self.chroms.get(chrom)
+        if blocks is None:
+            return None
+        starts, ends, max_ends, tstarts, chain_ids = blocks
+        hits = []
+        i = int(np.searchsorted(starts, position, side='right')) - 1
+        while i >= 0 and max_ends[i] > position:
+            if ends[i] > position:
+                hits.append(i)
+            i -= 1
+        hits.reverse()
+        if len(set([self.scores[chain_ids[i]] for i in hits])) < len(hits):
+            hits = self.tree_order(chrom, position, hits)
+        results = [self.result(int(chain_ids[i]), int(tstarts[i] + position - starts[i]), strand) for i in hits]
+        results.sort(key=lambda r: r[3], reverse=True)
+        return results
+
+    def tree_order (self, chrom, position, hits):
+        """
+        The blocks hits, holding position, in the order pyliftover's
+        IntervalTree.query returns them, which its stable sort by score
+        keeps for chains of equal score.
+
+        The tree of a chromosome spans [0, source size). A node holds the
+        blocks reaching across its center, blocks wholly before it go to
+        its left subtree and those wholly after it to its right one. A
+        node with a single block in its subtree holds that block as it
+        is. At a node whose center is past the position, the left
+        subtree's blocks come first, then the node's by start. Otherwise
+        the node's come first by end, longest first, then the right
+        subtree's. Ties keep the chain file's order. Only the nodes on
+        the position's path are visited.
+        """
+        starts, ends = self.chroms[chrom][:2]
+        orders = self.block_orders[chrom]
+        # Bounds of the blocks in the current node's subtree: start past
+        # low and end up to high
+        low, high = -1, np.inf
+        node_min, node_max = 0, self.source_sizes[chrom]
+        before = []
+        after = []
+        remaining = list(hits)
+        while remaining:
+            center = (node_min + node_max) / 2
+            if len(remaining) == 1 and np.count_nonzero((starts > low) & (ends <= high)) == 1:
+                before.append(remaining)
+                break
+            here = [i for i in remaining if ends[i] > center and starts[i] <= center]
+            remaining = [i for i in remaining if not (ends[i] > center and starts[i] <= center)]
+            if position < center:
+                after.append(sorted(here, key=lambda i: (starts[i], orders[i])))
+                high = node_max = center
+            else:
+                before.append(sorted(here, key=lambda i: (-ends[i], orders[i])))
+                low = node_min = center
+        return [i for node in before + after[::-1] for i in node]
+
+    def convert_many (self, chrom, positions, strand='+'):
+        blocks = self.chroms.get(chrom)
+        if blocks is None:
+            return None
+        starts, ends, max_ends, tstarts, chain_ids = blocks
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(starts) == 0:
+            return [[] for _ in range(len(positions))]
+        idx = np.searchsorted(starts, positions, side='right') - 1
+        found = idx >= 0
+        idx = np.where(found, idx, 0)
+        hit = found & (ends[idx] > positions)
+        # An earlier block reaching past the position means more than one
+        # block may hold it
+        several = found & (idx > 0) & (max_ends[np.maximum(idx - 1, 0)] > positions)
+        single = hit & ~several
+        cids = chain_ids[idx]
+        target_pos = tstarts[idx] + positions - starts[idx]
+        minus = self.target_minus[cids]
+        target_pos = np.where(minus, self.target_sizes[cids] - 1 - target_pos, target_pos)
+        if strand == '+':
+            target_strands = np.where(minus, '-', '+')
+        else:
+            target_strands = np.where(minus, '+', '-')
+        out = []
+        for position, is_single, is_several, cid, tpos, tstrand in zip(positions.tolist(), single.tolist(),
+                several.tolist(), cids.tolist(), target_pos.tolist(), target_strands.tolist()):
+            if is_several:
+                out.append(self.convert_coordinate(chrom, position, strand))
+            elif is_single:
+                out.append([(self.target_names[cid], tpos, tstrand, self.scores[cid])])
+            else:
+                out.append([])
+        return out
+
+class LiftOverBatch (object):
+    """
+    convert_coordinate for an annotator's input, lifting each batch of
+    BaseAnnotator's get_batched_input with convert_many when the
+    annotator's annotate_batch passes it to load. Positions outside the
+    current batch are lifted one at a time and leave the batch loaded.
+    """
+
+    def __init__ (self, lifter):
+        self.lifter = lifter
+        self.lifted = {}
+
+    def convert_coordinate (self, chrom, position):
+        key = (chrom, position)
+        if key in self.lifted:
+            return self.lifted[key]
+        return self.lifter.convert_coordinate(chrom, position)
+
+    def load (self, batch_input):
+        self.lifted = {}
+        positions_by_chrom = {}
+        for _, _, input_data, _ in batch_input:
+            positions_by_chrom.setdefault(input_data['chrom'], set()).add(input_data['pos'] - 1)
+        for chrom, positions in positions_by_chrom.items():
+            positions = sorted(positions)
+            results = self.lifter.convert_many(chrom, positions)
+            if results is None:
+                results = [None] * len(positions)
+            self.lifted.update(zip([(chrom, p) for p in positions], results))
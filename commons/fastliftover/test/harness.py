@@ -0,0 +1,95 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'test'))
+import testutil
+
+def load_fastliftover():
+    return testutil.load_common('fastliftover')
+
+source_sizes = {'chr1': 3000000, 'chr2': 2000000, 'chr3': 1000000}
+target_sizes = {'chr1': 3100000, 'chr2': 2200000, 'chr5': 1500000, 'chr1_alt': 400000}
+
+def write_chain(path, n_chains=60, tie_rate=0.3, seed=1):
+    # A chain file with chains on both target strands, some of them
+    # overlapping others on the source. A share of the chains take the
+    # score and source chromosome of an earlier chain and start inside
+    # it, so positions they share have chains of equal score. Returns the
+    # (source chrom, start, end) of the blocks.
+    rng = random.Random(seed)
+    scores = rng.sample(range(1000, 10 ** 9), n_chains)
+    written = []
+    blocks = []
+    with open(path, 'w') as f:
+        for chain_id in range(n_chains):
+            score = scores[chain_id]
+            tname = rng.choice(sorted(source_sizes))
+            qname = rng.choice(sorted(target_sizes))
+            tsize = source_sizes[tname]
+            qsize = target_sizes[qname]
+            length = rng.randrange(10000, min(tsize, qsize) // 3)
+            tstart = rng.randrange(0, tsize - length)
+            if written and rng.random() < tie_rate:
+                score, tname, start, end = rng.choice(written)
+                tsize = source_sizes[tname]
+                length = min(length, tsize // 3)
+                tstart = min(rng.randrange(start, end), tsize - length - 1)
+            qstart = rng.randrange(0, qsize - length)
+            lines = []
+            t, q = tstart, qstart
+            while True:
+                size = rng.randrange(1, 5000)
+                if t + size > tstart + length:
+                    lines.append([size])
+                    blocks.append((tname, t, t + size))
+                    t += size
+                    q += size
+                    break
+                dt = rng.choice([0, rng.randrange(1, 300)])
+                dq = rng.choice([0, rng.randrange(1, 300)]) if dt else rng.randrange(1, 300)
+                lines.append([size, dt, dq])
+                blocks.append((tname, t, t + size))
+                t += size + dt
+                q += size + dq
+            if q > qsize:
+                continue
+            qstrand = rng.choice('+-')
+            f.write('chain {} {} {} + {} {} {} {} {} {} {} {}\n'.format(
+                score, tname, tsize, tstart, t, qname, qsize, qstrand, qstart, q, chain_id + 1))
+            written.append((score, tname, tstart, t))
+            for line in lines:
+                f.write('\t'.join([str(x) for x in line]) + '\n')
+            f.write('\n')
+    return blocks
+
+def random_positions(n, blocks, seed=2):
+    # (chrom, 0-based position) pairs: anywhere on the chromosomes, on the
+    # first and last base of blocks and just outside them, and on a
+    # chromosome the chain file does not cover
+    rng = random.Random(seed)
+    chroms = sorted(source_sizes)
+    positions = []
+    while len(positions) < n:
+        r = rng.random()
+        if r < 0.6:
+            chrom = rng.choice(chroms)
+            positions.append((chrom, rng.randrange(0, source_sizes[chrom])))
+        elif r < 0.98:
+            chrom, start, end = rng.choice(blocks)
+            positions.append((chrom, rng.choice([start - 1, start, end - 1, end])))
+        else:
+            positions.append(('chrY', rng.randrange(0, 1000000)))
+    return positions
+
+def batches(positions, batch_size):
+    # Batches of (chrom, 0-based position) pairs, as BaseAnnotator's
+    # get_batched_input gives (lnum, line, input_data, secondary_data)
+    batch = []
+    for uid, (chrom, position) in enumerate(positions):
+        input_data = {'uid': uid, 'chrom': chrom, 'pos': position + 1, 'ref_base': 'A', 'alt_base': 'C'}
+        batch.append((uid + 1, '', input_data, {}))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    yield batch
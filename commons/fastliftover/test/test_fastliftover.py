@@ -0,0 +1,88 @@
+"""
+Tests that fastliftover lifts positions as pyliftover does, one at a time,
+in batches and a batch of an annotator's input at a time. Run with
+
+    python -m pytest commons/fastliftover/test
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pyliftover import LiftOver
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+
+class FastLiftOverTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.module = harness.load_fastliftover()
+        cls.work_dir = tempfile.mkdtemp()
+        cls.chain_path = os.path.join(cls.work_dir, 'test.over.chain')
+        cls.blocks = harness.write_chain(cls.chain_path)
+        cls.pyliftover = LiftOver(cls.chain_path)
+        cls.lifter = cls.module.ChainLiftOver(cls.chain_path)
+        cls.positions = harness.random_positions(60000, cls.blocks)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.work_dir)
+
+    def test_chains(self):
+        # Both target strands, and positions several chains hold
+        with open(self.chain_path) as f:
+            strands = set([l.split()[9] for l in f if l.startswith('chain')])
+        self.assertEqual(strands, {'+', '-'})
+        several = [self.pyliftover.convert_coordinate(*p) for p in self.positions[:5000]]
+        several = [r for r in several if r and len(r) > 1]
+        self.assertGreater(len(several), 100)
+        # and positions chains of equal score hold, which pyliftover gives
+        # in the order of its interval tree
+        ties = [r for r in several if len(set([x[3] for x in r])) < len(r)]
+        self.assertGreater(len(ties), 50)
+
+    def test_convert_coordinate(self):
+        for chrom, position in self.positions:
+            for strand in ('+', '-'):
+                self.assertEqual(self.lifter.convert_coordinate(chrom, position, strand),
+                    self.pyliftover.convert_coordinate(chrom, position, strand), (chrom, position, strand))
+
+    def test_convert_many(self):
+        by_chrom = {}
+        for chrom, position in self.positions:
+            by_chrom.setdefault(chrom, []).append(position)
+        for chrom, positions in by_chrom.items():
+            for strand in ('+', '-'):
+                expected = [self.pyliftover.convert_coordinate(chrom, p, strand) for p in positions]
+                results = self.lifter.convert_many(chrom, positions, strand)
+                if chrom == 'chrY':
+                    self.assertIsNone(results)
+                else:
+                    self.assertEqual(results, expected)
+
+    def test_batch(self):
+        batch = self.module.LiftOverBatch(self.lifter)
+        n_lifted = 0
+        for batch_input in harness.batches(self.positions, 7000):
+            batch.load(batch_input)
+            for _, _, input_data, _ in batch_input:
+                chrom, position = input_data['chrom'], input_data['pos'] - 1
+                self.assertEqual(batch.convert_coordinate(chrom, position), self.pyliftover.convert_coordinate(chrom, position))
+                n_lifted += 1
+        self.assertEqual(n_lifted, len(self.positions))
+        # Lifted a batch at a time, and one at a time past the batch, which
+        # stays loaded
+        last = batch_input[0][2]
+        self.assertIn((last['chrom'], last['pos'] - 1), batch.lifted)
+        self.assertEqual(batch.convert_coordinate('chr1', 12345), self.pyliftover.convert_coordinate('chr1', 12345))
+        self.assertNotIn(('chr1', 12345), batch.lifted)
+        self.assertEqual(len(batch.lifted), len(set([(c, p) for c, p in self.positions[-(len(self.positions) % 7000):]])))
+        # and one at a time with no batch loaded, as in live annotation
+        batch = self.module.LiftOverBatch(self.lifter)
+        for chrom, position in self.positions[:1000]:
+            self.assertEqual(batch.convert_coordinate(chrom, position), self.pyliftover.convert_coordinate(chrom, position))
+
+if __name__ == '__main__':
+    unittest.main()
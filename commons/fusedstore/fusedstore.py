@@ -0,0 +1,275 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import importlib.util
+from urllib.request import pathname2url
+import yaml
+from cravat import BaseAnnotator
+from cravat import BaseCommonModule
+import cravat.admin_util as au
+
+class FusedAnnotator (BaseAnnotator):
+    """
+    A fused annotator, such as popfreq or dbnsfp_predictors, whose output
+    is its sources' output from its store. The module's CravatAnnotator
+    subclasses this, as get_module('fusedstore').FusedAnnotator. include,
+    a list or comma-separated string in the module's conf, limits the
+    sources to those named.
+    """
+
+    def setup (self):
+        include = self.conf.get('include')
+        if isinstance(include, str):
+            include = [v.strip() for v in include.split(',') if v.strip()]
+        self.store = FusedStore(self.dbconn, self.conf['sources'], include=include, logger=self.logger)
+
+    def annotate (self, input_data):
+        out = self.store.annotate(input_data)
+        if out:
+            return out
+
+    def cleanup (self):
+        pass
+
+class CravatCommonModule (BaseCommonModule):
+    FusedAnnotator = FusedAnnotator
+
+    def setup (self):
+        pass
+
+    def open (self, annotator, include=None):
+        return FusedStore(annotator.dbconn, annotator.conf['sources'], include=include, logger=annotator.logger)
+
+    def source_db_path (self, name, db_name=None):
+        return source_db_path(name, db_name=db_name)
+
+    def merge_sources (self, store_path, sources, tables, indexes, copy_source):
+        return merge_sources(store_path, sources, tables, indexes, copy_source)
+
+    def copy_rows (self, cursor, store, insert, convert, batch_size=100000):
+        return copy_rows(cursor, store, insert, convert, batch_size=batch_size)
+
+chrom_keys = {
+    'as_is': lambda chrom: chrom,
+    'lower': lambda chrom: chrom.lower(),
+    'lower_nochr': lambda chrom: chrom.lower().replace('chr', ''),
+}
+
+def annotator_class (script_path):
+    # The CravatAnnotator class of a source module, which must give the
+    # row-level interface FusedSource uses
+    name = os.path.splitext(os.path.basename(script_path))[0]
+    module_spec = importlib.util.spec_from_file_location(name, script_path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    cls = module.CravatAnnotator
+    if not hasattr(cls, 'row_columns') or not (hasattr(cls, 'annotate_row') or hasattr(cls, 'annotate_rows')):
+        raise Exception('{} has no row_columns and annotate_row or annotate_rows'.format(name))
+    return cls
+
+def load_annotator (name):
+    # None if the source module is not installed
+    module_info = au.get_local_module_info(name)
+    if module_info is None:
+        return None
+    return annotator_class(module_info.script_path)
+
+class FusedStore (object):
+    """
+    Reads several annotators' rows for a variant from one merged,
+    position-keyed database and turns them into each source annotator's
+    output.
+
+    The merged database (the fused annotator's data/<name>.sqlite) has one
+    variants table indexed by (chrom, pos), holding every source's rows as
+    JSON arrays of the source annotator's row_columns. It is built by
+    build() from the sources listed under `sources` in the fused
+    annotator's yml. A variant is looked up with one query, the rows are
+    split by source and matched on the source's key, and each source
+    annotator turns its rows into output with the same annotate_row (or
+    annotate_rows) its standalone annotate uses. A source in the store
+    whose module is no longer installed is left out, with a warning.
+    """
+
+    def __init__ (self, dbconn, sources, include=None, load=load_annotator, logger=None):
+        self.cursor = dbconn.cursor()
+        self.cursor.execute('select id, name, chroms from sources')
+        stored = {name: (sid, set(json.loads(chroms))) for sid, name, chroms in self.cursor.fetchall()}
+        self.sources = {}
+        for name, spec in sources.items():
+            if name not in stored or (include and name not in include):
+                continue
+            sid, chroms = stored[name]
+            cls = load(name)
+            if cls is None:
+                if logger is not None:
+                    logger.warning('{} is not installed. Its columns are left empty.'.format(name))
+                continue
+            self.sources[sid] = FusedSource(name, spec, chroms, cls)
+
+    def annotate (self, input_data):
+        chrom = input_data['chrom']
+        ref = input_data['ref_base']
+        alt = input_data['alt_base']
+        # A source has no rows, as when its standalone query fails, for
+        # chromosomes it has no table for
+        sources = {sid: s for sid, s in self.sources.items() if s.chrom_key(chrom) in s.chroms}
+        if not sources:
+            return {}
+        keys = sorted({s.chrom_key(chrom) for s in sources.values()})
+        q = 'select source, chrom, ref, alt, vals from variants where chrom in ({}) and pos=?'.format(
+            ', '.join(['?'] * len(keys)))
+        self.cursor.execute(q, keys + [input_data['pos']])
+        rows = {sid: [] for sid in sources}
+        for sid, row_chrom, row_ref, row_alt, vals in self.cursor:
+            source = sources.get(sid)
+            if source is not None and source.matches(chrom, ref, alt, row_chrom, row_ref, row_alt):
+                rows[sid].append(tuple(json.loads(vals)))
+        out = {}
+        for sid, source in sources.items():
+            source_out = source.annotate(input_data, rows[sid])
+            if source_out:
+                for k, v in source_out.items():
+                    out[source.name + '_' + k] = v
+        return out
+
+class FusedSource (object):
+    """
+    One source of a fused store. The source annotator's class gives the
+    columns its rows hold (row_columns) and turns them into output, from
+    the first row or None with annotate_row(input_data, row), or from
+    all rows with annotate_rows(input_data, rows). Both are static
+    methods, so no annotator of the source is set up.
+    """
+
+    def __init__ (self, name, spec, chroms, cls):
+        self.name = name
+        self.chrom_key = chrom_keys[spec.get('chrom', 'as_is')]
+        self.has_ref = spec.get('ref') is not None
+        self.chroms = chroms
+        self.annotate_row = getattr(cls, 'annotate_row', None)
+        self.annotate_rows = getattr(cls, 'annotate_rows', None)
+
+    def matches (self, chrom, ref, alt, row_chrom, row_ref, row_alt):
+        return row_chrom == self.chrom_key(chrom) and row_alt == alt and (not self.has_ref or row_ref == ref)
+
+    def annotate (self, input_data, rows):
+        if self.annotate_rows is not None:
+            return self.annotate_rows(input_data, rows)
+        if rows:
+            return self.annotate_row(input_data, rows[0])
+        else:
+            return self.annotate_row(input_data, None)
+
+def build (name, batch_size=100000):
+    module_info = au.get_local_module_info(name)
+    if module_info is None:
+        raise Exception('{} is not installed'.format(name))
+    module_dir = os.path.dirname(module_info.script_path)
+    with open(os.path.join(module_dir, name + '.yml')) as f:
+        conf = yaml.safe_load(f)
+    data_dir = os.path.join(module_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    sources = []
+    for source, spec in conf['sources'].items():
+        db_path = source_db_path(source, db_name=spec.get('db'))
+        if db_path is not None:
+            # source_db_path skips sources that are not installed
+            sources.append((source, spec, db_path, load_annotator(source).row_columns))
+    write_store(os.path.join(data_dir, name + '.sqlite'), sources, batch_size=batch_size)
+
+def write_store (store_path, sources, batch_size=100000):
+    # sources is a list of (name, spec, source database path, columns)
+    specs = dict([(source, (spec, columns)) for source, spec, _, columns in sources])
+    def copy_source (store, sid, source, conn):
+        spec, columns = specs[source]
+        chroms = set()
+        def convert (r):
+            chroms.add(r[0])
+            return (r[0], r[1], r[2], r[3], sid, json.dumps(r[4:]))
+        for table, chrom in source_tables(conn, spec):
+            chrom_col = spec['chrom_column'] if chrom is None else "'{}'".format(chrom)
+            cols = [chrom_col, spec['pos'], spec.get('ref') or 'null', spec['alt']] + columns
+            cursor = conn.execute('select {} from {}'.format(', '.join(cols), table))
+            copy_rows(cursor, store, 'insert into variants values (?, ?, ?, ?, ?, ?)', convert, batch_size=batch_size)
+        return (json.dumps(sorted(chroms)),)
+    merge_sources(store_path, [(source, db_path) for source, _, db_path, _ in sources],
+        ['create table sources (id integer primary key, name text, chroms text)',
+         'create table variants (chrom text, pos integer, ref text, alt text, source integer, vals text)'],
+        ['create index variants_idx on variants (chrom, pos)'],
+        copy_source)
+
+def source_db_path (name, db_name=None):
+    # The database of an installed source module, or None if the module
+    # or its data is not installed
+    source_info = au.get_local_module_info(name)
+    if source_info is None:
+        print('{} is not installed. Skipping.'.format(name))
+        return None
+    db_path = os.path.join(os.path.dirname(source_info.script_path), 'data', db_name or name + '.sqlite')
+    if not os.path.exists(db_path):
+        print('{} not found. Skipping.'.format(db_path))
+        return None
+    return db_path
+
+def merge_sources (store_path, sources, tables, indexes, copy_source):
+    """
+    Writes a store holding the rows of several source databases.
+
+    sources is a list of (name, database path) pairs. tables are the
+    statements creating the store's tables, the first of which is a
+    sources table starting with id and name columns. Each source is
+    opened read-only and copy_source(store, id, name, source connection)
+    copies its rows and returns the values of the rest of its sources
+    row. indexes are created once all sources are in. The store is
+    written next to store_path and moved there when done, so a failed
+    build leaves the old store in place.
+    """
+    part_path = store_path + '.part'
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    store = sqlite3.connect(part_path)
+    for statement in tables:
+        store.execute(statement)
+    for sid, (name, db_path) in enumerate(sources):
+        print('Adding {}'.format(name))
+        conn = sqlite3.connect('file:{}?mode=ro'.format(pathname2url(db_path)), uri=True)
+        values = (sid, name) + tuple(copy_source(store, sid, name, conn))
+        conn.close()
+        store.execute('insert into sources values ({})'.format(', '.join(['?'] * len(values))), values)
+        store.commit()
+    for statement in indexes:
+        store.execute(statement)
+    store.commit()
+    store.close()
+    os.replace(part_path, store_path)
+
+def copy_rows (cursor, store, insert, convert, batch_size=100000):
+    # Inserts convert(row) for each row of a source query, batch_size
+    # rows at a time
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        store.executemany(insert, [convert(r) for r in rows])
+
+def source_tables (conn, spec):
+    # (table, chrom) pairs of a source database. chrom is None when the
+    # chromosome is a column of the table.
+    if 'chrom_column' in spec:
+        return [(spec['table'], None)]
+    table_re = re.compile('^' + re.escape(spec.get('table', '{chrom}')).replace(re.escape('{chrom}'), '(chr.+)') + '$')
+    tables = []
+    for (table,) in conn.execute('select name from sqlite_master where type="table"'):
+        m = table_re.match(table)
+        if m:
+            tables.append((table, m.group(1)))
+    return tables
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python fusedstore.py <fused annotator name>')
+        sys.exit(1)
+    build(sys.argv[1])
@@ -0,0 +1,83 @@
+"""
+Benchmark of a fused annotator's lookups on synthetic source databases,
+against one query per source per variant as the source modules make on
+their own. Reports build time and size of the fused store and variants/s
+of both, cold (page cache dropped, needs root) with --cold. Run from any
+directory, e.g.
+
+    python bench_fusedstore.py --fused dbnsfp_predictors --dup-rate 0.1
+"""
+import gc
+import os
+import sys
+import time
+import hashlib
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+
+def drop_page_cache():
+    # Needs root. The databases are read from disk again by the next run.
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+def sample_queries(variants, n, hit_rate, seed=2):
+    rng = random.Random(seed)
+    misses = iter(harness.random_variants(n, seed=seed + 1))
+    queries = [rng.choice(variants) if rng.random() < hit_rate else next(misses) for _ in range(n)]
+    return sorted(queries)
+
+def run(annotate, queries):
+    # The outputs go into a digest, as an annotator writes them out
+    # instead of keeping them
+    digest = hashlib.md5()
+    start = time.perf_counter()
+    for variant in queries:
+        digest.update(repr(annotate(harness.input_data(variant))).encode())
+    return time.perf_counter() - start, digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='fusedstore benchmark')
+    parser.add_argument('--fused', default='popfreq', help='fused annotator whose sources are simulated')
+    parser.add_argument('--db-variants', type=int, default=1000000, help='variants the sources share out')
+    parser.add_argument('--variants', type=int, default=1000000, help='variants looked up')
+    parser.add_argument('--hit-rate', type=float, default=0.5)
+    parser.add_argument('--dup-rate', type=float, default=0.0, help='share of source keys with two rows')
+    parser.add_argument('--cold', action='store_true', help='drop the page cache before each run (needs root)')
+    args = parser.parse_args()
+    fusedstore = harness.load_fusedstore()
+    value = harness.values.get(args.fused, harness.default_value)
+    with tempfile.TemporaryDirectory() as work_dir:
+        variants = harness.random_variants(args.db_variants)
+        start = time.perf_counter()
+        store_path, standalone = harness.build_sources(fusedstore, args.fused, work_dir, variants,
+            value=value, dup_rate=args.dup_rate)
+        elapsed = time.perf_counter() - start
+        sources_size = sum([os.path.getsize(s.conn.execute('pragma database_list').fetchone()[2]) for s in standalone])
+        print('{} sources, {} variants: sources {:.0f} MB, fused store {:.0f} MB, {:.1f} s to build both'.format(
+            len(standalone), len(variants), sources_size / 1e6, os.path.getsize(store_path) / 1e6, elapsed))
+        queries = sample_queries(variants, args.variants, args.hit_rate)
+        # The variants would otherwise slow down every full collection of
+        # the garbage collector
+        del variants
+        gc.collect()
+        if args.cold:
+            drop_page_cache()
+        elapsed, expected = run(lambda data: harness.merged(standalone, data), queries)
+        print('{:<30} {:8.2f} s {:10.0f} variants/s'.format('query per source', elapsed, len(queries) / elapsed))
+        conn, store = harness.open_store(fusedstore, args.fused, store_path)
+        if args.cold:
+            drop_page_cache()
+        elapsed, results = run(store.annotate, queries)
+        print('{:<30} {:8.2f} s {:10.0f} variants/s, same output: {}'.format(
+            'fused store', elapsed, len(queries) / elapsed, results == expected))
+        conn.close()
+        for source in standalone:
+            source.conn.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
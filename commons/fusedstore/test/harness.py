@@ -0,0 +1,162 @@
+import os
+import sys
+import random
+import sqlite3
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'test'))
+import testutil
+from testutil import repo_dir, random_variants, input_data
+
+def load_fusedstore():
+    return testutil.load_common('fusedstore')
+
+def fused_sources(fused):
+    # The sources spec of a fused annotator in this repo
+    with open(os.path.join(repo_dir, 'annotators', fused, fused + '.yml')) as f:
+        return yaml.safe_load(f)['sources']
+
+def source_class(fusedstore, name):
+    return fusedstore.annotator_class(os.path.join(repo_dir, 'annotators', name, name + '.py'))
+
+def default_value(column, rng):
+    return round(rng.random(), 6)
+
+def popfreq_value(column, rng):
+    if column == 'total':
+        # alfa's total is 'allele number:alt allele count'
+        an = rng.randrange(1000, 100000)
+        return '{}:{}'.format(an, rng.randrange(0, an))
+    return default_value(column, rng)
+
+# Letters the dbNSFP predictors' prediction columns hold
+dbnsfp_letters = {
+    'hdiv_prediction': 'DPB', 'hvar_prediction': 'DPB', 'prediction': 'DNAP',
+    'lrt_pred': 'UDN', 'metalr_pred': 'TD', 'metasvm_pred': 'TD', 'fathmm_pred': 'DT',
+    'fathmm_mkl_coding_pred': 'DN', 'fitcons_coding_pred': 'HML',
+}
+
+def dbnsfp_value(column, rng):
+    if column in ('transcript', 'trans', 'uniprot', 'ens_tid', 'ens_pid'):
+        # One or more ids, ';'-separated
+        return ';'.join(['ID{:05d}'.format(rng.randrange(100000)) for _ in range(rng.choice([1, 1, 2, 3]))])
+    if column in ('hdiv_prediction', 'hvar_prediction'):
+        return ';'.join([rng.choice(dbnsfp_letters[column]) for _ in range(rng.choice([1, 2]))])
+    if column in dbnsfp_letters:
+        return rng.choice(dbnsfp_letters[column])
+    if column in ('model', 'fathmm_mkl_group'):
+        return rng.choice(['simple_aae', 'complex_aae', 'AEFI', 'without_aae'])
+    if column in ('pathogenic', 'seqs'):
+        return rng.randrange(2) if column == 'pathogenic' else rng.randrange(1, 200)
+    return default_value(column, rng)
+
+values = {'popfreq': popfreq_value, 'dbnsfp_predictors': dbnsfp_value}
+
+def make_source_db(path, spec, columns, variants, value=default_value, dup_rate=0.0, seed=1):
+    # A source database laid out as spec says, holding a row of the
+    # columns for each variant (two rows for dup_rate of them)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    chrom_key = chrom_keys(spec)
+    tables = {}
+    for chrom, pos, ref, alt in variants:
+        if 'chrom_column' in spec:
+            table = spec['table']
+            key_cols = [spec['chrom_column']]
+            key = [chrom_key(chrom)]
+        else:
+            table = spec.get('table', '{chrom}').format(chrom=chrom_key(chrom))
+            key_cols = []
+            key = []
+        key_cols += [spec['pos'], spec['alt']] + ([spec['ref']] if spec.get('ref') else [])
+        key += [pos, alt] + ([ref] if spec.get('ref') else [])
+        if table not in tables:
+            conn.execute('create table "{}" ({})'.format(table, ', '.join(key_cols + columns)))
+            conn.execute('create index "{}_idx" on "{}" ({})'.format(table, table, ', '.join(key_cols)))
+            tables[table] = 'insert into "{}" values ({})'.format(table, ', '.join(['?'] * (len(key_cols) + len(columns))))
+        for _ in range(2 if rng.random() < dup_rate else 1):
+            conn.execute(tables[table], key + [value(c, rng) for c in columns])
+    conn.commit()
+    conn.close()
+
+def chrom_keys(spec):
+    return {
+        'as_is': lambda chrom: chrom,
+        'lower': lambda chrom: chrom.lower(),
+        'lower_nochr': lambda chrom: chrom.lower().replace('chr', ''),
+    }[spec.get('chrom', 'as_is')]
+
+class Standalone(object):
+    """
+    Looks a variant up in one source database the way the source module
+    does on its own: one query for the variant, its rows handed to the
+    source's annotate_row or annotate_rows.
+    """
+
+    def __init__(self, name, spec, db_path, cls):
+        self.name = name
+        self.spec = spec
+        self.chrom_key = chrom_keys(spec)
+        self.cls = cls
+        self.conn = sqlite3.connect(db_path)
+        self.tables = {r[0] for r in self.conn.execute('select name from sqlite_master where type="table"')}
+        where = [spec['pos'] + '=?', spec['alt'] + '=?'] + ([spec['ref'] + '=?'] if spec.get('ref') else [])
+        if 'chrom_column' in spec:
+            where.append(spec['chrom_column'] + '=?')
+        self.query = 'select {} from "{{}}" where {}'.format(', '.join(cls.row_columns), ' and '.join(where))
+
+    def annotate(self, input_data):
+        chrom = self.chrom_key(input_data['chrom'])
+        args = [input_data['pos'], input_data['alt_base']] + ([input_data['ref_base']] if self.spec.get('ref') else [])
+        if 'chrom_column' in self.spec:
+            table = self.spec['table']
+            args.append(chrom)
+        else:
+            table = self.spec.get('table', '{chrom}').format(chrom=chrom)
+            if table not in self.tables:
+                return None
+        rows = self.conn.execute(self.query.format(table), args).fetchall()
+        if 'chrom_column' in self.spec and not rows:
+            # The fused store has nothing for chromosomes without rows
+            stored = self.conn.execute('select 1 from "{}" where {}=? limit 1'.format(table, self.spec['chrom_column']), (chrom,)).fetchone()
+            if stored is None:
+                return None
+        if hasattr(self.cls, 'annotate_rows'):
+            return self.cls.annotate_rows(input_data, rows)
+        return self.cls.annotate_row(input_data, rows[0] if rows else None)
+
+def build_sources(fusedstore, fused, work_dir, variants, value=default_value, dup_rate=0.0, share=0.6, seed=1):
+    # A synthetic database for each source of a fused annotator, each with
+    # a share of the variants, and the fused store built from them.
+    # Returns the store path and a Standalone for each source.
+    rng = random.Random(seed)
+    sources = []
+    standalone = []
+    for i, (name, spec) in enumerate(fused_sources(fused).items()):
+        cls = source_class(fusedstore, name)
+        db_path = os.path.join(work_dir, name + '.sqlite')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        subset = [v for v in variants if rng.random() < share]
+        make_source_db(db_path, spec, list(cls.row_columns), subset, value=value, dup_rate=dup_rate, seed=seed + i)
+        sources.append((name, spec, db_path, cls.row_columns))
+        standalone.append(Standalone(name, spec, db_path, cls))
+    store_path = os.path.join(work_dir, fused + '.sqlite')
+    fusedstore.write_store(store_path, sources)
+    return store_path, standalone
+
+def open_store(fusedstore, fused, store_path):
+    conn = sqlite3.connect(store_path)
+    store = fusedstore.FusedStore(conn, fused_sources(fused),
+        load=lambda name: source_class(fusedstore, name))
+    return conn, store
+
+def merged(standalone, data):
+    # The fused annotator's output from the standalone lookups
+    out = {}
+    for source in standalone:
+        source_out = source.annotate(data)
+        if source_out:
+            for k, v in source_out.items():
+                out[source.name + '_' + k] = v
+    return out
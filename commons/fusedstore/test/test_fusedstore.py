@@ -0,0 +1,151 @@
+"""
+Tests that a fused store gives, for every variant, the output its source
+modules give on their own. Run with
+
+    python -m pytest commons/fusedstore/test
+"""
+import os
+import sys
+import shutil
+import logging
+import sqlite3
+import tempfile
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+
+class FusedStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.module = harness.load_fusedstore()
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def check(self, fused, value=harness.default_value, dup_rate=0.0):
+        variants = harness.random_variants(2000)
+        store_path, standalone = harness.build_sources(self.module, fused, self.work_dir, variants,
+            value=value, dup_rate=dup_rate)
+        conn, store = harness.open_store(self.module, fused, store_path)
+        # Stored variants, variants no source has and a chromosome no
+        # source has
+        queries = variants[::3] + harness.random_variants(300, seed=2) + harness.random_variants(50, chroms=('chrY',), seed=3)
+        for variant in queries:
+            data = harness.input_data(variant)
+            self.assertEqual(store.annotate(data), harness.merged(standalone, data), variant)
+        conn.close()
+        return standalone
+
+    def test_popfreq(self):
+        standalone = self.check('popfreq', value=harness.popfreq_value)
+        self.assertEqual(len(standalone), 13)
+
+    def test_dbnsfp_predictors(self):
+        # Some keys have more rows than one, which the sources that take
+        # every row pick from
+        standalone = self.check('dbnsfp_predictors', value=harness.dbnsfp_value, dup_rate=0.2)
+        self.assertEqual(len(standalone), 15)
+
+    def test_include(self):
+        variants = harness.random_variants(200)
+        store_path, standalone = harness.build_sources(self.module, 'popfreq', self.work_dir, variants,
+            value=harness.popfreq_value)
+        conn, _ = harness.open_store(self.module, 'popfreq', store_path)
+        store = self.module.FusedStore(conn, harness.fused_sources('popfreq'), include=['gnomad3', 'hgdp'],
+            load=lambda name: harness.source_class(self.module, name))
+        included = [s for s in standalone if s.name in ('gnomad3', 'hgdp')]
+        for variant in variants:
+            data = harness.input_data(variant)
+            self.assertEqual(store.annotate(data), harness.merged(included, data))
+        conn.close()
+
+    def install(self, missing=()):
+        # Modules of this repo as admin_util finds installed ones, but for
+        # those in missing
+        def get_local_module_info(name):
+            if name in missing:
+                return None
+            return types.SimpleNamespace(script_path=os.path.join(harness.repo_dir, 'annotators', name, name + '.py'))
+        self.module.au = types.SimpleNamespace(get_local_module_info=get_local_module_info)
+
+    def test_uninstalled_source(self):
+        # A source in the store whose module is gone is left out with a
+        # warning, the others as before
+        variants = harness.random_variants(200)
+        store_path, standalone = harness.build_sources(self.module, 'popfreq', self.work_dir, variants,
+            value=harness.popfreq_value)
+        self.install(missing=['hgdp'])
+        conn = sqlite3.connect(store_path)
+        logger = logging.getLogger('test_fusedstore')
+        with self.assertLogs(logger, level='WARNING') as logs:
+            store = self.module.FusedStore(conn, harness.fused_sources('popfreq'), logger=logger)
+        self.assertEqual(logs.output, ['WARNING:test_fusedstore:hgdp is not installed. Its columns are left empty.'])
+        installed = [s for s in standalone if s.name != 'hgdp']
+        for variant in variants:
+            data = harness.input_data(variant)
+            self.assertEqual(store.annotate(data), harness.merged(installed, data))
+        conn.close()
+        self.install(missing=['popfreq'])
+        with self.assertRaisesRegex(Exception, 'popfreq is not installed'):
+            self.module.build('popfreq')
+
+    def test_fused_annotator(self):
+        # The CravatAnnotator of popfreq and dbnsfp_predictors, with an
+        # include string from the module's conf
+        variants = harness.random_variants(200)
+        store_path, standalone = harness.build_sources(self.module, 'popfreq', self.work_dir, variants,
+            value=harness.popfreq_value)
+        self.install()
+        annotator = self.module.FusedAnnotator.__new__(self.module.FusedAnnotator)
+        annotator.dbconn = sqlite3.connect(store_path)
+        annotator.conf = {'sources': harness.fused_sources('popfreq'), 'include': 'gnomad3, hgdp'}
+        annotator.logger = logging.getLogger('test_fusedstore')
+        annotator.setup()
+        included = [s for s in standalone if s.name in ('gnomad3', 'hgdp')]
+        for variant in variants:
+            data = harness.input_data(variant)
+            self.assertEqual(annotator.annotate(data), harness.merged(included, data) or None)
+        annotator.dbconn.close()
+
+    def test_merge_sources(self):
+        # A store keyed by rsID like haploreg's, from two sources, over a
+        # stale .part file
+        sources = []
+        for name, rows in (('pop_a', [(1, 2, 0.5), (1, 3, 0.9)]), ('pop_b', [(4, 1, 0.1)])):
+            db_path = os.path.join(self.work_dir, name + ' #1.sqlite')
+            conn = sqlite3.connect(db_path)
+            conn.execute('create table ld (qsnp integer, ldsnp integer, r2 real)')
+            conn.executemany('insert into ld values (?, ?, ?)', rows)
+            conn.commit()
+            conn.close()
+            sources.append((name, db_path))
+        store_path = os.path.join(self.work_dir, 'store.sqlite')
+        with open(store_path + '.part', 'w') as f:
+            f.write('stale')
+        tables = ['create table sources (id integer primary key, name text, n integer)',
+                  'create table ld (qsnp integer, source integer, ldsnp integer, r2 real)']
+        def copy_source(store, sid, name, conn):
+            self.module.copy_rows(conn.execute('select qsnp, ldsnp, r2 from ld'), store,
+                'insert into ld values (?, ?, ?, ?)', lambda r: (r[0], sid, r[1], r[2]), batch_size=1)
+            return (conn.execute('select count(*) from ld').fetchone()[0],)
+        self.module.merge_sources(store_path, sources, tables, ['create index ld_idx on ld (qsnp)'], copy_source)
+        self.assertFalse(os.path.exists(store_path + '.part'))
+        conn = sqlite3.connect(store_path)
+        self.assertEqual(conn.execute('select * from sources order by id').fetchall(), [(0, 'pop_a', 2), (1, 'pop_b', 1)])
+        self.assertEqual(conn.execute('select * from ld order by qsnp, ldsnp').fetchall(),
+            [(1, 0, 2, 0.5), (1, 0, 3, 0.9), (4, 1, 1, 0.1)])
+        conn.close()
+        # A failed build leaves the store as it was
+        def fail(store, sid, name, conn):
+            raise sqlite3.OperationalError('no such table')
+        with self.assertRaises(sqlite3.OperationalError):
+            self.module.merge_sources(store_path, sources, tables, [], fail)
+        conn = sqlite3.connect(store_path)
+        self.assertEqual(conn.execute('select count(*) from ld').fetchone()[0], 3)
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from cravat import BaseCommonModule
+from cravat import get_module
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def memo (self, annotator, table, key_cols, columns, maxsize=20000):
+        store = get_module('dbtier')().open(annotator, table, key_cols, columns)
+        return GeneMemo(annotator, store, maxsize=maxsize)
+
+class GeneMemo (object):
+    """
+    Caches query results of a gene-keyed table (keyed by gene, or gene
+    and protein change) for the length of a job, for variant-level
+    annotators that look up the same gene many times.
+
+    store is the dbtier table the rows come from. If its tier holds the
+    table in memory, keys it holds are looked up there. Otherwise the
+    rows of each key are kept in an LRU memo of maxsize keys. Hits and misses are
+    counted and written to the annotator's log by log_stats, and close
+    closes the store.
+    """
+
+    def __init__ (self, annotator, store, maxsize=20000):
+        self.annotator = annotator
+        self.store = store
+        self.maxsize = maxsize
+        self.memo = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fetchall (self, *key):
+        if self.store.is_plain(key):
+            if self.store.preloaded is not None:
+                self.hits += 1
+                return self.store.preloaded.get(key, [])
+            memo_key = key
+        else:
+            # 12 and 12.0 are one dict key, but SQLite may not match them
+            # to the same rows
+            memo_key = tuple([(type(x), x) for x in key])
+        rows = self.memo.get(memo_key)
+        if rows is not None:
+            self.hits += 1
+            self.memo.move_to_end(memo_key)
+            return rows
+        self.misses += 1
+        rows = self.store.fetchall(*key)
+        self.memo[memo_key] = rows
+        if len(self.memo) > self.maxsize:
+            self.memo.popitem(last=False)
+        return rows
+
+    def fetchone (self, *key):
+        rows = self.fetchall(*key)
+        if rows:
+            return rows[0]
+        else:
+            return None
+
+    def log_stats (self):
+        self.annotator.logger.info('{} memo ({}): {} hits, {} misses'.format(self.store.table, self.store.tier, self.hits, self.misses))
+
+    def close (self):
+        self.store.close()
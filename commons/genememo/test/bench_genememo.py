@@ -0,0 +1,206 @@
+"""
+Benchmark of the gene-keyed annotators gnomad_gene, mutpanning, go, ghis,
+uniprot, pubmed, mavedb and dida on a synthetic job, before and after
+their lookups went through genememo and dbtier. The job has --variants
+variants over --genes genes of lognormal lengths, so a few long genes
+such as TTN take many of them. Gene-level annotators read the job's crg,
+one line per gene with a variant. Variant-level annotators read every
+variant, most of them intronic and without a protein change. Each
+annotator runs on a synthetic database with its tables and columns.
+
+The annotators before the change are read from --rev, by default the
+first commit of the repository. Run from any directory, e.g.
+
+    python bench_genememo.py --variants 1000000
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import hashlib
+import logging
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, os.pardir)
+gene_level = ['gnomad_gene', 'mutpanning', 'go', 'ghis', 'uniprot', 'pubmed']
+variant_level = ['mavedb', 'dida']
+amino_acids = ['Ala', 'Arg', 'Asn', 'Asp', 'Cys', 'Gln', 'Glu', 'Gly', 'His', 'Ile',
+    'Leu', 'Lys', 'Met', 'Phe', 'Pro', 'Ser', 'Thr', 'Trp', 'Tyr', 'Val']
+one_letter = dict(zip(amino_acids, 'ARNDCQEGHILKMFPSTWYV'))
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def get_module(name):
+    # The common modules of this repository, as cravat's get_module
+    # gives them
+    module = load_module(name, os.path.join(repo_dir, 'commons', name, name + '.py'))
+    module.get_module = get_module
+    return module.CravatCommonModule
+
+def random_achange(rng, length):
+    return 'p.{}{}{}'.format(rng.choice(amino_acids), rng.randint(1, length), rng.choice(amino_acids))
+
+def to_one_letter(achange):
+    for three, one in one_letter.items():
+        achange = achange.replace(three, one)
+    return achange
+
+def make_job(n_variants, n_genes, seed=1):
+    # hugo and achange of each variant: 60% between genes, and of the
+    # rest 95% without a protein change. Genes are picked by length.
+    rng = random.Random(seed)
+    genes = ['G{:05d}'.format(i) for i in range(n_genes)]
+    lengths = [int(rng.lognormvariate(10, 1.2)) + 100 for _ in genes]
+    lengths[0] = 300000
+    picks = rng.choices(range(n_genes), weights=lengths, k=n_variants)
+    variants = []
+    for i in picks:
+        if rng.random() < 0.6:
+            variants.append(('', ''))
+        elif rng.random() < 0.95:
+            variants.append((genes[i], ''))
+        else:
+            variants.append((genes[i], random_achange(rng, lengths[i] // 30 + 1)))
+    return genes, lengths, variants
+
+def make_dbs(db_dir, genes, lengths, variants, seed=2):
+    # A database for each annotator, with rows for most genes and for a
+    # share of the protein changes of the job
+    rng = random.Random(seed)
+    achanges = sorted(set([v for v in variants if v[1]]))
+    def connect(name):
+        return sqlite3.connect(os.path.join(db_dir, name + '.sqlite'))
+    conn = connect('gnomad_gene')
+    conn.execute('create table genes (gname text, transcript text, oe_lof real, oe_mis real, oe_syn real, lof_z real, mis_z real, syn_z real, pLI real, pRec real, pNull real)')
+    conn.executemany('insert into genes values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [(g, 'ENST{:011d}'.format(rng.randrange(10 ** 11))) + tuple([rng.random() for _ in range(9)])
+         for g in genes if rng.random() < 0.9 for _ in range(rng.randint(1, 3))])
+    conn.execute('create index genes_idx on genes (gname)')
+    conn.commit()
+    conn = connect('mutpanning')
+    conn.execute('create table Genes (Hugo text, No_Cancer_Types integer, M_Frequency real, Best_Q_Value real, Supporting_Literature integer, TCGA_Marker_Papers integer, dNdS_Study integer, Tumor_Portal integer, Bailey_Database integer, Cancer_Types text)')
+    conn.executemany('insert into Genes values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [(g, rng.randint(1, 20), rng.random(), rng.random()) + tuple([rng.randint(0, 1) for _ in range(5)]) + ('BRCA;LUAD',)
+         for g in genes if rng.random() < 0.2])
+    conn.execute('create index Genes_idx on Genes (Hugo)')
+    conn.commit()
+    conn = connect('go')
+    conn.execute('create table go_name (go_id text, name text)')
+    go_ids = ['GO:{:07d}'.format(i) for i in range(20000)]
+    conn.executemany('insert into go_name values (?, ?)', [(i, 'term ' + i) for i in go_ids])
+    conn.execute('create table go_annotation (hugo text, go_id text, go_aspect text)')
+    conn.executemany('insert into go_annotation values (?, ?, ?)',
+        [(g, rng.choice(go_ids), rng.choice(['bpo', 'cco', 'mfo'])) for g in genes if rng.random() < 0.8 for _ in range(rng.randint(1, 30))])
+    conn.execute('create index go_annotation_idx on go_annotation (hugo)')
+    conn.commit()
+    for name, col in (('ghis', 'ghis real'), ('uniprot', 'acc text')):
+        conn = connect(name)
+        conn.execute('create table genes (gname text, {})'.format(col))
+        conn.executemany('insert into genes values (?, ?)',
+            [(g, rng.random() if name == 'ghis' else 'P{:05d}'.format(rng.randrange(10 ** 5))) for g in genes if rng.random() < 0.9])
+        conn.execute('create index genes_idx on genes (gname)')
+        conn.commit()
+    conn = connect('pubmed')
+    conn.execute('create table pubmed (hugo text, n integer, term text)')
+    conn.executemany('insert into pubmed values (?, ?, ?)', [(g, rng.randint(0, 5000), g + '%5Bgene%5D') for g in genes])
+    conn.execute('create index pubmed_idx on pubmed (hugo)')
+    conn.commit()
+    conn = connect('mavedb')
+    conn.execute('create table mavedb (hugo text, hgvs_pro text, score real, accession text)')
+    rows = [(g, random_achange(rng, length // 30 + 1), rng.random(), 'urn:mavedb:{:08d}'.format(rng.randrange(10 ** 8)))
+        for g, length in zip(genes[:500], lengths) for _ in range(200)]
+    rows += [(g, a, rng.random(), 'urn:mavedb:00000001') for g, a in achanges if rng.random() < 0.05]
+    conn.executemany('insert into mavedb values (?, ?, ?, ?)', rows)
+    conn.execute('create index mavedb_idx on mavedb (hugo, hgvs_pro)')
+    conn.commit()
+    conn = connect('dida')
+    conn.execute('create table gene (id text, name text, effect text, relation text, familial text, functional text, dist text, pub text, geneA text, geneB text, Aallele_one_protein text, Aallele_two_cdna text, Aallele_two_protein text, Ballele_one_cdna text, Ballele_one_protein text, Ballele_two_cdna text, Ballele_two_protein text)')
+    rows = []
+    for i, (g, a) in enumerate([x for x in achanges if rng.random() < 0.01]):
+        b = rng.choice(genes)
+        rows.append(('dd{:04d}'.format(i), 'digenic disease', rng.choice(['TD', 'CO']), 'relation', 'yes', 'no', 'dist', 'pub',
+            g, b, to_one_letter(a), 'c.1A>G', 'p.A1G', 'c.2C>T', 'p.R2W', 'c.3G>A', 'p.G3S'))
+    conn.executemany('insert into gene values ({})'.format(', '.join(['?'] * 17)), rows)
+    conn.execute('create index gene_idx on gene (geneA, Aallele_one_protein)')
+    conn.commit()
+    conn.close()
+
+def drop_page_cache():
+    # Needs root. The databases are read from disk again by the next run.
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+def run(name, path, db_path, inputs):
+    # Only what setup, annotate and cleanup use of BaseAnnotator. The
+    # outputs go into a digest, as an annotator writes them out instead
+    # of keeping them.
+    module = load_module(name, path)
+    module.get_module = get_module
+    annotator = module.CravatAnnotator.__new__(module.CravatAnnotator)
+    annotator.dbconn = sqlite3.connect(db_path)
+    annotator.cursor = annotator.dbconn.cursor()
+    annotator.logger = logging.getLogger('bench_genememo')
+    start = time.perf_counter()
+    if hasattr(annotator, 'setup'):
+        annotator.setup()
+    digest = hashlib.md5()
+    for hugo, achange in inputs:
+        try:
+            out = annotator.annotate({'hugo': hugo, 'achange': achange})
+        except Exception:
+            # Logged by the annotator, with no output for the variant, as
+            # the mavedb before the change does for a variant it has no
+            # row for
+            out = None
+        digest.update(repr(out).encode())
+    if hasattr(annotator, 'cleanup'):
+        annotator.cleanup()
+    elapsed = time.perf_counter() - start
+    annotator.dbconn.close()
+    return elapsed, digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='genememo benchmark')
+    parser.add_argument('--annotators', nargs='+', default=gene_level + variant_level, choices=gene_level + variant_level)
+    parser.add_argument('--variants', type=int, default=1000000)
+    parser.add_argument('--genes', type=int, default=20000)
+    parser.add_argument('--rev', help='git revision of the annotators before the change')
+    parser.add_argument('--cold', action='store_true', help='drop the page cache before each run (needs root)')
+    args = parser.parse_args()
+    rev = args.rev or subprocess.check_output(['git', 'rev-list', '--max-parents=0', 'HEAD'], cwd=repo_dir, text=True).split()[0]
+    genes, lengths, variants = make_job(args.variants, args.genes)
+    crg = sorted(set([hugo for hugo, _ in variants if hugo]))
+    print('{} variants, {} crg lines'.format(len(variants), len(crg)))
+    with tempfile.TemporaryDirectory() as work_dir:
+        make_dbs(work_dir, genes, lengths, variants)
+        for name in args.annotators:
+            before_path = os.path.join(work_dir, name + '_before.py')
+            with open(before_path, 'w') as f:
+                f.write(subprocess.check_output(['git', 'show', '{}:annotators/{}/{}.py'.format(rev, name, name)], cwd=repo_dir, text=True))
+            after_path = os.path.join(repo_dir, 'annotators', name, name + '.py')
+            inputs = [(hugo, '') for hugo in crg] if name in gene_level else variants
+            # The tiers memory-map or load the database, so each run gets
+            # its own copy
+            results = []
+            for label, path in (('before', before_path), ('after', after_path)):
+                db_path = os.path.join(work_dir, '{}_{}.sqlite'.format(name, label))
+                shutil.copy(os.path.join(work_dir, name + '.sqlite'), db_path)
+                if args.cold:
+                    drop_page_cache()
+                results.append(run(name, path, db_path, inputs))
+            (before, before_digest), (after, after_digest) = results
+            print('{:<12} {:8d} lookups {:8.2f} s before {:8.2f} s after {:6.2f}x, same output: {}'.format(
+                name, len(inputs), before, after, before / after, before_digest == after_digest))
+
+if __name__ == '__main__':
+    sys.exit(main())
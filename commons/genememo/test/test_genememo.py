@@ -0,0 +1,88 @@
+"""
+Tests that genememo lookups, from memory or memoized, return the rows of
+the per-key query. Run with
+
+    python -m pytest commons/genememo/test
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import logging
+import unittest
+import itertools
+import importlib.util
+
+commons_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir)
+
+def load_module(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(commons_dir, name, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class Annotator(object):
+    def __init__(self, create, db_path):
+        self.dbconn = sqlite3.connect(db_path)
+        self.dbconn.execute(create)
+        rows = [('TP53', 'a'), ('tp53', 'b'), ('TP53', 'c'), (None, 'd'), ('12', 'e'), (12, 'f'), ('1.5', 'g'), (b'TP53', 'h')]
+        self.dbconn.executemany('insert into genes values (?, ?)', rows)
+        self.dbconn.commit()
+        self.logger = logging.getLogger('genememo_test')
+
+class GeneMemoTest(unittest.TestCase):
+    keys = ['TP53', 'tp53', 'BRCA1', None, '12', 12, 12.0, 1.5, '1.5', b'TP53']
+
+    def setUp(self):
+        self.dbtier = load_module('dbtier')
+        self.module = load_module('genememo')
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def check(self, create, available, maxsize=20000):
+        self.dbtier.available_memory = lambda: available
+        annotator = Annotator(create, os.path.join(self.work_dir, 'genes.sqlite'))
+        store = self.dbtier.TieredTable(annotator, 'genes', ['gname'], ['acc'])
+        memo = self.module.GeneMemo(annotator, store, maxsize=maxsize)
+        cursor = annotator.dbconn.cursor()
+        # Each key twice, so memoized keys are also looked up from the memo
+        for key in itertools.chain(self.keys, self.keys):
+            cursor.execute('select acc from genes where gname=?', (key,))
+            self.assertEqual(memo.fetchall(key), cursor.fetchall(), repr(key))
+        with self.assertLogs('genememo_test', level='INFO') as logs:
+            memo.log_stats()
+        self.assertIn('genes memo ({}): {} hits, {} misses'.format(store.tier, memo.hits, memo.misses), logs.output[0])
+        memo.close()
+        self.assertIsNone(store.conn)
+        annotator.dbconn.close()
+        return store, memo
+
+    def test_memory(self):
+        # Plain keys come from the table in memory, the others are memoized
+        store, memo = self.check('create table genes (gname text, acc text)', 8 * 1024 ** 3)
+        self.assertEqual(store.tier, 'memory')
+        self.assertEqual(len(memo.memo), 5)
+        self.assertEqual((memo.hits, memo.misses), (15, 5))
+
+    def test_mmap(self):
+        store, memo = self.check('create table genes (gname text, acc text)', 100000)
+        self.assertEqual(store.tier, 'mmap')
+        self.assertEqual((memo.hits, memo.misses), (10, 10))
+
+    def test_mixed_types(self):
+        # 12 and 12.0 are one dict key but separate memo keys
+        store, memo = self.check('create table genes (gname, acc)', 8 * 1024 ** 3)
+        self.assertEqual(store.tier, 'mmap')
+        self.assertEqual(len(memo.memo), 10)
+
+    def test_maxsize(self):
+        store, memo = self.check('create table genes (gname text, acc text)', 100000, maxsize=3)
+        # Ten keys in turn through three slots: each one is evicted before
+        # it comes again
+        self.assertEqual(len(memo.memo), 3)
+        self.assertEqual((memo.hits, memo.misses), (0, 20))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,12 @@
 import twobitreader
 import os
 from cravat import BaseCommonModule
+from cravat import get_module
 
 class CravatCommonModule (BaseCommonModule):
     def setup (self):
         self.wgs_reader = twobitreader.TwoBitFile(os.path.join(os.path.dirname(__file__), 'data', 'hg38.2bit'))
+        self.chunks = None
         self.revbases = {'A':'T', 'T':'A', 'G':'C', 'C':'G', 'N':'N', 'a':'t', 't':'a', 'g':'c', 'c':'g', 'n':'n'}
 
     def __getitem__ (self, chrom):
@@ -45,4 +47,13 @@ class CravatCommonModule (BaseCommonModule):
             raise IndexError(start)
         else:
             start = start - 1
-        return self.wgs_reader[chrom][start:end]
\ No newline at end of file
+        return self.wgs_reader[chrom][start:end]
+
+    def ref_base (self, chrom, pos):
+        # Upper case reference base, read in chunks by the refchunks module
+        # for callers that go through positions in sorted order. Raises
+        # KeyError for an unknown chrom and IndexError for a position past
+        # its end.
+        if self.chunks is None:
+            self.chunks = get_module('refchunks')().reader(self.slice)
+        return self.chunks.ref_base(chrom, pos)
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import mmap
+import pickle
+import shutil
+from array import array
+from bisect import bisect_right
+from cravat import BaseCommonModule
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def open (self, index_dir, records=None, sources=()):
+        return open_index(index_dir, records=records, sources=sources)
+
+    def load (self, records):
+        return IntervalIndex.load(records)
+
+class ChromIntervals (object):
+    """
+    Intervals of one chromosome sorted by (start, end), as parallel int64
+    sequences of starts, ends, running maximum of ends and payload
+    offsets, plus the pickled payloads back to back.
+    """
+
+    def __init__ (self, starts, ends, max_ends, offsets, payloads):
+        self.starts = starts
+        self.ends = ends
+        self.max_ends = max_ends
+        self.offsets = offsets
+        self.payloads = payloads
+
+    def overlap (self, beg, end):
+        # Walk back from the last interval starting before end until no
+        # earlier interval can reach past beg
+        hits = []
+        i = bisect_right(self.starts, end - 1) - 1
+        while i >= 0 and self.max_ends[i] > beg:
+            if self.ends[i] > beg:
+                hits.append(i)
+            i -= 1
+        hits.reverse()
+        return [pickle.loads(self.payloads[self.offsets[i]:self.offsets[i + 1]]) for i in hits]
+
+class IntervalIndex (object):
+    """
+    Half-open intervals with a payload each, looked up by position.
+
+    The on-disk form is a directory with index.json and, per chromosome,
+    <n>.idx (starts, ends, max ends and payload offsets as int64 arrays)
+    and <n>.dat (payloads). Both are opened with mmap, so startup does no
+    parsing and parallel annotator processes share the pages. load()
+    builds the same structure in memory from records.
+    """
+
+    def __init__ (self, chroms):
+        self.chroms = chroms
+
+    @classmethod
+    def open (cls, index_dir, stamp=None):
+        # None if the index is not built, was built on a machine of the
+        # other byte order, or from other versions of the source files
+        # than stamp
+        try:
+            with open(os.path.join(index_dir, 'index.json')) as f:
+                index = json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if index.get('byteorder') != sys.byteorder or (stamp is not None and index.get('sources') != stamp):
+            return None
+        chroms = {}
+        for chrom, info in index['chroms'].items():
+            n = info['n']
+            idx = map_file(os.path.join(index_dir, '{}.idx'.format(info['file'])))
+            dat = map_file(os.path.join(index_dir, '{}.dat'.format(info['file'])))
+            arrays = [idx[k * 8 * n:(k + 1) * 8 * n].cast('q') for k in range(3)]
+            offsets = idx[3 * 8 * n:].cast('q')
+            chroms[chrom] = ChromIntervals(arrays[0], arrays[1], arrays[2], offsets, dat)
+        return cls(chroms)
+
+    @classmethod
+    def load (cls, records):
+        return cls({chrom: ChromIntervals(*columns) for chrom, columns in sort_records(records)})
+
+    def query (self, chrom, pos):
+        return self.overlap(chrom, pos, pos + 1)
+
+    def overlap (self, chrom, beg, end):
+        intervals = self.chroms.get(chrom)
+        if intervals is None:
+            return []
+        return intervals.overlap(beg, end)
+
+    def __contains__ (self, chrom):
+        return chrom in self.chroms
+
+def open_index (index_dir, records=None, sources=()):
+    """
+    Opens the index in index_dir. If it is not built, or any of the source
+    files it was built from has changed since, and records are given, it
+    is built from them first, so only the first job after an install or
+    data update reads the source files. Where index_dir cannot be written,
+    the index is kept in memory instead. Returns None if there is no index
+    and no records.
+    """
+    stamp = source_stamp(sources)
+    index = IntervalIndex.open(index_dir, stamp=stamp)
+    if index is not None or records is None:
+        return index
+    chroms = list(sort_records(records))
+    try:
+        write_index(index_dir, chroms, stamp)
+    except OSError:
+        return IntervalIndex({chrom: ChromIntervals(*columns) for chrom, columns in chroms})
+    return IntervalIndex.open(index_dir)
+
+def source_stamp (sources):
+    # Name, size and modification time of each source file, or None if
+    # any is missing, as when it was removed once the index was built
+    stamp = []
+    for path in sources:
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        stamp.append([os.path.basename(path), st.st_size, st.st_mtime_ns])
+    return stamp
+
+def map_file (path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b'')
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+def sort_records (records):
+    # (chrom, (starts, ends, max ends, offsets, payloads)) from
+    # (chrom, start, end, payload) records
+    by_chrom = {}
+    for chrom, start, end, payload in records:
+        by_chrom.setdefault(chrom, []).append((int(start), int(end), pickle.dumps(payload, protocol=4)))
+    for chrom, rows in by_chrom.items():
+        rows.sort(key=lambda r: (r[0], r[1]))
+        starts = array('q', [r[0] for r in rows])
+        ends = array('q', [r[1] for r in rows])
+        max_ends = array('q')
+        offsets = array('q', [0])
+        max_end = None
+        for r in rows:
+            max_end = r[1] if max_end is None else max(max_end, r[1])
+            max_ends.append(max_end)
+            offsets.append(offsets[-1] + len(r[2]))
+        yield chrom, (starts, ends, max_ends, offsets, b''.join([r[2] for r in rows]))
+
+def write_index (index_dir, chroms, stamp):
+    # Written next to index_dir and moved there when done. Jobs starting
+    # together may each build the index; the first to finish puts its
+    # copy in place and the others keep it.
+    part_dir = '{}.part{}'.format(index_dir, os.getpid())
+    if os.path.exists(part_dir):
+        shutil.rmtree(part_dir)
+    os.makedirs(part_dir)
+    index = {'chroms': {}, 'byteorder': sys.byteorder, 'sources': stamp}
+    for n, (chrom, columns) in enumerate(chroms):
+        starts, ends, max_ends, offsets, payloads = columns
+        with open(os.path.join(part_dir, '{}.idx'.format(n)), 'wb') as f:
+            for a in (starts, ends, max_ends, offsets):
+                a.tofile(f)
+        with open(os.path.join(part_dir, '{}.dat'.format(n)), 'wb') as f:
+            f.write(payloads)
+        index['chroms'][chrom] = {'file': n, 'n': len(starts)}
+    with open(os.path.join(part_dir, 'index.json'), 'w') as f:
+        json.dump(index, f)
+    current = IntervalIndex.open(index_dir, stamp=stamp)
+    if current is None and os.path.exists(index_dir):
+        # Out of date. Processes that mapped its files keep them.
+        shutil.rmtree(index_dir, ignore_errors=True)
+    try:
+        os.rename(part_dir, index_dir)
+    except OSError:
+        if not os.path.exists(os.path.join(index_dir, 'index.json')):
+            raise
+        shutil.rmtree(part_dir)
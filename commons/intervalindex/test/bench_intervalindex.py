@@ -0,0 +1,100 @@
+"""
+Benchmark of an annotator's startup, memory and lookups with its interval
+index against the unpickled interval trees, on synthetic data laid out as
+the annotator's pickle is. Each setup runs in a fresh process, which
+reports its startup time, resident memory and variants/s, cold (page
+cache dropped, needs root) with --cold. Run from any directory, e.g.
+
+    python bench_intervalindex.py --annotator ncrna --intervals 100000
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+
+chroms = ['chr{}'.format(c) for c in list(range(1, 23)) + ['X', 'Y']]
+chrom_len = 100000000
+
+def drop_page_cache():
+    # Needs root. The files are read from disk again by the next run.
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+def measure(args):
+    # Runs in the child process. cravat is loaded before timing, as it is
+    # in an annotator's process.
+    import cravat
+    queries = harness.random_queries(args.variants, chroms, chrom_len)
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    if args.measure == 'pickle':
+        with open(os.path.join(args.data_dir, args.annotator + '.pickle'), 'rb') as f:
+            data = pickle.load(f)
+        lookup = lambda input_data: harness.tree_annotate(args.annotator, data, input_data)
+    else:
+        module = harness.load_intervalindex()
+        annotator_module = harness.load_annotator(args.annotator)
+        index = module.open_index(os.path.join(args.data_dir, args.annotator + '.index'),
+            records=annotator_module.index_records(args.data_dir),
+            sources=[os.path.join(args.data_dir, args.annotator + '.pickle')])
+        lookup = harness.index_annotator(annotator_module, index).annotate
+    startup = time.perf_counter() - start
+    startup_rss = rss_mb() - base_rss
+    start = time.perf_counter()
+    results = [lookup(q) for q in queries]
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'startup': startup, 'rss': startup_rss, 'end_rss': rss_mb() - base_rss,
+        'rate': len(queries) / elapsed, 'found': sum([r is not None for r in results]),
+        'results': results}))
+
+def run(args, measure, label):
+    if args.cold:
+        drop_page_cache()
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--annotator', args.annotator,
+        '--variants', str(args.variants), '--measure', measure, '--data-dir', args.data_dir],
+        check=True, capture_output=True, text=True, env=dict(os.environ, PYTHONHASHSEED='0')).stdout
+    result = json.loads(out)
+    print('{:<28} startup {:7.2f} s, RSS {:7.1f} MB after startup, {:7.1f} MB after lookups, {:9.0f} variants/s'.format(
+        label, result['startup'], result['rss'], result['end_rss'], result['rate']))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='intervalindex benchmark')
+    parser.add_argument('--annotator', default='ncrna', choices=harness.annotators)
+    parser.add_argument('--intervals', type=int, default=100000, help='intervals (pharmgkb: positions) in all')
+    parser.add_argument('--variants', type=int, default=20000, help='variants looked up')
+    parser.add_argument('--cold', action='store_true', help='drop the page cache before each run (needs root)')
+    parser.add_argument('--measure', choices=['pickle', 'index'], help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        return measure(args)
+    with tempfile.TemporaryDirectory() as work_dir:
+        args.data_dir = work_dir
+        harness.make_pickle(args.annotator, work_dir, args.intervals // len(chroms), chroms, chrom_len)
+        pickle_size = os.path.getsize(os.path.join(work_dir, args.annotator + '.pickle'))
+        print('{}: {} intervals, pickle {:.0f} MB'.format(args.annotator, args.intervals, pickle_size / 1e6))
+        expected = run(args, 'pickle', 'unpickled trees')
+        first = run(args, 'index', 'index, first job (builds)')
+        index_dir = os.path.join(work_dir, args.annotator + '.index')
+        index_size = sum([os.path.getsize(os.path.join(index_dir, f)) for f in os.listdir(index_dir)])
+        later = run(args, 'index', 'index, later jobs')
+        print('index files {:.0f} MB, same output: {}'.format(index_size / 1e6,
+            first['results'] == expected['results'] == later['results'] and first['found'] == expected['found']))
+
+if __name__ == '__main__':
+    sys.exit(main())
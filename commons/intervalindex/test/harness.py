@@ -0,0 +1,161 @@
+import os
+import sys
+import random
+import pickle
+from intervaltree import IntervalTree
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'test'))
+import testutil
+from testutil import load_annotator
+
+annotators = ['ncrna', 'javierre_promoters', 'pseudogene', 'pharmgkb']
+
+def load_intervalindex():
+    return testutil.load_common('intervalindex')
+
+def random_trees(n, chroms, chrom_len, payload, seed=1):
+    # Mostly short intervals, some long ones that others nest in, and
+    # one-base intervals
+    def length(rng):
+        r = rng.random()
+        if r < 0.1:
+            return 1
+        elif r < 0.9:
+            return rng.randrange(2, 5000)
+        else:
+            return rng.randrange(5000, chrom_len // 20)
+    rng = random.Random(seed)
+    trees = {}
+    for chrom in chroms:
+        tree = IntervalTree()
+        for i, (begin, end) in enumerate(sorted(testutil.random_intervals(n, chrom_len, rng, length))):
+            tree[begin:end] = payload(chrom, i, rng)
+        trees[chrom] = tree
+    return trees
+
+class PseudogeneData(object):
+    # The layout of pseudogene.pickle: interval trees of transcript ids
+    # and the ENST id and HUGO symbol of each id
+    def __init__(self, tids, tinfo):
+        self.tids = tids
+        self.tinfo = tinfo
+
+def hits(rng):
+    # pharmgkb.pickle entries, one dict per drug association
+    return [{'pharmgkb_id': 'PA{}'.format(rng.randrange(100000)),
+             'chemical': ['chem{}'.format(rng.randrange(50)) for _ in range(rng.choice([1, 2]))],
+             'chemid': ['PA{}'.format(rng.randrange(1000))],
+             'pheno_cat': rng.choice(['Efficacy', 'Toxicity', 'Dosage']),
+             'sentence': 'sentence {}'.format(rng.randrange(1000)),
+             'sig': rng.choice(['yes', 'no']),
+             'pmid': str(rng.randrange(10 ** 7)),
+             'notes': ''} for _ in range(rng.choice([1, 1, 2, 3]))]
+
+def make_pickle(name, data_dir, n, chroms, chrom_len, seed=1):
+    # A synthetic <name>.pickle laid out as the annotator's data is.
+    # Returns the unpickled data.
+    if name == 'ncrna':
+        data = random_trees(n, chroms, chrom_len,
+            lambda chrom, i, rng: (chrom, rng.choice(['lncRNA', 'miRNA', 'snoRNA']), 'RNA{}_{}'.format(chrom, i)), seed=seed)
+    elif name == 'javierre_promoters':
+        data = random_trees(n, chroms, chrom_len, lambda chrom, i, rng: 'region{}_{}'.format(chrom, i), seed=seed)
+    elif name == 'pseudogene':
+        tids = random_trees(n, chroms, chrom_len, lambda chrom, i, rng: rng.randrange(n * len(chroms)), seed=seed)
+        rng = random.Random(seed)
+        tinfo = {}
+        for tid in range(n * len(chroms)):
+            r = rng.random()
+            if r < 0.8:
+                tinfo[tid] = ('ENST{:011d}'.format(tid), 'GENE{}'.format(tid % 500))
+            elif r < 0.9:
+                tinfo[tid] = ('ENST{:011d}'.format(tid), None)
+        data = PseudogeneData(tids, tinfo)
+    elif name == 'pharmgkb':
+        rng = random.Random(seed)
+        data = {}
+        for chrom in chroms:
+            for _ in range(n):
+                pos = rng.randrange(1, chrom_len)
+                ref = rng.choice('ACGT')
+                for alt in rng.sample([b for b in 'ACGT' if b != ref], rng.choice([1, 1, 2])):
+                    data['{}:{}:{}:{}'.format(chrom, pos, ref, alt)] = hits(rng)
+                if rng.random() < 0.05:
+                    data['{}:{}:{}:-'.format(chrom, pos, ref)] = hits(rng)
+    with open(os.path.join(data_dir, name + '.pickle'), 'wb') as f:
+        pickle.dump(data, f)
+    return data
+
+def random_queries(n, chroms, chrom_len, seed=2):
+    # Variants anywhere on the chromosomes and just past their end
+    variants = testutil.random_variants(n, chroms=chroms, max_pos=chrom_len + 1000, seed=seed)
+    return [testutil.input_data(v) for v in variants]
+
+def bound_queries(name, data):
+    # Variants on the first and last base of intervals, just past their
+    # end, and on stored pharmgkb variants
+    rng = random.Random(3)
+    queries = []
+    if name == 'pharmgkb':
+        for key in rng.sample(sorted(data), min(2000, len(data))):
+            chrom, pos, ref, alt = key.split(':')
+            queries.append({'chrom': chrom, 'pos': int(pos), 'ref_base': ref, 'alt_base': alt})
+        return queries
+    trees = data.tids if name == 'pseudogene' else data
+    for chrom, tree in sorted(trees.items()):
+        for iv in rng.sample(sorted(tree), 300):
+            for pos in (iv.begin, iv.end - 1, iv.end):
+                queries.append({'chrom': chrom, 'pos': pos, 'ref_base': 'A', 'alt_base': 'C'})
+    return queries
+
+def tree_annotate(name, data, input_data):
+    # The output the annotators gave from the unpickled data, with the
+    # intervals containing the position ordered by start and end as the
+    # index returns them
+    chrom = input_data['chrom']
+    pos = input_data['pos']
+    if name == 'ncrna':
+        if chrom in data:
+            ivs = sorted(data[chrom][pos])
+            classes = [iv.data[1] for iv in ivs]
+            names = [iv.data[2] for iv in ivs]
+            if classes and names:
+                return {'ncrnaclass': ','.join(classes), 'ncrnaname': ','.join(names)}
+        return None
+    if name == 'javierre_promoters':
+        it = data.get(chrom)
+        regions = [iv.data for iv in sorted(it[pos])] if it else []
+        return {'regions': ';'.join(regions)} if regions else None
+    if name == 'pseudogene':
+        if chrom in data.tids:
+            ensts = []
+            hugos = []
+            for iv in sorted(data.tids[chrom][pos]):
+                enst, hugo = data.tinfo.get(iv.data, (None, None))
+                if enst and hugo:
+                    ensts.append(enst)
+                    hugos.append(hugo)
+            if ensts and hugos:
+                return {'transcript': ';'.join(ensts), 'hugo': ';'.join(hugos)}
+        return None
+    if name == 'pharmgkb':
+        hits = data.get(':'.join(map(str, [chrom, pos, input_data['ref_base'], input_data['alt_base']])))
+        if not hits:
+            return None
+        assocs = []
+        chem = set()
+        cat = set()
+        for hit in hits:
+            chemicals = hit['chemical']
+            chem_urls = ['https://www.pharmgkb.org/chemical/{}'.format(chemid) for chemid in hit['chemid']]
+            chem.add(' '.join(chemicals))
+            cat.add(''.join(hit['pheno_cat']))
+            assocs.append([list(zip(chemicals, chem_urls)), hit['sentence'], hit['pheno_cat'], hit['sig'],
+                hit['pmid'], hit['notes']])
+        return {'id': hits[0]['pharmgkb_id'], 'chemicals': ';'.join(list(chem)),
+            'pheno_cat': ';'.join(list(cat)), 'drug_assoc': assocs}
+
+def index_annotator(module, index):
+    # The annotator with its index, without the set-up of a run
+    annotator = module.CravatAnnotator.__new__(module.CravatAnnotator)
+    annotator.index = index
+    return annotator
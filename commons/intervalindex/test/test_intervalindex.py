@@ -0,0 +1,109 @@
+"""
+Tests that the annotators give from their interval index the output they
+gave from the unpickled interval trees, and how the index files are built.
+Run with
+
+    python -m pytest commons/intervalindex/test
+"""
+import os
+import sys
+import shutil
+import pickle
+import random
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import harness
+
+class IntervalIndexTest(unittest.TestCase):
+
+    chroms = ['chr1', 'chr2', 'chrX']
+    chrom_len = 2000000
+
+    def setUp(self):
+        self.module = harness.load_intervalindex()
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def open(self, name, records=None):
+        index_dir = os.path.join(self.work_dir, name + '.index')
+        return self.module.open_index(index_dir, records=records,
+            sources=[os.path.join(self.work_dir, name + '.pickle')])
+
+    def check_annotator(self, name):
+        data = harness.make_pickle(name, self.work_dir, 3000, self.chroms, self.chrom_len)
+        annotator_module = harness.load_annotator(name)
+        self.open(name, records=annotator_module.index_records(self.work_dir))
+        # Opened from the files, without reading the pickle
+        annotator = harness.index_annotator(annotator_module, self.open(name))
+        queries = harness.random_queries(10000, self.chroms + ['chrY'], self.chrom_len) + harness.bound_queries(name, data)
+        found = 0
+        for input_data in queries:
+            expected = harness.tree_annotate(name, data, input_data)
+            self.assertEqual(annotator.annotate(input_data), expected, input_data)
+            found += expected is not None
+        self.assertGreater(found, 1000)
+
+    def test_ncrna(self):
+        self.check_annotator('ncrna')
+
+    def test_javierre_promoters(self):
+        self.check_annotator('javierre_promoters')
+
+    def test_pseudogene(self):
+        self.check_annotator('pseudogene')
+
+    def test_pharmgkb(self):
+        self.check_annotator('pharmgkb')
+
+    def test_same_bounds(self):
+        # Intervals with the same start and end come back together
+        records = [('chr1', 10, 20, 'a'), ('chr1', 10, 20, 'b'), ('chr1', 5, 30, 'c'), ('chr1', 20, 21, 'd')]
+        index_dir = os.path.join(self.work_dir, 'same.index')
+        for index in (self.module.IntervalIndex.load(records), self.module.open_index(index_dir, records=records)):
+            self.assertEqual(index.query('chr1', 9), ['c'])
+            self.assertEqual(sorted(index.query('chr1', 10)), ['a', 'b', 'c'])
+            self.assertEqual(index.query('chr1', 20), ['c', 'd'])
+            self.assertEqual(index.query('chr1', 30), [])
+            self.assertEqual(index.query('chr2', 10), [])
+
+    def test_built_once(self):
+        rng = random.Random(1)
+        records = [('chr1', p, p + rng.randrange(1, 100), p) for p in range(0, 100000, 37)]
+        with open(os.path.join(self.work_dir, 'once.pickle'), 'wb') as f:
+            pickle.dump(records, f)
+        self.assertIsNone(self.open('once'))
+        first = self.open('once', records=iter(records))
+        def unread():
+            raise AssertionError('records read again')
+            yield
+        again = self.open('once', records=unread())
+        self.assertEqual(first.query('chr1', 5000), again.query('chr1', 5000))
+        self.assertEqual(again.query('chr1', 5000), sorted([r[3] for r in records if r[1] <= 5000 < r[2]]))
+        self.assertEqual(sorted(os.listdir(self.work_dir)), ['once.index', 'once.pickle'])
+        # Built again once the source file changes
+        with open(os.path.join(self.work_dir, 'once.pickle'), 'ab') as f:
+            f.write(b'\n')
+        rebuilt = self.open('once', records=[('chr1', 1, 10, 'new')])
+        self.assertEqual(rebuilt.query('chr1', 5), ['new'])
+        self.assertEqual(first.query('chr1', 5000), again.query('chr1', 5000))
+        # and opened as it is once the source file is removed
+        os.remove(os.path.join(self.work_dir, 'once.pickle'))
+        self.assertEqual(self.open('once', records=unread()).query('chr1', 5), ['new'])
+
+    def test_unwritable(self):
+        # Kept in memory where the index cannot be written
+        blocker = os.path.join(self.work_dir, 'data')
+        with open(blocker, 'w') as f:
+            f.write('')
+        with open(os.path.join(self.work_dir, 'mem.pickle'), 'w') as f:
+            f.write('')
+        index = self.module.open_index(os.path.join(blocker, 'mem.index'), records=[('chr1', 1, 10, 'x')],
+            sources=[os.path.join(self.work_dir, 'mem.pickle')])
+        self.assertEqual(index.query('chr1', 3), ['x'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+from cravat import BaseCommonModule
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def reader (self, slice, chunk_size=10000, dense_gap=200):
+        return ChunkedReference(slice, chunk_size=chunk_size, dense_gap=dense_gap)
+
+class ChunkedReference (object):
+    """
+    Upper case reference bases for callers that go through positions in
+    sorted order. slice(chrom, start, end) gives the bases from start up to,
+    but not including, end (1-based), as the slice method of the wgs modules
+    does. A read costs about as much as decoding a few hundred bases, so
+    where the running mean distance between lookups is below dense_gap,
+    chunk_size bases are read and later lookups are served from them. Sparse
+    lookups read one base each.
+    """
+
+    def __init__ (self, slice, chunk_size=10000, dense_gap=200):
+        self.slice = slice
+        self.chunk_size = chunk_size
+        self.dense_gap = dense_gap
+        self.chunk_chrom = None
+        self.chunk_start = 0
+        self.chunk = ''
+        self.last_pos = 0
+        self.mean_gap = None
+
+    def ref_base (self, chrom, pos):
+        # Raises whatever slice raises, KeyError for an unknown chrom and
+        # IndexError for a position past its end with the wgs modules.
+        if chrom == self.chunk_chrom and pos >= self.last_pos:
+            gap = pos - self.last_pos
+            self.mean_gap = gap if self.mean_gap is None else 0.9 * self.mean_gap + 0.1 * gap
+        offset = pos - self.chunk_start
+        if chrom != self.chunk_chrom or offset < 0 or offset >= len(self.chunk):
+            if self.mean_gap is not None and self.mean_gap < self.dense_gap:
+                size = self.chunk_size
+            else:
+                size = 1
+            self.chunk = self.slice(chrom, pos, pos + size).upper()
+            self.chunk_chrom = chrom
+            self.chunk_start = pos
+            offset = 0
+        self.last_pos = pos
+        return self.chunk[offset]
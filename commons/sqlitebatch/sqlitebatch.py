@@ -0,0 +1,72 @@
+import sqlite3
+from cravat import BaseCommonModule
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def exact_match (self, annotator, columns):
+        return ExactMatchBatch(annotator, columns)
+
+class ExactMatchBatch (object):
+    """
+    Looks up annotator rows keyed by chrom, pos, ref and alt a batch of
+    input lines at a time.
+
+    The annotator's database has one table per chromosome with pos, ref
+    and alt columns. Instead of one query per variant, the annotator's
+    annotate_batch passes each batch of BaseAnnotator's get_batched_input
+    to load, which fetches the rows at the positions of the batch with
+    one query per chromosome and up to max_params positions. Every key of
+    the batch is kept, with no rows for chromosomes whose query fails,
+    such as chromosomes without a table. Variants outside the current
+    batch, such as in live annotation, fall back to the per-variant query
+    and leave the batch loaded.
+    """
+
+    # The lowest limit on host parameters of SQLite builds
+    max_params = 999
+
+    def __init__ (self, annotator, columns):
+        self.cursor = annotator.dbconn.cursor()
+        self.columns = columns
+        self.rows = {}
+
+    def fetchall (self, input_data):
+        chrom = input_data['chrom']
+        key = (chrom, input_data['pos'], input_data['ref_base'], input_data['alt_base'])
+        if key in self.rows:
+            return self.rows[key]
+        q = 'select {} from {} where pos=? and ref=? and alt=?'.format(', '.join(self.columns), chrom)
+        self.cursor.execute(q, key[1:])
+        return self.cursor.fetchall()
+
+    def fetchone (self, input_data):
+        rows = self.fetchall(input_data)
+        if rows:
+            return rows[0]
+        else:
+            return None
+
+    def load (self, batch_input):
+        self.rows = {}
+        positions_by_chrom = {}
+        for _, _, input_data, _ in batch_input:
+            key = (input_data['chrom'], input_data['pos'], input_data['ref_base'], input_data['alt_base'])
+            if key not in self.rows:
+                self.rows[key] = []
+                positions_by_chrom.setdefault(key[0], set()).add(key[1])
+        cols = ', '.join(self.columns)
+        for chrom, positions in positions_by_chrom.items():
+            positions = sorted(positions)
+            for start in range(0, len(positions), self.max_params):
+                params = positions[start:start + self.max_params]
+                q = 'select pos, ref, alt, {} from {} where pos in ({})'.format(cols, chrom, ', '.join(['?'] * len(params)))
+                try:
+                    self.cursor.execute(q, params)
+                except sqlite3.Error:
+                    break
+                for row in self.cursor:
+                    rows = self.rows.get((chrom,) + row[:3])
+                    if rows is not None:
+                        rows.append(row[3:])
@@ -0,0 +1,211 @@
+"""
+Benchmark of the gnomad3, clinvar and dbsnp annotators with sqlitebatch
+lookups, on synthetic databases with their columns, one table per
+chromosome and no chrM or chrY table. Each annotator runs once with one
+query per variant, as annotate does with no batch loaded, and once a
+batch at a time through annotate_batch, with the batch_size of its yml
+unless --batch-size is given. Run from any directory, e.g.
+
+    python bench_sqlitebatch.py --db-rows 2000000 --variants 1000000
+"""
+import gc
+import os
+import sys
+import time
+import yaml
+import random
+import hashlib
+import sqlite3
+import argparse
+import tempfile
+import importlib.util
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, os.pardir)
+chroms = ['chr{}'.format(i) for i in range(1, 23)] + ['chrX']
+
+def random_af(rng):
+    return rng.random() * 0.01
+
+def random_sig(rng):
+    return rng.choice(['Pathogenic', 'Likely pathogenic', 'Uncertain significance', 'Benign'])
+
+def random_refs(rng):
+    return 'MedGen:C{:07d}'.format(rng.randrange(10 ** 7))
+
+def random_names(rng):
+    return rng.choice(['not provided', 'not specified', 'Hereditary cancer-predisposing syndrome'])
+
+def random_rev_stat(rng):
+    return rng.choice(['criteria provided, single submitter', 'no assertion criteria provided'])
+
+# Columns of each annotator's tables, besides pos, ref and alt, and how to
+# make a value for them
+annotator_columns = {
+    'gnomad3': [(c, 'real', random_af) for c in ['af', 'af_afr', 'af_amr', 'af_asj', 'af_eas', 'af_fin', 'af_nfe', 'af_oth', 'af_sas']],
+    'clinvar': [('sig', 'text', random_sig), ('disease_refs', 'text', random_refs), ('disease_names', 'text', random_names),
+        ('rev_stat', 'text', random_rev_stat), ('id', 'integer', lambda rng: rng.randrange(10 ** 6))],
+    'dbsnp': [('snp', 'integer', lambda rng: rng.randrange(10 ** 9))],
+}
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def random_alt(rng, ref):
+    return rng.choice([b for b in 'ACGT' if b != ref])
+
+def make_sites(n_rows, seed=1):
+    # Variants at random positions of the first 10 Mb of each chromosome
+    rng = random.Random(seed)
+    sites = {}
+    for chrom in chroms:
+        rows = []
+        for _ in range(n_rows // len(chroms)):
+            pos = rng.randint(1, 10000000)
+            ref = rng.choice('ACGT')
+            rows.append((pos, ref, random_alt(rng, ref)))
+        sites[chrom] = rows
+    return sites
+
+def make_db(path, columns, sites, seed=1):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    col_defs = ', '.join(['{} {}'.format(name, sql_type) for name, sql_type, _ in columns])
+    for chrom, rows in sites.items():
+        conn.execute('create table {} (pos integer, ref text, alt text, {})'.format(chrom, col_defs))
+        rows = [row + tuple([value(rng) for _, _, value in columns]) for row in rows]
+        conn.executemany('insert into {} values ({})'.format(chrom, ', '.join(['?'] * (3 + len(columns)))), rows)
+        conn.execute('create index {0}_idx on {0} (pos, ref, alt)'.format(chrom))
+    conn.commit()
+    conn.close()
+
+def write_input(path, sites, n_variants, hit_rate, missing_rate, seed=2):
+    # Chrom, pos, ref and alt lines, sorted like a crv file, with chrM and
+    # chrY variants, which have no table. Returns the share of those.
+    rng = random.Random(seed)
+    variants = []
+    for _ in range(n_variants):
+        if rng.random() < missing_rate:
+            chrom = rng.choice(['chrM', 'chrY'])
+            pos = rng.randint(1, 16569)
+            ref = rng.choice('ACGT')
+            alt = random_alt(rng, ref)
+        else:
+            chrom = rng.choice(chroms)
+            if rng.random() < hit_rate:
+                pos, ref, alt = rng.choice(sites[chrom])
+            else:
+                pos = rng.randint(1, 10000000)
+                ref = rng.choice('ACGT')
+                alt = random_alt(rng, ref)
+        variants.append((chrom, pos, ref, alt))
+    order = dict([(c, i) for i, c in enumerate(chroms + ['chrY', 'chrM'])])
+    variants.sort(key=lambda x: (order[x[0]], x[1]))
+    with open(path, 'w') as f:
+        for variant in variants:
+            f.write('{}\t{}\t{}\t{}\n'.format(*variant))
+    return sum([1 for v in variants if v[0] in ('chrM', 'chrY')]) / n_variants
+
+def input_lines(path):
+    # input_data of each line, read as an annotator reads its input rather
+    # than held in memory, where the garbage collector would go through
+    # all of them on each full collection
+    with open(path) as f:
+        for uid, l in enumerate(f, start=1):
+            chrom, pos, ref, alt = l.rstrip('\n').split('\t')
+            yield {'uid': uid, 'chrom': chrom, 'pos': int(pos), 'ref_base': ref, 'alt_base': alt}
+
+def batches(input_path, batch_size):
+    # As BaseAnnotator's get_batched_input gives them
+    batch = []
+    for input_data in input_lines(input_path):
+        batch.append((input_data['uid'], '', input_data, {}))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    yield batch
+
+def drop_page_cache():
+    # Needs root. The database is read from disk again by the next run.
+    os.sync()
+    with open('/proc/sys/vm/drop_caches', 'w') as f:
+        f.write('3\n')
+
+def make_annotator(name, db_path):
+    sqlitebatch = load_module('sqlitebatch', os.path.join(repo_dir, 'commons', 'sqlitebatch', 'sqlitebatch.py'))
+    module = load_module(name, os.path.join(repo_dir, 'annotators', name, name + '.py'))
+    module.get_module = lambda module_name: sqlitebatch.CravatCommonModule
+    # Only what setup, annotate and annotate_batch use of BaseAnnotator
+    annotator = module.CravatAnnotator.__new__(module.CravatAnnotator)
+    annotator.dbconn = sqlite3.connect(db_path)
+    annotator.setup()
+    return annotator
+
+def run_per_variant(name, db_path, input_path):
+    # The outputs go into a digest, as an annotator writes them out
+    # instead of keeping them
+    annotator = make_annotator(name, db_path)
+    digest = hashlib.md5()
+    for input_data in input_lines(input_path):
+        try:
+            out = annotator.annotate(input_data)
+        except sqlite3.Error:
+            # Reported per variant by the annotator
+            out = None
+        digest.update(repr(out).encode())
+    annotator.dbconn.close()
+    return digest.hexdigest()
+
+def run_batched(name, db_path, input_path, batch_size):
+    annotator = make_annotator(name, db_path)
+    digest = hashlib.md5()
+    for batch_input in batches(input_path, batch_size):
+        for _, _, _, _, out in annotator.annotate_batch(batch_input):
+            digest.update(repr(out).encode())
+    annotator.dbconn.close()
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='sqlitebatch benchmark')
+    parser.add_argument('--annotators', nargs='+', default=sorted(annotator_columns), choices=sorted(annotator_columns))
+    parser.add_argument('--db-rows', type=int, default=2000000)
+    parser.add_argument('--variants', type=int, default=200000)
+    parser.add_argument('--hit-rate', type=float, default=0.3)
+    parser.add_argument('--missing-rate', type=float, default=0.01, help='share of variants on chrM and chrY')
+    parser.add_argument('--batch-size', type=int, help='in place of the batch_size of the annotator yml')
+    parser.add_argument('--cold', action='store_true', help='drop the page cache before each run (needs root)')
+    args = parser.parse_args()
+    sites = make_sites(args.db_rows)
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'input.tsv')
+        missing = write_input(input_path, sites, args.variants, args.hit_rate, args.missing_rate)
+        print('{} rows, {} variants, {:.1%} without a table'.format(args.db_rows, args.variants, missing))
+        db_paths = {}
+        for name in args.annotators:
+            db_paths[name] = os.path.join(work_dir, name + '.sqlite')
+            make_db(db_paths[name], annotator_columns[name], sites)
+        # The sites would otherwise slow down every full collection of the
+        # garbage collector
+        del sites
+        gc.collect()
+        for name in args.annotators:
+            with open(os.path.join(repo_dir, 'annotators', name, name + '.yml')) as f:
+                batch_size = args.batch_size or yaml.safe_load(f).get('batch_size', 1)
+            if args.cold:
+                drop_page_cache()
+            start = time.perf_counter()
+            expected = run_per_variant(name, db_paths[name], input_path)
+            elapsed = time.perf_counter() - start
+            print('{:<32} {:8.2f} s {:10.0f} variants/s'.format(name + ' query per variant', elapsed, args.variants / elapsed))
+            if args.cold:
+                drop_page_cache()
+            start = time.perf_counter()
+            results = run_batched(name, db_paths[name], input_path, batch_size)
+            elapsed = time.perf_counter() - start
+            print('{:<32} {:8.2f} s {:10.0f} variants/s, same output: {}'.format(
+                '{} batches of {}'.format(name, batch_size), elapsed, args.variants / elapsed, results == expected))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import gzip
+import struct
+import tabix
+from cravat import BaseCommonModule
+
+class CravatCommonModule (BaseCommonModule):
+    def setup (self):
+        pass
+
+    def open (self, path, max_gap=1000):
+        return TabixSweep(path, max_gap=max_gap)
+
+class TabixSweep (object):
+    """
+    Drop-in for a pytabix handle's query that serves position-sorted
+    queries from one forward cursor per chromosome.
+
+    Records read for one query are kept until a later query starts past
+    their end, so neighbouring variants reuse the block that is already
+    decompressed. A query that goes backwards, changes chromosome, or
+    skips more than max_gap bases past the last record read seeks with a
+    fresh tabix query, which is what random access did for every variant.
+    Files whose index can not be read are always queried randomly.
+    """
+    max_pos = 1 << 29
+
+    def __init__ (self, path, max_gap=1000):
+        self.tb = tabix.open(path)
+        self.max_gap = max_gap
+        self.columns = self.read_index_columns(path + '.tbi')
+        self.chrom = None
+        self.start = None
+        self.it = None
+        self.buf = []
+        self.last_beg = None
+        self.seeks = 0
+
+    def read_index_columns (self, index_path):
+        # (begin column, end column, is VCF, is 0-based) from the .tbi header
+        try:
+            with gzip.open(index_path, 'rb') as index:
+                header = index.read(36)
+        except (OSError, EOFError):
+            return None
+        if len(header) < 36 or header[:4] != b'TBI\1':
+            return None
+        _, fmt, _, col_beg, col_end = struct.unpack('<8i', header[4:])[:5]
+        return (col_beg - 1, col_end - 1, fmt & 0xffff == 2, bool(fmt & 0x10000))
+
+    def interval (self, record):
+        col_beg, col_end, is_vcf, zero_based = self.columns
+        beg = int(record[col_beg])
+        if not zero_based:
+            beg -= 1
+        if is_vcf:
+            end = beg + len(record[3])
+        elif col_end >= 0 and col_end != col_beg:
+            end = int(record[col_end])
+        else:
+            end = beg + 1
+        return beg, end
+
+    def query (self, chrom, start, end):
+        if self.columns is None:
+            return list(self.tb.query(chrom, start, end))
+        if (chrom != self.chrom or start < self.start
+                or (self.last_beg is not None and start - self.last_beg > self.max_gap)):
+            self.seek(chrom, start)
+        self.start = start
+        self.buf = [r for r in self.buf if r[1] > start]
+        while self.it is not None and (not self.buf or self.buf[-1][0] < end):
+            record = next(self.it, None)
+            if record is None:
+                self.it = None
+                break
+            beg, rec_end = self.interval(record)
+            self.last_beg = beg
+            self.buf.append((beg, rec_end, record))
+        return [r[2] for r in self.buf if r[0] < end and r[1] > start]
+
+    def seek (self, chrom, start):
+        self.chrom = None
+        self.buf = []
+        self.last_beg = None
+        self.it = self.tb.query(chrom, start, self.max_pos)
+        self.chrom = chrom
+        self.seeks += 1
@@ -0,0 +1,93 @@
+"""
+Benchmark of tabixsweep on a synthetic CADD-style file (three rows per
+base) with exome-like and WGS-like variant positions, sorted and
+shuffled, against one pytabix query per variant. Needs pytabix, and
+pysam to write the index. Run from any directory, e.g.
+
+    python bench_tabixsweep.py --length 1000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import importlib.util
+import tabix
+import pysam
+
+def load_module():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'tabixsweep.py')
+    spec = importlib.util.spec_from_file_location('tabixsweep', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def write_scores(path, length, seed=1):
+    # chrom, pos, ref, alt, raw score and phred for every base and alt,
+    # as in cadd.tsv.gz
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for pos in range(1, length + 1):
+            ref = rng.choice('ACGT')
+            for alt in 'ACGT':
+                if alt != ref:
+                    score = rng.random()
+                    f.write('22\t{}\t{}\t{}\t{:.6f}\t{:.3f}\n'.format(pos, ref, alt, score, score * 40))
+    gz_path = path + '.gz'
+    pysam.tabix_compress(path, gz_path, force=True)
+    pysam.tabix_index(gz_path, seq_col=0, start_col=1, end_col=1, force=True)
+    os.remove(path)
+    return gz_path
+
+def exome_positions(length, rng, exon_len=150, exon_gap=8000, per_exon=3):
+    positions = []
+    start = rng.randint(1, exon_gap)
+    while start + exon_len < length:
+        positions += sorted(rng.sample(range(start, start + exon_len), per_exon))
+        start += exon_len + rng.randint(exon_gap // 2, exon_gap * 3 // 2)
+    return positions
+
+def wgs_positions(length, rng, mean_gap=650):
+    positions = []
+    pos = 1
+    while True:
+        pos += 1 + int(rng.expovariate(1 / mean_gap))
+        if pos > length:
+            return positions
+        positions.append(pos)
+
+def run(tb, positions):
+    return [tb.query('22', pos - 1, pos) for pos in positions]
+
+def main():
+    parser = argparse.ArgumentParser(description='tabixsweep benchmark')
+    parser.add_argument('--length', type=int, default=1000000, help='bases of the synthetic chromosome')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    module = load_module()
+    rng = random.Random(2)
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = write_scores(os.path.join(work_dir, 'cadd.tsv'), args.length)
+        print('{} bases, {} rows, {:.0f} MB'.format(args.length, args.length * 3, os.path.getsize(path) / 1e6))
+        for label, positions in (('exome', exome_positions(args.length, rng)), ('WGS', wgs_positions(args.length, rng))):
+            shuffled = list(positions)
+            rng.shuffle(shuffled)
+            for order, queries in (('sorted', positions), ('shuffled', shuffled)):
+                times = {}
+                results = {}
+                for name in ('tabix query', 'tabixsweep'):
+                    best = None
+                    for _ in range(args.repeat):
+                        tb = tabix.open(path) if name == 'tabix query' else module.TabixSweep(path)
+                        start = time.perf_counter()
+                        results[name] = [[list(r) for r in x] for x in run(tb, queries)]
+                        elapsed = time.perf_counter() - start
+                        best = elapsed if best is None else min(best, elapsed)
+                    times[name] = best
+                print('{:<6} {:<9} {:6d} variants  tabix query {:6.2f} s  tabixsweep {:6.2f} s  {:5.0f} seeks  same records: {}'.format(
+                    label, order, len(queries), times['tabix query'], times['tabixsweep'], tb.seeks,
+                    results['tabix query'] == results['tabixsweep']))
+
+if __name__ == '__main__':
+    sys.exit(main())
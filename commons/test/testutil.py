@@ -0,0 +1,59 @@
+"""
+Helpers shared by the tests and benchmarks of the common modules: loading
+a module of this repo from its file, and random intervals and variants.
+A module's test/harness.py imports it with
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'test'))
+    import testutil
+"""
+import os
+import random
+import importlib.util
+
+repo_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+
+def load_path(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def load_common(name):
+    return load_path(name, os.path.join(repo_dir, 'commons', name, name + '.py'))
+
+def load_annotator(name):
+    return load_path(name, os.path.join(repo_dir, 'annotators', name, name + '.py'))
+
+def random_intervals(n, chrom_len, rng, length):
+    # n distinct (begin, end) pairs in the order they were drawn, with
+    # begin in [1, chrom_len) and end - begin from length(rng)
+    intervals = []
+    seen = set()
+    while len(intervals) < n:
+        begin = rng.randrange(1, chrom_len)
+        interval = (begin, begin + length(rng))
+        if interval not in seen:
+            seen.add(interval)
+            intervals.append(interval)
+    return intervals
+
+def random_variants(n, chroms=('chr1', 'chr2', 'chrX'), max_pos=None, seed=1):
+    # Sorted (chrom, pos, ref, alt) keys below max_pos (50 per variant by
+    # default), with a few positions holding more than one alt and some
+    # indels
+    rng = random.Random(seed)
+    max_pos = max_pos or 50 * n
+    variants = set()
+    while len(variants) < n:
+        chrom = rng.choice(chroms)
+        pos = rng.randrange(1, max_pos)
+        ref = rng.choice('ACGT')
+        for alt in rng.sample([b for b in 'ACGT' if b != ref], rng.choice([1, 1, 1, 2])):
+            variants.add((chrom, pos, ref, alt))
+        if rng.random() < 0.05:
+            variants.add((chrom, pos, ref + rng.choice('ACGT'), ref))
+    return sorted(variants)
+
+def input_data(variant):
+    chrom, pos, ref, alt = variant
+    return {'chrom': chrom, 'pos': pos, 'ref_base': ref, 'alt_base': alt}
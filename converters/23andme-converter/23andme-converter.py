@@ -3,6 +3,7 @@ from cravat import BadFormatError
 import cravat.constants as constants
 from pyliftover import LiftOver
 import os
+import logging
 from cravat.exceptions import LiftoverFailure, InvalidData
 from cravat.inout import CravatWriter
 from cravat import get_wgs_reader
@@ -19,6 +20,9 @@ class CravatConverter(BaseConverter):
             },
         ]
         self.found_vars = set()
+        self.found_locus = None
+        self.found_chroms = set()
+        self.sorted_input = True
     
     def check_format(self, f):
         return '23andMe' in f.readline()
@@ -26,6 +30,7 @@ class CravatConverter(BaseConverter):
     def setup(self, f):
         self.wgs = get_wgs_reader(assembly='hg19')
         self.good_vars = set(['T','C','G','A'])
+        self.logger = logging.getLogger('cravat.converter')
 
     def convert_line(self, l):
         ret = []
@@ -38,7 +43,8 @@ class CravatConverter(BaseConverter):
         chrom = 'chr'+chrom
         pos = int(toks[2])
         try:
-            ref = self.wgs.slice(chrom, pos).upper()
+            # Input is sorted by position within a chromosome
+            ref = self.wgs.ref_base(chrom, pos)
         except KeyError:
             raise InvalidData(f'Bad chrom {chrom}')
         except IndexError:
@@ -54,6 +60,17 @@ class CravatConverter(BaseConverter):
         except IndexError:
             zygosity = 'hom'
             
+        # Duplicates are at the same position of sorted input, so only the
+        # variants of the current position are remembered. Once the input
+        # turns out not to be sorted, every variant from there on is.
+        if self.sorted_input and (chrom, pos) != self.found_locus:
+            if chrom in self.found_chroms and (chrom != self.found_locus[0] or pos < self.found_locus[1]):
+                self.sorted_input = False
+                self.logger.warning('input is not sorted by position at {}:{}. Duplicates of variants before it may not be skipped.'.format(chrom, pos))
+            else:
+                self.found_vars = set()
+            self.found_locus = (chrom, pos)
+            self.found_chroms.add(chrom)
         for var in geno:
             if var in self.good_vars and var != ref:
                 alt = var
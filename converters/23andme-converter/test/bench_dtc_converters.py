@@ -0,0 +1,159 @@
+"""
+Benchmark of the 23andMe, AncestryDNA and FTDNA converters on a synthetic
+genotype array file, sorted by position as the vendors ship them. The
+reference is a random 2bit genome with the hg19 chromosome lengths, read
+through copies of the hg19wgs and refchunks modules. --genome-scale
+shrinks the genome to place the SNPs closer together, and --shuffle
+writes the lines in random order, as in input that is not sorted. Each converter runs in its own process
+and reports lines/s and peak memory. Older converters can be timed on the
+same file with --converter, e.g.
+
+    git show <rev>:converters/23andme-converter/23andme-converter.py > old-23andme-converter.py
+    python bench_dtc_converters.py --format 23andme --converter ../23andme-converter.py old-23andme-converter.py
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import struct
+import argparse
+import resource
+import tempfile
+import subprocess
+import importlib.util
+
+converters_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir)
+hg19_lengths = [
+    ('chr1', 249250621), ('chr2', 243199373), ('chr3', 198022430), ('chr4', 191154276), ('chr5', 180915260),
+    ('chr6', 171115067), ('chr7', 159138663), ('chr8', 146364022), ('chr9', 141213431), ('chr10', 135534747),
+    ('chr11', 135006516), ('chr12', 133851895), ('chr13', 115169878), ('chr14', 107349540), ('chr15', 102531392),
+    ('chr16', 90354753), ('chr17', 81195210), ('chr18', 78077248), ('chr19', 59128983), ('chr20', 63025520),
+    ('chr21', 48129895), ('chr22', 51304566), ('chrX', 155270560), ('chrY', 59373566), ('chrM', 16571),
+]
+twobit_bases = 'TCAG'
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def write_twobit_index(f, lengths):
+    # Header and index of a 2bit file whose sequences have no N or mask
+    # blocks, so each takes 16 bytes and then its bases, 4 to a byte
+    f.write(struct.pack('<IIII', 0x1A412743, 0, len(lengths), 0))
+    offset = 16 + sum([1 + len(name) + 4 for name, _ in lengths])
+    for name, length in lengths:
+        f.write(struct.pack('<B', len(name)) + name.encode() + struct.pack('<I', offset))
+        offset += 16 + (length + 3) // 4
+
+def packed_base(packed, pos):
+    return twobit_bases[packed[(pos - 1) // 4] >> (6 - 2 * ((pos - 1) % 4)) & 3]
+
+def header_lines(fmt):
+    if fmt == '23andme':
+        return ['# This data file generated by 23andMe at: Fri Nov 30 20:12:57 2018\n', '# rsid\tchromosome\tposition\tgenotype\n']
+    elif fmt == 'ancestrydna':
+        return ['#AncestryDNA raw data download\n', 'rsid\tchromosome\tposition\tallele1\tallele2\n']
+    else:
+        return ['RSID,CHROMOSOME,POSITION,RESULT\n']
+
+def genotype_lines(fmt, rng, chrom_index, name, length, packed, n_snps, alt_rate, dup_rate):
+    chrom = name[3:]
+    if chrom == 'M':
+        chrom = 'MT'
+    positions = sorted(rng.sample(range(1, length + 1), min(n_snps, length)))
+    for n, pos in enumerate(positions):
+        ref = packed_base(packed, pos)
+        if rng.random() < alt_rate:
+            alt = rng.choice([x for x in 'ACGT' if x != ref])
+            geno = rng.choice([ref + alt, alt + alt])
+        else:
+            geno = ref + ref
+        rsid = 'rs{}{:09d}'.format(chrom_index + 1, n + 1)
+        if fmt == '23andme':
+            line = '\t'.join([rsid, chrom, str(pos), geno]) + '\n'
+        elif fmt == 'ancestrydna':
+            line = '\t'.join([rsid, str(chrom_index + 1), str(pos), geno[0], geno[1]]) + '\n'
+        else:
+            line = ','.join(['"{}"'.format(x) for x in (rsid, chrom, pos, geno)]) + '\n'
+        yield line
+        if rng.random() < dup_rate:
+            yield line
+
+def make_files(args, work_dir):
+    # Copies of hg19wgs and refchunks, reading a random genome from the
+    # data folder. SNPs are spread over the chromosomes by length.
+    rng = random.Random(1)
+    lengths = [(name, max(1, int(length * args.genome_scale))) for name, length in hg19_lengths]
+    genome_length = sum([length for _, length in lengths])
+    wgs_dir = os.path.join(work_dir, 'hg19wgs')
+    os.makedirs(os.path.join(wgs_dir, 'data'))
+    for name in ('hg19wgs', 'refchunks'):
+        shutil.copy(os.path.join(converters_dir, os.pardir, 'commons', name, name + '.py'), wgs_dir)
+    path = os.path.join(work_dir, 'genotypes.txt')
+    with open(os.path.join(wgs_dir, 'data', 'hg19.2bit'), 'wb') as twobit, open(path, 'w') as f:
+        write_twobit_index(twobit, lengths)
+        f.writelines(header_lines(args.format))
+        lines = []
+        for chrom_index, (name, length) in enumerate(lengths):
+            packed = rng.randbytes((length + 3) // 4)
+            twobit.write(struct.pack('<IIII', length, 0, 0, 0))
+            twobit.write(packed)
+            n_snps = round(args.snps * length / genome_length)
+            lines.extend(genotype_lines(args.format, rng, chrom_index, name, length, packed, n_snps, args.alt_rate, args.dup_rate))
+        if args.shuffle:
+            rng.shuffle(lines)
+        f.writelines(lines)
+    return wgs_dir, path, genome_length
+
+def run_converter(converter_path, wgs_dir, path):
+    wgs_module = load_module('hg19wgs', os.path.join(wgs_dir, 'hg19wgs.py'))
+    wgs_module.get_module = lambda name: load_module(name, os.path.join(wgs_dir, name + '.py')).CravatCommonModule
+    wgs = wgs_module.CravatCommonModule()
+    wgs.setup()
+    module = load_module('dtc_converter', converter_path)
+    module.get_wgs_reader = lambda assembly: wgs
+    converter = module.CravatConverter()
+    n_lines = 0
+    n_variants = 0
+    with open(path) as f:
+        converter.setup(f)
+        start = time.perf_counter()
+        for l in f:
+            n_lines += 1
+            wdicts = converter.convert_line(l)
+            if wdicts is not converter.IGNORE:
+                n_variants += len(wdicts)
+        elapsed = time.perf_counter() - start
+    # ru_maxrss is in kB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print('{:<32} {:8.2f} s {:10.0f} lines/s {:8.0f} MB peak {:8d} variants'.format(
+        os.path.basename(converter_path), elapsed, n_lines / elapsed, peak_mb, n_variants))
+
+def main():
+    parser = argparse.ArgumentParser(description='DTC genotype converter benchmark')
+    parser.add_argument('--format', choices=['23andme', 'ancestrydna', 'ftdna'], default='23andme')
+    parser.add_argument('--snps', type=int, default=1000000)
+    parser.add_argument('--genome-scale', type=float, default=1.0)
+    parser.add_argument('--alt-rate', type=float, default=0.1)
+    parser.add_argument('--dup-rate', type=float, default=0.001)
+    parser.add_argument('--shuffle', action='store_true')
+    parser.add_argument('--converter', nargs='+')
+    parser.add_argument('--run', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    converter_paths = args.converter or [os.path.join(converters_dir, '{0}-converter', '{0}-converter.py').format(args.format)]
+    if args.run:
+        run_converter(converter_paths[0], *args.run)
+        return
+    with tempfile.TemporaryDirectory() as work_dir:
+        wgs_dir, path, genome_length = make_files(args, work_dir)
+        print('{} {} SNPs over {:.0f} Mb, one per {:.0f} bases, {:.0f} MB'.format(
+            args.snps, args.format, genome_length / 1e6, genome_length / args.snps, os.path.getsize(path) / 1e6))
+        for converter_path in converter_paths:
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--run', wgs_dir, path,
+                '--converter', os.path.abspath(converter_path)], check=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
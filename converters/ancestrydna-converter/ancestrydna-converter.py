@@ -43,7 +43,8 @@ class CravatConverter(BaseConverter):
         chrom = 'chr'+chrom
         pos = int(toks[2])
         try:
-            ref = self.wgs.slice(chrom, pos).upper()
+            # Input is sorted by position within a chromosome
+            ref = self.wgs.ref_base(chrom, pos)
         except KeyError:
             raise InvalidData(f'Bad chrom {chrom}')
         except IndexError:
@@ -1,5 +1,6 @@
 from cravat import BaseConverter
 from cravat import BadFormatError
+import re
 
 """
     CRAVAT Input format:  chr pos +/- ref alt [Sample] [Tag(s)]
@@ -10,9 +11,12 @@ from cravat import BadFormatError
 """     
 class CravatConverter(BaseConverter):
     comp_base = {'A':'T','T':'A','C':'G','G':'C','-':'-','N':'N'}
+    # Tab-separated line with strand, which _check_line would accept
+    line_re = re.compile(r'([^\t]*)\t(\d+)\t([+-])\t([ACGTN-]*)\t([ACGTN-]*)(?:\t([^\t]*))?(?:\t([^\t]*))?', re.IGNORECASE)
 
     def __init__(self):
         self.format_name = 'cravat'
+        self.chunk_bytes = 1 << 20
 
     def _switch_strand(self, bases):
         return ''.join([self.comp_base[base] for base in bases[::-1]])
@@ -88,7 +92,37 @@ class CravatConverter(BaseConverter):
             toks.append('')
         if len(toks) == 6:
             toks.append('')    
-        chrom, pos, strand, ref, alt, sample, tags = toks
+        return [self._make_wdict(*toks)]
+
+    def convert_file(self, f, *args, exc_handler=None, **kwargs):
+        # Reads large chunks of lines. Lines in the usual layout are checked
+        # and split with one precompiled pattern, and others go through
+        # convert_line.
+        ln = 0
+        while True:
+            lines = f.readlines(self.chunk_bytes)
+            if not lines:
+                break
+            for l in lines:
+                ln += 1
+                try:
+                    if l.startswith('#'):
+                        wdicts = self.IGNORE
+                    else:
+                        match = self.line_re.fullmatch(l.strip('\r\n'))
+                        if match is None:
+                            wdicts = self.convert_line(l)
+                        else:
+                            wdicts = [self._make_wdict(*match.groups(''))]
+                except Exception as e:
+                    if exc_handler:
+                        exc_handler(ln, l, e)
+                        continue
+                    else:
+                        raise e
+                yield ln, l, wdicts
+
+    def _make_wdict(self, chrom, pos, strand, ref, alt, sample, tags):
         if strand == '-':
             pos = int(pos) - len(ref.replace('-','')) + 1
             alt = self._switch_strand(alt)
@@ -100,4 +134,4 @@ class CravatConverter(BaseConverter):
                  'alt_base':alt,
                  'sample_id':sample,
                  }
-        return [wdict]
+        return wdict
@@ -0,0 +1,76 @@
+"""
+Lines/s benchmark of cravat-converter on a synthetic normalized cravat
+format file, with convert_file's precompiled pattern and with every line
+through convert_line. Both must give the same records and error lines.
+Run from any directory, e.g.
+
+    python bench_cravat_converter.py --lines 2000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import importlib.util
+
+def load_converter():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'cravat-converter.py')
+    spec = importlib.util.spec_from_file_location('cravat_converter', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def random_lines(n_lines, bad_rate, seed=1):
+    rng = random.Random(seed)
+    yield '#chrom\tpos\tstrand\tref\talt\tsample\ttags\n'
+    pos = 0
+    for i in range(n_lines):
+        pos += rng.randint(1, 500)
+        ref = rng.choice(['A', 'C', 'G', 'T', '-', 'AC', 'GTT'])
+        alt = rng.choice([x for x in ['A', 'C', 'G', 'T', '-', 'CAT'] if x != ref])
+        toks = ['chr{}'.format(1 + i * 22 // n_lines), str(pos), rng.choice('++++-'), ref, alt]
+        toks += rng.choice([[], ['s{}'.format(rng.randint(1, 50))], ['s{}'.format(rng.randint(1, 50)), 'tag;x']])
+        if rng.random() < bad_rate:
+            # Malformed lines, reported per line
+            toks[rng.choice([1, 3])] = rng.choice(['x', 'Z', '1.5'])
+        yield '\t'.join(toks) + '\n'
+
+def run_file(converter, path):
+    errors = []
+    with open(path) as f:
+        records = [(ln, wdicts) for ln, _, wdicts in converter.convert_file(f, exc_handler=lambda ln, l, e: errors.append((ln, repr(e))))]
+    return records, errors
+
+def run_per_line(converter, path):
+    records = []
+    errors = []
+    with open(path) as f:
+        for ln, l in enumerate(f, start=1):
+            try:
+                records.append((ln, converter.convert_line(l)))
+            except Exception as e:
+                errors.append((ln, repr(e)))
+    return records, errors
+
+def main():
+    parser = argparse.ArgumentParser(description='cravat-converter benchmark')
+    parser.add_argument('--lines', type=int, default=2000000)
+    parser.add_argument('--bad-rate', type=float, default=0.001)
+    args = parser.parse_args()
+    converter = load_converter().CravatConverter()
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'variants.cravat')
+        with open(path, 'w') as f:
+            f.writelines(random_lines(args.lines, args.bad_rate))
+        print('{} lines, {:.0f} MB'.format(args.lines, os.path.getsize(path) / 1e6))
+        results = []
+        for label, run in (('convert_file', run_file), ('convert_line', run_per_line)):
+            start = time.perf_counter()
+            results.append(run(converter, path))
+            elapsed = time.perf_counter() - start
+            print('{:<16} {:8.2f} s {:10.0f} lines/s'.format(label, elapsed, args.lines / elapsed))
+        print('same records and errors: {}'.format(results[0] == results[1]))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,6 +18,7 @@ class CravatConverter(BaseConverter):
             self.dbconn = None
             self.cursor = None
         self.query_template = 'select chrom, pos, ref, alt from dbsnp where snp=?;'
+        self.chunk_size = 10000
     
     def check_format(self, f):
         return f.readline().startswith('#rsid')
@@ -36,14 +37,68 @@ class CravatConverter(BaseConverter):
     def convert_line(self, l):
         if l.startswith('#'):
             return self.IGNORE
+        rsnum, sample_id, tags = self.parse_line(l)
+        self.cursor.execute(self.query_template, [rsnum])
+        return self.make_wdicts(self.cursor, sample_id, tags)
+
+    def convert_file(self, f, *args, exc_handler=None, **kwargs):
+        # rsids are resolved a chunk of lines at a time, with one join
+        # against a temporary table of the chunk's rsids.
+        self.cursor.execute('create temp table if not exists input_rsids (idx integer, snp integer);')
+        ln = 0
+        while True:
+            chunk = []
+            for l in f:
+                ln += 1
+                chunk.append((ln, l))
+                if len(chunk) == self.chunk_size:
+                    break
+            if not chunk:
+                break
+            parsed = {}
+            errors = {}
+            for idx, (_, l) in enumerate(chunk):
+                if l.startswith('#'):
+                    continue
+                try:
+                    parsed[idx] = self.parse_line(l)
+                except Exception as e:
+                    errors[idx] = e
+            self.cursor.execute('delete from input_rsids;')
+            self.cursor.executemany(
+                'insert into input_rsids values (?, ?);',
+                [(idx, v[0]) for idx, v in parsed.items()]
+            )
+            self.cursor.execute('select i.idx, d.chrom, d.pos, d.ref, d.alt from input_rsids as i join dbsnp as d on d.snp=i.snp;')
+            rows = {}
+            for r in self.cursor:
+                rows.setdefault(r[0], []).append(r[1:])
+            for idx, (ln_chunk, l) in enumerate(chunk):
+                if idx in errors:
+                    if exc_handler:
+                        exc_handler(ln_chunk, l, errors[idx])
+                        continue
+                    else:
+                        raise errors[idx]
+                if idx not in parsed:
+                    yield ln_chunk, l, self.IGNORE
+                    continue
+                _, sample_id, tags = parsed[idx]
+                yield ln_chunk, l, self.make_wdicts(rows.get(idx, []), sample_id, tags)
+            if len(chunk) < self.chunk_size:
+                break
+
+    def parse_line(self, l):
         toks = l.rstrip('\r\n').split()
         rsid = toks[0]
         sample_id = toks[1] if len(toks) > 1 else None
         tags = toks[2] if len(toks) > 2 else None
         rsnum = int(rsid.replace('rs',''))
-        self.cursor.execute(self.query_template, [rsnum])
+        return rsnum, sample_id, tags
+
+    def make_wdicts(self, rows, sample_id, tags):
         out = []
-        for r in self.cursor:
+        for r in rows:
             wdict = {}
             chrom, pos, ref, alt = r
             if chrom<=22:
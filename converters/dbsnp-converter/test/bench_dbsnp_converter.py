@@ -0,0 +1,96 @@
+"""
+Benchmark of dbsnp-converter on 10k, 100k and 1M rsID inputs, resolved a
+chunk at a time by convert_file and one query per line by convert_line.
+The dbsnp table is synthetic, with the rsID index of the real one. Run
+from any directory, e.g.
+
+    python bench_dbsnp_converter.py --db-rows 5000000 --sizes 10000 100000 1000000
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import importlib.util
+
+def load_converter():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'dbsnp-converter.py')
+    spec = importlib.util.spec_from_file_location('dbsnp_converter', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_db(path, n_rows, seed=1):
+    # rsIDs are spread over ten times as many numbers as there are rows,
+    # and some rsIDs have more than one row (multi-allelic sites)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute('create table dbsnp (snp integer, chrom integer, pos integer, ref text, alt text)')
+    def rows():
+        snp = 0
+        for _ in range(n_rows):
+            if rng.random() > 0.05:
+                snp += rng.randint(1, 19)
+            ref, alt = rng.sample('ACGT', 2)
+            yield snp, rng.randint(1, 25), rng.randint(1, 240000000), ref, alt
+    conn.executemany('insert into dbsnp values (?, ?, ?, ?, ?)', rows())
+    conn.execute('create index snp_idx on dbsnp (snp)')
+    conn.commit()
+    max_snp = conn.execute('select max(snp) from dbsnp').fetchone()[0]
+    conn.close()
+    return max_snp
+
+def write_input(path, n, max_snp, seed=2):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write('#rsid sample_id tag\n')
+        for i in range(n):
+            f.write('rs{} s{:02d} tag{}\n'.format(rng.randint(1, max_snp), i % 20, i % 7))
+    return path
+
+def open_converter(db_path):
+    converter = load_converter().CravatConverter()
+    converter.dbconn = sqlite3.connect(db_path)
+    converter.cursor = converter.dbconn.cursor()
+    return converter
+
+def run_chunked(db_path, path):
+    converter = open_converter(db_path)
+    with open(path) as f:
+        return [x[2] for x in converter.convert_file(f)]
+
+def run_per_line(db_path, path):
+    converter = open_converter(db_path)
+    with open(path) as f:
+        return [converter.convert_line(l) for l in f]
+
+def main():
+    parser = argparse.ArgumentParser(description='dbsnp-converter benchmark')
+    parser.add_argument('--db-rows', type=int, default=5000000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'dbsnp-converter.sqlite')
+        max_snp = make_db(db_path, args.db_rows)
+        print('{} dbsnp rows, {:.0f} MB'.format(args.db_rows, os.path.getsize(db_path) / 1e6))
+        for n in args.sizes:
+            path = write_input(os.path.join(work_dir, 'rsids.txt'), n, max_snp)
+            for label, run in (('chunked', run_chunked), ('per line', run_per_line)):
+                # Best of a few runs, so neither pays for a cold page cache
+                times = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    converted = run(db_path, path)
+                    times.append(time.perf_counter() - start)
+                elapsed = min(times)
+                print('{:>8} rsIDs {:<10} {:8.2f} s {:10.0f} lines/s'.format(n, label, elapsed, n / elapsed))
+                if label == 'chunked':
+                    chunked = converted
+                elif converted != chunked:
+                    print('output differs from the chunked output')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,29 @@
-from rpy2.robjects.packages import importr
-import rpy2.robjects as robjects
-from rpy2.robjects.vectors import StrVector
-import rpy2.rinterface as ri
+import numpy as np
 from cravat import BaseConverter
 import os
 
+#(variant, sample, allele index, zygosity) for every non-reference genotype of a block, in variant then sample order.
+#genotype is the ploidy x sample x variant array seqGetData returns, with NA as the smallest int. Missing alleles are -1
+#and are dropped by the caller.
+def block_calls(genotype):
+    genotype = np.asarray(genotype).transpose(2, 1, 0)[:, :, :2].astype(np.int64)
+    genotype[genotype < 0] = -1
+    first = genotype[:, :, 0]
+    second = genotype[:, :, 1]
+    variants, samples = np.nonzero((first != 0) | (second != 0))
+    first = first[variants, samples]
+    second = second[variants, samples]
+    for variant, sample, num1, num2 in zip(variants.tolist(), samples.tolist(), first.tolist(), second.tolist()):
+        if num2 == 0:
+            yield variant, sample, num1, "het"
+        elif num1 == 0:
+            yield variant, sample, num2, "het"
+        elif num1 == num2:
+            yield variant, sample, num1, "hom"
+        else:
+            yield variant, sample, num1, "het"
+            yield variant, sample, num2, "het"
+
 class CravatConverter(BaseConverter):
     def __init__(self):
         self.format_name = 'gds'
@@ -23,63 +42,17 @@ class CravatConverter(BaseConverter):
     #intentional lack of implementation for the convert_line function as gds is a binary file format
 
     def convert_file(self, f, exc_handler = None, buffsize = 10000):
+        #rpy2 starts R when imported, so only GDS conversions need R installed
+        from rpy2.robjects.packages import importr
+        import rpy2.robjects as robjects
+        from rpy2.robjects import numpy2ri
+        from rpy2.robjects.conversion import localconverter
+        import rpy2.rinterface as ri
         SeqArray = importr("SeqArray")
         file = SeqArray.seqOpen(os.path.realpath(f.name))
-        sample = SeqArray.seqGetData(file, "sample.id")
-        robjects.r('sampleID = {sample}'.format(sample = sample.r_repr()))
+        sample = list(SeqArray.seqGetData(file, "sample.id"))
         numOfVariants = SeqArray.seqSummary(file, varname = "variant.id")[0]
 
-        robjects.r('''
-        output <- function(data) {
-        lines <- matrix(, nrow = 0, ncol = 6)
-        chrom = data[[1]]
-        pos = data[[2]]
-        alleles <- c(strsplit(data[[3]][1], ",")[[1]], ".")
-        genotype = data[[4]]
-        
-        internalWrite <- function(alt, hom_het, id) {
-            lines <<- rbind(lines, c(chrom, pos, alleles[1], alt, hom_het, id))
-        }
-        
-        genotype[is.na(genotype)] = length(alleles) - 1
-        
-        for (col in 1:ncol(genotype)) {
-            num1 = genotype[1, col] + 1
-            num2 = genotype[2, col] + 1
-            id = sampleID[col]
-            
-            if (num1 == 1 & num2 == 1) {
-            #nothing to print
-            }
-            else if (num1 != 1 & num2 == 1) {
-            internalWrite(alleles[num1], "het", id)
-            }
-            else if (num1 == 1 & num2 != 1) {
-            internalWrite(alleles[num2], "het", id)
-            }
-            else if (num1 == num2) {
-            internalWrite(alleles[num1], "hom", id)
-            }
-            else {
-            internalWrite(alleles[num1], "het", id)
-            internalWrite(alleles[num2], "het", id)
-            }
-        }
-        return(lines)
-        }
-        ''')
-        output = robjects.globalenv['output']
-
-        @ri.rternalize
-        def printWithStops(data):
-            result = []
-            lines = output(data)
-            rows = len(lines) // 6
-
-            for line in range(rows):
-                result.append(" ".join([lines[line], lines[line+ rows], lines[line+ (2* rows)], lines[line+ (3* rows)], lines[line+ (4* rows)], lines[line+ (5* rows)]]))
-            return StrVector(result)
-
         #returns pairs (a,b) such that the first a is equal to i, the last b is equal to n+1. If we look at all a's inclusively and all b's
         #exclusively then this generates intervals that partition the set of numbers from 1 to n (inclusively) such that all intervals
         #contain a buff amount of numbers except for possibly the last interval 
@@ -89,36 +62,46 @@ class CravatConverter(BaseConverter):
                     buff -= i + buff - n-1
                 yield [i, i+buff]
                 i += buff 
-        
-        for start, end in inclusiveRanges(1, numOfVariants, buffsize):
-            try:
-                robjects.r('array = c({previous}:{next})'.format(previous = start, next = end - 1))
-                SeqArray.seqSetFilter(file, variant_sel = robjects.globalenv['array'], verbose = False)
 
-                result = SeqArray.seqApply(file, StrVector(["chromosome", "position", "allele", "genotype"]), FUN= printWithStops, margin="by.variant", as_is="list")
+        #pulls a whole block of variants out of R as numpy arrays
+        def getBlock(start, end):
+            SeqArray.seqSetFilter(file, variant_sel = robjects.IntVector(range(start, end)), verbose = False)
+            with localconverter(robjects.default_converter + numpy2ri.converter):
+                chrom = list(SeqArray.seqGetData(file, "chromosome"))
+                pos = np.asarray(SeqArray.seqGetData(file, "position"))
+                alleles = list(SeqArray.seqGetData(file, "allele"))
+                genotype = np.asarray(SeqArray.seqGetData(file, "genotype"))
+            return chrom, pos, alleles, genotype
 
-                for variant in result:
-                    for charLine in variant:
-                        try:
-                            line = charLine.split()
-                            if line[3] == '.':
-                                continue
-                            result = [{
-                            'chrom': line[0],
-                            'pos': line[1],
-                            'ref_base': line[2],
-                            'alt_base': line[3],
-                            'tags': None,
-                            'sample_id': line[5],
-                            'zygosity': line[4]
-                            }]
-                            yield 0,line, result
-                        except Exception as e:
-                            if exc_handler:
-                                exc_handler(0,"",e)
-                                continue
-                            else:
-                                raise e
+        for start, end in inclusiveRanges(1, numOfVariants, buffsize):
+            try:
+                chrom, pos, alleles, genotype = getBlock(start, end)
+                splitAlleles = {}
+                for variant, col, num, hom_het in block_calls(genotype):
+                    try:
+                        if num < 0:
+                            continue
+                        if variant not in splitAlleles:
+                            splitAlleles[variant] = alleles[variant].split(",")
+                        line = [chrom[variant], str(pos[variant]), splitAlleles[variant][0], splitAlleles[variant][num], hom_het, sample[col]]
+                        if line[3] == '.':
+                            continue
+                        result = [{
+                        'chrom': line[0],
+                        'pos': line[1],
+                        'ref_base': line[2],
+                        'alt_base': line[3],
+                        'tags': None,
+                        'sample_id': line[5],
+                        'zygosity': line[4]
+                        }]
+                        yield 0,line, result
+                    except Exception as e:
+                        if exc_handler:
+                            exc_handler(0,"",e)
+                            continue
+                        else:
+                            raise e
             except Exception as e:
                 if exc_handler:
                     exc_handler(0,"",e)
@@ -129,4 +112,4 @@ class CravatConverter(BaseConverter):
 
         #closes the embedded R subprocess and deletes rpy2 objects
         ri.endr(0)
-        del file, output, printWithStops, sample, variant
\ No newline at end of file
+        del file, sample
@@ -0,0 +1,108 @@
+"""
+Benchmark of gds-converter on a synthetic SeqArray GDS file. Needs R with
+SeqArray and rpy2. The GDS file is made from a random multi-sample VCF
+with seqVCF2GDS. Each converter runs in its own process, since
+convert_file ends the embedded R session, and reports its time and peak
+memory, and the converters' output lines are compared. An older converter
+can be timed on the same file with --converter, e.g. one saved with
+
+    git show <rev>:converters/gds-converter/gds-converter.py > old-gds-converter.py
+    python bench_gds_converter.py --converter ../gds-converter.py old-gds-converter.py
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import subprocess
+import importlib.util
+
+def write_vcf(path, n_variants, n_samples, carrier_rate, seed=1):
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write('##fileformat=VCFv4.2\n')
+        f.write('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n')
+        for chrom in ('chr1', 'chr2'):
+            f.write('##contig=<ID={}>\n'.format(chrom))
+        f.write('\t'.join(['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO', 'FORMAT'] +
+            ['S{}'.format(i) for i in range(n_samples)]) + '\n')
+        pos = 10000
+        for i in range(n_variants):
+            chrom = 'chr1' if i < n_variants // 2 else 'chr2'
+            if i == n_variants // 2:
+                pos = 10000
+            pos += rng.randint(1, 200)
+            ref, alt = rng.sample('ACGT', 2)
+            if rng.random() < 0.1:
+                alt += ',' + rng.choice([x for x in 'ACGT' if x not in (ref, alt)])
+            n_alt = alt.count(',') + 1
+            gts = []
+            for _ in range(n_samples):
+                if rng.random() < carrier_rate:
+                    gts.append('{}/{}'.format(rng.randint(0, n_alt), rng.randint(1, n_alt)))
+                else:
+                    gts.append(rng.choice(['0/0', '0/0', '0/0', './.']) if rng.random() < 0.05 else '0/0')
+            f.write('\t'.join([chrom, str(pos), '.', ref, alt, '.', 'PASS', '.', 'GT'] + gts) + '\n')
+    return path
+
+def make_gds(args, work_dir):
+    from rpy2.robjects.packages import importr
+    SeqArray = importr('SeqArray')
+    vcf_path = write_vcf(os.path.join(work_dir, 'synthetic.vcf'), args.variants, args.samples, args.carrier_rate)
+    gds_path = os.path.join(work_dir, 'synthetic.gds')
+    SeqArray.seqVCF2GDS(vcf_path, gds_path, verbose=False)
+    return gds_path
+
+def run_converter(converter_path, gds_path, buffsize, out_path):
+    spec = importlib.util.spec_from_file_location('gds_converter', converter_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    converter = module.CravatConverter()
+    n = 0
+    lines = []
+    start = time.perf_counter()
+    with open(gds_path, 'rb') as f:
+        for _, line, wdicts in converter.convert_file(f, buffsize=buffsize):
+            n += len(wdicts)
+            lines.append(line)
+    elapsed = time.perf_counter() - start
+    with open(out_path, 'w') as f:
+        json.dump([list(l) for l in lines], f)
+    # ru_maxrss is in kB on Linux, and counts the embedded R session
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print('{:<32} {:8.2f} s {:10.0f} calls/s {:8.0f} MB peak'.format(
+        os.path.basename(converter_path), elapsed, n / elapsed, peak_mb))
+
+def main():
+    parser = argparse.ArgumentParser(description='gds-converter benchmark')
+    parser.add_argument('--variants', type=int, default=100000)
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--carrier-rate', type=float, default=0.02)
+    parser.add_argument('--buffsize', type=int, default=10000)
+    parser.add_argument('--converter', nargs='+',
+        default=[os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'gds-converter.py')])
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run_converter(args.converter[0], args.run, args.buffsize, args.out)
+        return
+    with tempfile.TemporaryDirectory() as work_dir:
+        gds_path = make_gds(args, work_dir)
+        print('{} variants x {} samples, {:.0%} carriers, {:.0f} MB GDS'.format(
+            args.variants, args.samples, args.carrier_rate, os.path.getsize(gds_path) / 1e6))
+        outputs = []
+        for i, converter_path in enumerate(args.converter):
+            out_path = os.path.join(work_dir, 'lines{}.json'.format(i))
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--run', gds_path, '--out', out_path,
+                '--buffsize', str(args.buffsize), '--converter', os.path.abspath(converter_path)], check=True)
+            with open(out_path) as f:
+                outputs.append(json.load(f))
+        if len(outputs) > 1:
+            print('same output: {}'.format(all([o == outputs[0] for o in outputs[1:]])))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Tests that gds-converter gives the calls the R output function it
+replaced gave. The block step is tested on genotype arrays laid out as
+seqGetData returns them. The whole conversion of a GDS file made from a
+VCF runs where R, SeqArray and rpy2 are installed. Run with
+
+    python -m pytest converters/gds-converter/test
+"""
+import os
+import sys
+import random
+import tempfile
+import unittest
+import importlib.util
+import numpy as np
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, test_dir)
+import bench_gds_converter
+
+# NA in an R integer array
+r_na = np.iinfo(np.int32).min
+
+def load_converter():
+    path = os.path.join(test_dir, os.pardir, 'gds-converter.py')
+    spec = importlib.util.spec_from_file_location('gds_converter', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def have_seqarray():
+    try:
+        from rpy2.robjects.packages import importr
+        importr('SeqArray')
+    except Exception:
+        return False
+    return True
+
+def r_output(chrom, pos, allele, genotype, samples):
+    # The lines of the R output function of gds-converter 1.0.x for one
+    # variant, given its (first, second) allele indices per sample with
+    # None for NA, without the lines whose alt is '.'
+    alleles = allele.split(',') + ['.']
+    lines = []
+    for (num1, num2), sample in zip(genotype, samples):
+        num1 = len(alleles) - 1 if num1 is None else num1
+        num2 = len(alleles) - 1 if num2 is None else num2
+        if num1 == 0 and num2 == 0:
+            continue
+        elif num2 == 0:
+            lines.append([chrom, str(pos), alleles[0], alleles[num1], 'het', sample])
+        elif num1 == 0:
+            lines.append([chrom, str(pos), alleles[0], alleles[num2], 'het', sample])
+        elif num1 == num2:
+            lines.append([chrom, str(pos), alleles[0], alleles[num1], 'hom', sample])
+        else:
+            lines.append([chrom, str(pos), alleles[0], alleles[num1], 'het', sample])
+            lines.append([chrom, str(pos), alleles[0], alleles[num2], 'het', sample])
+    return [l for l in lines if l[3] != '.']
+
+def block_lines(module, chrom, pos, alleles, genotype, samples):
+    # The lines convert_file makes from a block
+    lines = []
+    for variant, col, num, hom_het in module.block_calls(genotype):
+        if num < 0:
+            continue
+        split = alleles[variant].split(',')
+        line = [chrom[variant], str(pos[variant]), split[0], split[num], hom_het, samples[col]]
+        if line[3] != '.':
+            lines.append(line)
+    return lines
+
+class GdsConverterTest(unittest.TestCase):
+
+    def test_block_calls(self):
+        module = load_converter()
+        rng = random.Random(1)
+        samples = ['S{}'.format(i) for i in range(40)]
+        for block in range(20):
+            n = rng.randrange(1, 300)
+            chrom = [rng.choice(['chr1', 'chrX']) for _ in range(n)]
+            pos = [rng.randrange(1, 10 ** 8) for _ in range(n)]
+            alleles = []
+            calls = []
+            for _ in range(n):
+                alts = rng.sample('CGT*', rng.choice([1, 1, 2, 3]))
+                if rng.random() < 0.05:
+                    alts.append('.')
+                alleles.append(','.join(['A'] + alts))
+                def allele():
+                    r = rng.random()
+                    if r < 0.05:
+                        return None
+                    return rng.randrange(len(alts) + 1) if r < 0.3 else 0
+                calls.append([(allele(), allele()) for _ in samples])
+            # ploidy x sample x variant, a third allele row as in
+            # triploid calls, and NA as the smallest int
+            genotype = np.zeros((3, len(samples), n), dtype=np.int32)
+            for v, variant_calls in enumerate(calls):
+                for s, (num1, num2) in enumerate(variant_calls):
+                    genotype[0, s, v] = r_na if num1 is None else num1
+                    genotype[1, s, v] = r_na if num2 is None else num2
+                    genotype[2, s, v] = rng.randrange(3)
+            expected = []
+            for v in range(n):
+                expected += r_output(chrom[v], pos[v], alleles[v], calls[v], samples)
+            self.assertEqual(block_lines(module, chrom, pos, alleles, genotype, samples), expected, block)
+
+    @unittest.skipUnless(have_seqarray(), 'needs R with SeqArray and rpy2')
+    def test_convert_file(self):
+        # A GDS file made from a VCF, with the calls read from the VCF
+        module = load_converter()
+        with tempfile.TemporaryDirectory() as work_dir:
+            args = type('args', (), {'variants': 2000, 'samples': 30, 'carrier_rate': 0.1})
+            gds_path = bench_gds_converter.make_gds(args, work_dir)
+            expected = []
+            with open(os.path.join(work_dir, 'synthetic.vcf')) as f:
+                for l in f:
+                    if l.startswith('##'):
+                        continue
+                    toks = l.rstrip('\n').split('\t')
+                    if toks[0] == '#CHROM':
+                        samples = toks[9:]
+                        continue
+                    genotype = [tuple([None if a == '.' else int(a) for a in gt.split('/')]) for gt in toks[9:]]
+                    expected += r_output(toks[0], toks[1], toks[3] + ',' + toks[4], genotype, samples)
+            with open(gds_path, 'rb') as f:
+                lines = [line for _, line, _ in module.CravatConverter().convert_file(f, buffsize=300)]
+            self.assertEqual(lines, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ import re
 import os
 import sqlite3
 import subprocess
+import tempfile
 import re
 from cravat import get_wgs_reader
 
@@ -15,6 +16,7 @@ class CravatConverter(BaseConverter):
 
     def __init__(self):
         self.format_name = 'nongenomic'
+        self.chunk_size = 5000
 
     def check_format(self, f):
         return f.readline().startswith('#annotation')
@@ -31,20 +33,104 @@ class CravatConverter(BaseConverter):
     def convert_line(self, l):
         if l.startswith('#'):
             return self.IGNORE
+        annotation, sample_id, tags = self.parse_line(l)
+        outputs = self.run_transvar([annotation])
+        return self.make_wdicts(outputs[annotation], sample_id, tags)
+
+    def convert_file(self, f, *args, exc_handler=None, **kwargs):
+        # Lines are sent to transvar a chunk at a time, with one batch run
+        # per annotation type, instead of a transvar process per line.
+        ln = 0
+        while True:
+            chunk = []
+            for l in f:
+                ln += 1
+                chunk.append((ln, l))
+                if len(chunk) == self.chunk_size:
+                    break
+            if not chunk:
+                break
+            parsed = {}
+            errors = {}
+            for idx, (_, l) in enumerate(chunk):
+                if l.startswith('#'):
+                    continue
+                try:
+                    parsed[idx] = self.parse_line(l)
+                except Exception as e:
+                    errors[idx] = e
+            outputs = {}
+            transvar_error = None
+            if parsed:
+                # A failed transvar run, such as a missing transvar binary,
+                # is reported for each line of the chunk
+                try:
+                    outputs = self.run_transvar([v[0] for v in parsed.values()])
+                except Exception as e:
+                    transvar_error = e
+            for idx, (chunk_ln, l) in enumerate(chunk):
+                if idx not in parsed and idx not in errors:
+                    yield chunk_ln, l, self.IGNORE
+                    continue
+                try:
+                    if idx in errors:
+                        raise errors[idx]
+                    if transvar_error is not None:
+                        raise transvar_error
+                    annotation, sample_id, tags = parsed[idx]
+                    wdicts = self.make_wdicts(outputs[annotation], sample_id, tags)
+                except Exception as e:
+                    if exc_handler:
+                        exc_handler(chunk_ln, l, e)
+                        continue
+                    else:
+                        raise e
+                yield chunk_ln, l, wdicts
+            if len(chunk) < self.chunk_size:
+                break
+
+    def parse_line(self, l):
         toks = l.rstrip('\r\n').split()
         annotation = toks[0]
         sample_id = toks[1] if len(toks) > 1 else None
         tags = toks[2] if len(toks) > 2 else None
-        if ':p.' in annotation:
-            query = "transvar panno -i " + annotation  + " --ucsc --refversion " + self.refversion
-        elif ':c.' in annotation:
-            query = "transvar canno -i " + '"' + annotation + '"'  + " --ccds --refversion " + self.refversion
-        elif ':g.' in annotation:
-            query = "transvar ganno -i " + '"' + annotation + '"'  + " --ccds --refversion " + self.refversion
-        output = subprocess.Popen(query, shell=True, stdout=subprocess.PIPE)
+        if ':p.' not in annotation and ':c.' not in annotation and ':g.' not in annotation:
+            raise BadFormatError('Annotation should have p., c. or g. notation')
+        return annotation, sample_id, tags
+
+    def run_transvar(self, annotations):
+        # Returns the transvar output lines of each annotation
+        queries = {}
+        seen = set()
+        for annotation in annotations:
+            if annotation in seen:
+                continue
+            seen.add(annotation)
+            if ':p.' in annotation:
+                query = ('panno', '--ucsc')
+            elif ':c.' in annotation:
+                query = ('canno', '--ccds')
+            elif ':g.' in annotation:
+                query = ('ganno', '--ccds')
+            queries.setdefault(query, []).append(annotation)
+        outputs = {annotation: [] for annotation in annotations}
+        for (subcommand, db), query_annotations in queries.items():
+            with tempfile.NamedTemporaryFile('w', suffix='.txt') as wf:
+                wf.write('\n'.join(query_annotations) + '\n')
+                wf.flush()
+                cmd = ['transvar', subcommand, '-l', wf.name, db, '--refversion', self.refversion]
+                output = subprocess.run(cmd, stdout=subprocess.PIPE)
+            for line in output.stdout.decode('utf-8').splitlines():
+                # First column is the input annotation. The header and
+                # anything else not matching an input are skipped.
+                toks = line.split(None, 1)
+                if toks and toks[0] in outputs:
+                    outputs[toks[0]].append(line)
+        return outputs
+
+    def make_wdicts(self, lines, sample_id, tags):
         out = []
-        for line in output.stdout.readlines():
-            dline  = line.decode('utf-8')
+        for dline in lines:
             d = dline.rstrip('\r').split()
             if d[5] != 'region':
                 gene = d[3]
@@ -0,0 +1,70 @@
+"""
+Benchmark of nongenomic-converter on the protein changes of test/input,
+repeated over samples to the number of lines asked for. convert_file
+sends each chunk to one transvar run, and convert_line runs transvar once
+per line, as the converter did before batching. Needs transvar with its
+annotation databases (transvar config --download_anno --refversion hg38)
+and the hg38wgs module, e.g.
+
+    python bench_nongenomic_converter.py --lines 5000 --per-line 100
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import importlib.util
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+
+def load_converter():
+    path = os.path.join(test_dir, os.pardir, 'nongenomic-converter.py')
+    spec = importlib.util.spec_from_file_location('nongenomic_converter', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def write_input(path, n_lines):
+    with open(os.path.join(test_dir, 'input')) as f:
+        annotations = [l.split()[0] for l in f if not l.startswith('#') and l.strip()]
+    with open(path, 'w') as f:
+        f.write('#annotation sample_id\n')
+        for i in range(n_lines):
+            f.write('{}\ts{}\n'.format(annotations[i % len(annotations)], i // len(annotations)))
+    return len(annotations)
+
+def open_converter(path, assembly):
+    converter = load_converter().CravatConverter()
+    converter.input_assembly = assembly
+    with open(path) as f:
+        converter.setup(f)
+    return converter
+
+def main():
+    parser = argparse.ArgumentParser(description='nongenomic-converter benchmark')
+    parser.add_argument('--lines', type=int, default=5000)
+    parser.add_argument('--per-line', type=int, default=100, help='lines converted one transvar run at a time')
+    parser.add_argument('--assembly', default='hg38')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'protein_changes.txt')
+        n_distinct = write_input(path, args.lines)
+        print('{} lines, {} distinct protein changes'.format(args.lines, n_distinct))
+        converter = open_converter(path, args.assembly)
+        errors = []
+        start = time.perf_counter()
+        with open(path) as f:
+            n = sum([1 for _ in converter.convert_file(f, exc_handler=lambda *x: errors.append(x))])
+        elapsed = time.perf_counter() - start
+        print('{:<24} {:8.2f} s {:10.1f} lines/s {} errors'.format('batch transvar runs', elapsed, (n + len(errors)) / elapsed, len(errors)))
+        converter = open_converter(path, args.assembly)
+        start = time.perf_counter()
+        with open(path) as f:
+            f.readline()
+            for _, l in zip(range(args.per_line), f):
+                converter.convert_line(l)
+        elapsed = time.perf_counter() - start
+        print('{:<24} {:8.2f} s {:10.1f} lines/s (first {} lines)'.format('transvar run per line', elapsed, args.per_line / elapsed, args.per_line))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Tests of nongenomic-converter's batch transvar runs, with a stand-in
+transvar script on PATH. Run with
+
+    python -m pytest converters/nongenomic-converter/test
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import importlib.util
+
+test_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Prints a transvar panno/canno/ganno table for the annotations of its -l
+# file, and appends its run to the file named by FAKE_TRANSVAR_LOG
+fake_transvar = '''#!{python}
+import os, sys, json
+args = sys.argv[1:]
+with open(args[args.index('-l') + 1]) as f:
+    annotations = [l.strip() for l in f if l.strip()]
+with open(os.environ['FAKE_TRANSVAR_LOG'], 'a') as log:
+    log.write(json.dumps([args[0], annotations]) + '\\n')
+print('input\\ttranscript\\tgene\\tstrand\\tcoordinates(gDNA/cDNA/protein)\\tregion\\tinfo')
+for n, annotation in enumerate(annotations):
+    gene, change = annotation.split(':', 1)
+    pos = 1000 + sum([ord(c) for c in annotation])
+    rows = 2 if gene == 'PIK3CA' else 1
+    for i in range(rows):
+        print('\\t'.join([annotation, 'NM_{{}} (protein_coding)'.format(n), gene, '+',
+            'chr3:g.{{}}G>A/c.1A>G/{{}}'.format(pos + i, change), 'inside_[cds_in_exon_1]', '.']))
+'''
+
+def load_converter():
+    path = os.path.join(test_dir, os.pardir, 'nongenomic-converter.py')
+    spec = importlib.util.spec_from_file_location('nongenomic_converter', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class TransvarTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.bin_dir = os.path.join(self.work_dir, 'bin')
+        os.makedirs(self.bin_dir)
+        self.log_path = os.path.join(self.work_dir, 'transvar.log')
+        self.env = {'PATH': os.environ['PATH'], 'FAKE_TRANSVAR_LOG': os.environ.get('FAKE_TRANSVAR_LOG')}
+        os.environ['FAKE_TRANSVAR_LOG'] = self.log_path
+        self.module = load_converter()
+        self.converter = self.module.CravatConverter()
+        # setup only picks the wgs reader, which SNVs do not use
+        self.converter.refversion = 'hg38'
+        self.converter.wgs = None
+        self.converter.chunk_size = 4
+        with open(os.path.join(test_dir, 'input')) as f:
+            self.lines = f.read().splitlines(True)
+        self.lines[-1] = self.lines[-1].rstrip('\n') + '\n'
+        # A repeated annotation, a line with no p., c. or g. notation, and a
+        # comment
+        self.lines += ['PIK3CA:p.E545K\ts3\n', 'PIK3CA_E545K\ts3\n', '#comment\n', 'DHODH:p.G152R\ts4\ttag\n']
+
+    def tearDown(self):
+        for key, value in self.env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.work_dir)
+
+    def install_transvar(self):
+        path = os.path.join(self.bin_dir, 'transvar')
+        with open(path, 'w') as f:
+            f.write(fake_transvar.format(python=sys.executable))
+        os.chmod(path, 0o755)
+        os.environ['PATH'] = self.bin_dir + os.pathsep + os.environ['PATH']
+
+    def convert(self):
+        path = os.path.join(self.work_dir, 'nongenomic.txt')
+        with open(path, 'w') as f:
+            f.writelines(self.lines)
+        errors = []
+        with open(path) as f:
+            converted = list(self.converter.convert_file(f, exc_handler=lambda ln, l, e: errors.append((ln, e))))
+        return converted, errors
+
+    def test_batch_runs(self):
+        self.install_transvar()
+        converted, errors = self.convert()
+        self.assertEqual([(ln, type(e)) for ln, e in errors], [(9, self.module.BadFormatError)])
+        by_line = dict([(ln, wdicts) for ln, _, wdicts in converted])
+        self.assertIs(by_line[1], self.converter.IGNORE)
+        self.assertIs(by_line[10], self.converter.IGNORE)
+        # Each line gets the rows of its own annotation, and the repeated
+        # annotation gets the same rows
+        self.assertEqual(len(by_line[2]), 2)
+        self.assertEqual([(w['chrom'], w['pos'], w['sample_id']) for w in by_line[8]],
+            [(w['chrom'], w['pos'], 's3') for w in by_line[2]])
+        self.assertEqual([(w['pos'], w['tags']) for w in by_line[11]], [(by_line[7][0]['pos'], 'tag')])
+        for ln in range(3, 8):
+            self.assertEqual(len(by_line[ln]), 1)
+        # One run per chunk, with each annotation listed once
+        with open(self.log_path) as f:
+            runs = [json.loads(l) for l in f]
+        self.assertEqual(runs, [
+            ['panno', ['PIK3CA:p.E545K', 'ABCC3:p.Y556_V557delinsRRR', 'AATK:p.P1331_A1332insTP']],
+            ['panno', ['AADACL4:p.W263_I267delWRDAI', 'A1BG:p.G132fs*2', 'DHODH:p.G152R', 'PIK3CA:p.E545K']],
+            ['panno', ['DHODH:p.G152R']],
+        ])
+
+    def test_missing_transvar(self):
+        os.environ['PATH'] = self.bin_dir
+        converted, errors = self.convert()
+        # Every annotation line is reported, and the file is read to its end
+        self.assertEqual([ln for ln, _ in errors], [2, 3, 4, 5, 6, 7, 8, 9, 11])
+        self.assertTrue(all([isinstance(e, FileNotFoundError) for ln, e in errors if ln != 9]))
+        self.assertEqual([ln for ln, _, _ in converted], [1, 10])
+
+if __name__ == '__main__':
+    unittest.main()
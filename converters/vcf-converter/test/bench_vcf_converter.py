@@ -0,0 +1,265 @@
+"""
+Benchmarks for vcf-converter on synthetic input. Each subcommand times a
+conversion with one of the converter's fast paths and, where the fast
+path can be switched off, without it. Run from any directory, e.g.
+
+    python bench_vcf_converter.py samples --lines 2000 --samples 2500
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import harness
+
+def timed_convert(path, output_dir, conf=None, patch=None):
+    module = harness.load_converter()
+    converter, f = harness.make_converter(module, path, output_dir, conf=conf)
+    f.close()
+    if patch is not None:
+        patch(converter)
+    start = time.perf_counter()
+    records, errors, _ = harness.convert(path, output_dir, module=module, converter=converter)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(records) + len(errors)
+
+def best_of(n, func):
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def report(label, elapsed, n, unit='lines'):
+    print('{:<32} {:8.2f} s {:10.0f} {}/s'.format(label, elapsed, n / elapsed, unit))
+
+def bench_samples(args, work_dir):
+    # Only carrier sample columns are parsed. Without the GT prefix scan,
+    # pyvcf parses every sample column of every line.
+    path = harness.write_lines(os.path.join(work_dir, 'samples.vcf'),
+        harness.random_vcf_lines(args.lines, args.samples, carrier_rate=args.carrier_rate))
+    print('{} lines x {} samples, {:.0f} MB'.format(args.lines, args.samples, os.path.getsize(path) / 1e6))
+    elapsed, n = timed_convert(path, work_dir)
+    report('carrier columns only', elapsed, n)
+    elapsed, n = timed_convert(path, work_dir, patch=lambda c: setattr(c, 'find_carriers', lambda toks: None))
+    report('all sample columns', elapsed, n)
+
+def bench_workers(args, work_dir):
+    # Contigs of a tabix-indexed bgzipped VCF are converted in forked
+    # workers. One worker is the serial path.
+    chroms = ['chr{}'.format(i) for i in range(1, args.contigs + 1)]
+    vcf_path = harness.write_lines(os.path.join(work_dir, 'workers.vcf'),
+        harness.random_vcf_lines(args.lines, args.samples, chroms=chroms))
+    gz_path = harness.bgzip(vcf_path)
+    harness.tabix_index(gz_path)
+    print('{} lines x {} samples over {} contigs, {:.0f} MB bgzipped'.format(
+        args.lines, args.samples, args.contigs, os.path.getsize(gz_path) / 1e6))
+    for workers in args.workers:
+        elapsed, n = timed_convert(gz_path, work_dir, conf={'workers': workers})
+        report('{} workers'.format(workers), elapsed, n)
+
+def bench_info(args, work_dir):
+    # With include_info, INFO keys that are not included are dropped from
+    # the raw line before pyvcf parses it.
+    path = harness.write_lines(os.path.join(work_dir, 'info.vcf'),
+        harness.random_vcf_lines(args.lines, args.samples, extra_info=args.info_keys, csq=args.csq))
+    print('{} lines, {} extra INFO keys, {} CSQ entries per allele, {:.0f} MB'.format(
+        args.lines, args.info_keys, args.csq, os.path.getsize(path) / 1e6))
+    conf = {'include_info': args.include_info}
+    elapsed, n = timed_convert(path, work_dir, conf=conf)
+    report('unselected keys dropped', elapsed, n)
+    elapsed, n = timed_convert(path, work_dir, conf=conf, patch=lambda c: setattr(c, 'info_keys', None))
+    report('all keys parsed', elapsed, n)
+
+def transposed_csq(csq_fields, csq_entries):
+    # CSQ parsing before the subfield indices: every entry is transposed
+    # into per-field tuples and every field is joined
+    allele_entries = {}
+    for gt_csq in csq_entries:
+        vals = gt_csq.split('|')
+        allele_entries.setdefault(vals[0], []).append(vals)
+    csq = {}
+    for allele, entries in allele_entries.items():
+        transpose = zip(*entries)
+        csq[allele] = dict([(cname, None if all([x == '' for x in value]) else ';'.join(value))
+            for cname, value in zip(csq_fields, transpose)])
+    return csq
+
+def bench_csq(args, work_dir):
+    # parse_csq on the CSQ values of one site at a time, with every
+    # subfield selected and with a few
+    rng = random.Random(1)
+    sites = []
+    for _ in range(args.sites):
+        alts = rng.sample('ACGT', rng.choice([1, 1, 1, 2]))
+        gene = 'GENE{}'.format(rng.randint(1, 999))
+        sites.append([harness.csq_entry(rng, a, gene) for a in alts for _ in range(args.transcripts)])
+    converter = harness.load_converter().CravatConverter()
+    converter.csq_fields = ['CSQ_' + x for x in harness.csq_fields]
+    print('{} sites, {} transcript entries per allele'.format(args.sites, args.transcripts))
+    for label, selected in (('all', converter.csq_fields), ('3 subfields', args.selected)):
+        converter.csq_columns = [(c, i) for i, c in enumerate(converter.csq_fields) if c in selected]
+        report('parse_csq, {}'.format(label), best_of(3, lambda: [converter.parse_csq(e) for e in sites]), len(sites), unit='sites')
+    report('transposed', best_of(3, lambda: [transposed_csq(converter.csq_fields, e) for e in sites]), len(sites), unit='sites')
+
+def bench_gvcf(args, work_dir):
+    # Reference block lines are recognized from the raw ALT column and
+    # skipped before pyvcf parses them
+    path = harness.write_lines(os.path.join(work_dir, 'ref_blocks.g.vcf'), harness.gvcf_lines(args.lines, variant_rate=args.variant_rate))
+    print('{} gVCF lines, {:.1%} variant sites, {:.0f} MB'.format(args.lines, args.variant_rate, os.path.getsize(path) / 1e6))
+    module = harness.load_converter()
+    converter, f = harness.make_converter(module, path, work_dir)
+    f.close()
+    start = time.perf_counter()
+    harness.convert(path, work_dir, module=module, converter=converter)
+    report('reference blocks skipped', time.perf_counter() - start, args.lines)
+    print('{:<32} {:8d}'.format('reference block lines skipped', converter.num_ref_blocks))
+    elapsed, _ = timed_convert(path, work_dir, patch=lambda c: setattr(c, 'is_ref_block', lambda toks: False))
+    report('reference blocks parsed', elapsed, args.lines)
+
+def bench_checkpoint(args, work_dir):
+    # Serial conversion with converted lines saved every checkpoint_lines
+    # lines, against no checkpoints
+    path = harness.write_lines(os.path.join(work_dir, 'checkpoint.vcf'),
+        harness.random_vcf_lines(args.lines, args.samples, carrier_rate=args.carrier_rate))
+    print('{} lines x {} samples, {:.0f} MB'.format(args.lines, args.samples, os.path.getsize(path) / 1e6))
+    elapsed, n = timed_convert(path, work_dir)
+    report('no checkpoints', elapsed, n)
+    elapsed, n = timed_convert(path, work_dir, conf={'checkpoint_lines': args.checkpoint_lines})
+    report('checkpoint every {} lines'.format(args.checkpoint_lines), elapsed, n)
+
+def bench_bcf(args, work_dir):
+    # The same multi-sample records as text VCF and as BCF written by
+    # htslib. Only carrier samples are decoded from BCF.
+    vcf_path = harness.write_lines(os.path.join(work_dir, 'samples.vcf'),
+        harness.random_vcf_lines(args.lines, args.samples, carrier_rate=args.carrier_rate))
+    bcf_path = harness.write_bcf(vcf_path)
+    print('{} lines x {} samples, {:.0f} MB text, {:.0f} MB BCF'.format(
+        args.lines, args.samples, os.path.getsize(vcf_path) / 1e6, os.path.getsize(bcf_path) / 1e6))
+    elapsed, n = timed_convert(vcf_path, work_dir)
+    report('text VCF', elapsed, n)
+    elapsed, n = timed_convert(bcf_path, work_dir)
+    report('BCF', elapsed, n)
+
+def indel_vcf_lines(reference, n_lines, max_len, multi_rate, seed=1):
+    # Indels with REF taken from the reference, so many of them can be
+    # left aligned, and multi-allelic sites whose alleles share long
+    # prefixes
+    rng = random.Random(seed)
+    lines = list(harness.header_lines) + ['##contig=<ID=chr1,length={}>'.format(len(reference.seq))]
+    lines.append('\t'.join(['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO']))
+    step = (len(reference.seq) - 2 * max_len) // n_lines
+    for i in range(n_lines):
+        pos = 1000 + i * step + rng.randint(0, step // 2)
+        length = rng.randint(1, max_len)
+        ref = reference.slice('chr1', pos, pos + length + 1)
+        if rng.random() < multi_rate:
+            # Deletions of the end of a long REF, sharing everything before
+            alts = [ref[:-k] for k in sorted(rng.sample(range(1, length + 1), min(3, length)))]
+        elif rng.random() < 0.5:
+            alts = [ref[0]]
+        else:
+            alts = [ref + reference.slice('chr1', pos + length + 1, pos + 2 * length + 1)]
+        lines.append('\t'.join(['chr1', str(pos), '.', ref, ','.join(alts), '50', 'PASS', 'DP=10']))
+    return [l + '\n' for l in lines]
+
+def popped_trim(pos, ref, alt):
+    # trim_variant before it sliced, popping one base at a time off lists
+    if len(ref) == 1 and len(alt) == 1:
+        return pos, ref, alt
+    ref = list(ref)
+    alt = list(alt)
+    adj = 0
+    while ref and alt and ref[0]==alt[0]:
+        adj += 1
+        ref.pop(0)
+        alt.pop(0)
+    while ref and alt and ref[-1]==alt[-1]:
+        ref.pop()
+        alt.pop()
+    return pos+adj, ''.join(ref) or '-', ''.join(alt) or '-'
+
+def bench_indels(args, work_dir):
+    # Trimming of long indel alleles, and conversion with and without
+    # left alignment against a reference of short base runs
+    reference = harness.RepeatReference(length=args.lines * (2 * args.max_len + 100))
+    lines = indel_vcf_lines(reference, args.lines, args.max_len, args.multi_rate)
+    path = harness.write_lines(os.path.join(work_dir, 'indels.vcf'), lines)
+    pairs = []
+    for l in lines:
+        if not l.startswith('#'):
+            toks = l.split('\t')
+            pairs += [(int(toks[1]), toks[3], alt) for alt in toks[4].split(',')]
+    print('{} lines, {} alleles, up to {} bases, {:.0f} MB'.format(args.lines, len(pairs), args.max_len, os.path.getsize(path) / 1e6))
+    module = harness.load_converter()
+    module.get_wgs_reader = lambda assembly: reference
+    trim = module.CravatConverter().trim_variant
+    trimmed = [trim(*x) for x in pairs]
+    report('trim_variant', best_of(3, lambda: [trim(*x) for x in pairs]), len(pairs), unit='alleles')
+    report('popped trim', best_of(3, lambda: [popped_trim(*x) for x in pairs]), len(pairs), unit='alleles')
+    print('same trims: {}'.format(trimmed == [popped_trim(*x) for x in pairs]))
+    positions = []
+    for label, conf in (('not left aligned', None), ('left aligned', {'left_align': 'true'})):
+        converter, f = harness.make_converter(module, path, work_dir, conf=conf)
+        f.close()
+        start = time.perf_counter()
+        records, errors, _ = harness.convert(path, work_dir, module=module, converter=converter)
+        report(label, time.perf_counter() - start, len(records) + len(errors))
+        positions.append(dict([(ln, [w['pos'] for w in wdicts]) for ln, _, wdicts in records]))
+    moved = sum([sum([x != y for x, y in zip(pos, positions[1][ln])]) for ln, pos in positions[0].items()])
+    print('{:<32} {:8d}'.format('alleles moved by left alignment', moved))
+
+def main():
+    parser = argparse.ArgumentParser(description='vcf-converter benchmarks')
+    sub = parser.add_subparsers(dest='bench', required=True)
+    p = sub.add_parser('samples', help='wide multi-sample VCF')
+    p.add_argument('--lines', type=int, default=2000)
+    p.add_argument('--samples', type=int, default=2500)
+    p.add_argument('--carrier-rate', type=float, default=0.01)
+    p.set_defaults(func=bench_samples)
+    p = sub.add_parser('workers', help='parallel conversion of a bgzipped VCF (needs pytabix and pysam)')
+    p.add_argument('--lines', type=int, default=240000)
+    p.add_argument('--samples', type=int, default=20)
+    p.add_argument('--contigs', type=int, default=24)
+    p.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    p.set_defaults(func=bench_workers)
+    p = sub.add_parser('info', help='annotation-heavy VCF with include_info')
+    p.add_argument('--lines', type=int, default=30000)
+    p.add_argument('--samples', type=int, default=4)
+    p.add_argument('--info-keys', type=int, default=100)
+    p.add_argument('--csq', type=int, default=8)
+    p.add_argument('--include-info', default='DP,AF')
+    p.set_defaults(func=bench_info)
+    p = sub.add_parser('csq', help='VEP CSQ parsing')
+    p.add_argument('--sites', type=int, default=20000)
+    p.add_argument('--transcripts', type=int, default=12)
+    p.add_argument('--selected', nargs='+', default=['CSQ_Consequence', 'CSQ_SYMBOL', 'CSQ_HGVSp'])
+    p.set_defaults(func=bench_csq)
+    p = sub.add_parser('gvcf', help='30x-style single-sample gVCF')
+    p.add_argument('--lines', type=int, default=200000)
+    p.add_argument('--variant-rate', type=float, default=0.02)
+    p.set_defaults(func=bench_gvcf)
+    p = sub.add_parser('checkpoint', help='serial conversion with checkpoints')
+    p.add_argument('--lines', type=int, default=150000)
+    p.add_argument('--samples', type=int, default=20)
+    p.add_argument('--carrier-rate', type=float, default=0.05)
+    p.add_argument('--checkpoint-lines', type=int, default=100000)
+    p.set_defaults(func=bench_checkpoint)
+    p = sub.add_parser('bcf', help='multi-sample BCF against the same text VCF (needs pysam)')
+    p.add_argument('--lines', type=int, default=5000)
+    p.add_argument('--samples', type=int, default=500)
+    p.add_argument('--carrier-rate', type=float, default=0.01)
+    p.set_defaults(func=bench_bcf)
+    p = sub.add_parser('indels', help='indel-rich VCF with long alleles, with and without left_align')
+    p.add_argument('--lines', type=int, default=20000)
+    p.add_argument('--max-len', type=int, default=500)
+    p.add_argument('--multi-rate', type=float, default=0.2)
+    p.set_defaults(func=bench_indels)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as work_dir:
+        args.func(args, work_dir)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import os
+import gzip
+import zlib
+import struct
+import random
+import importlib.util
+
+def load_converter():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'vcf-converter.py')
+    spec = importlib.util.spec_from_file_location('vcf_converter', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def open_input(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+
+def make_converter(module, path, output_dir, conf=None, run_name='test'):
+    # Set up the way cravat-convert sets up its primary converter
+    converter = module.CravatConverter()
+    converter.output_dir = output_dir
+    converter.run_name = run_name
+    converter.input_assembly = 'hg38'
+    converter.conf = dict(conf or {})
+    f = open_input(path)
+    converter.setup(f)
+    f.seek(0)
+    return converter, f
+
+def convert(path, output_dir, conf=None, module=None, converter=None, stop_after=None):
+    """
+    Runs vcf-converter over a file and returns what cravat-convert would
+    take from it: (line number, line, wdicts) for each variant line, the
+    error lines, and the extra INFO rows, with uids given in order.
+    stop_after ends the run (without cleaning up) after that many lines.
+    """
+    if module is None:
+        module = load_converter()
+    f = None
+    if converter is None:
+        converter, f = make_converter(module, path, output_dir, conf=conf)
+    else:
+        f = open_input(path)
+    records = []
+    errors = []
+    info_rows = []
+    if converter.ex_info_writer is not None:
+        converter.ex_info_writer.write_data = info_rows.append
+    exc_handler = lambda ln, l, e: errors.append((ln, l, repr(e)))
+    uid = 0
+    for n, (ln, l, wdicts) in enumerate(converter.convert_file(f, exc_handler=exc_handler), start=1):
+        if stop_after is not None and n > stop_after:
+            break
+        if wdicts is module.CravatConverter.IGNORE:
+            continue
+        out = []
+        for wdict_no, wdict in enumerate(wdicts or []):
+            uid += 1
+            wdict = dict(wdict, uid=uid)
+            out.append(wdict)
+            converter.addl_operation_for_unique_variant(wdict, wdict_no)
+        records.append((ln, l, out))
+    f.close()
+    return records, errors, info_rows
+
+header_lines = [
+    '##fileformat=VCFv4.2',
+    '##INFO=<ID=DP,Number=1,Type=Integer,Description="Total depth">',
+    '##INFO=<ID=AF,Number=A,Type=Float,Description="Allele frequency">',
+    '##INFO=<ID=DB,Number=0,Type=Flag,Description="dbSNP membership">',
+    '##INFO=<ID=ANN,Number=.,Type=String,Description="Annotation">',
+    '##FILTER=<ID=q10,Description="Quality below 10">',
+    '##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">',
+    '##FORMAT=<ID=AD,Number=R,Type=Integer,Description="Allelic depths">',
+    '##FORMAT=<ID=DP,Number=1,Type=Integer,Description="Read depth">',
+    '##FORMAT=<ID=GQ,Number=1,Type=Integer,Description="Genotype quality">',
+]
+
+csq_fields = [
+    'Allele', 'Consequence', 'IMPACT', 'SYMBOL', 'Gene', 'Feature_type', 'Feature', 'BIOTYPE',
+    'EXON', 'INTRON', 'HGVSc', 'HGVSp', 'cDNA_position', 'CDS_position', 'Protein_position',
+    'Amino_acids', 'Codons', 'Existing_variation', 'DISTANCE', 'STRAND', 'FLAGS', 'SYMBOL_SOURCE',
+    'HGNC_ID', 'CANONICAL', 'MANE_SELECT', 'SIFT', 'PolyPhen', 'AF', 'CLIN_SIG', 'SOMATIC',
+    'PHENO', 'PUBMED',
+]
+
+def csq_entry(rng, allele, gene):
+    # One VEP transcript entry, with the fields VEP leaves empty for most
+    # transcripts left empty
+    tx = 'ENST{:011d}'.format(rng.randint(1, 10 ** 6))
+    cpos = rng.randint(1, 5000)
+    vals = {
+        'Allele': allele,
+        'Consequence': rng.choice(['missense_variant', 'synonymous_variant', 'intron_variant', 'upstream_gene_variant']),
+        'IMPACT': rng.choice(['MODERATE', 'LOW', 'MODIFIER']),
+        'SYMBOL': gene,
+        'Gene': 'ENSG{:011d}'.format(rng.randint(1, 10 ** 5)),
+        'Feature_type': 'Transcript',
+        'Feature': tx,
+        'BIOTYPE': rng.choice(['protein_coding', 'nonsense_mediated_decay', 'retained_intron']),
+        'EXON': '{}/{}'.format(rng.randint(1, 20), 20),
+        'HGVSc': '{}.1:c.{}A>{}'.format(tx, cpos, allele),
+        'HGVSp': 'ENSP{:011d}.1:p.Lys{}Glu'.format(rng.randint(1, 10 ** 6), cpos // 3),
+        'cDNA_position': str(cpos + 100),
+        'CDS_position': str(cpos),
+        'Protein_position': str(cpos // 3),
+        'Amino_acids': 'K/E',
+        'Codons': 'Aag/Gag',
+        'STRAND': rng.choice(['1', '-1']),
+        'SYMBOL_SOURCE': 'HGNC',
+        'HGNC_ID': 'HGNC:{}'.format(rng.randint(1, 50000)),
+        'SIFT': 'deleterious({:.2f})'.format(rng.random()),
+        'PolyPhen': 'benign({:.3f})'.format(rng.random()),
+    }
+    return '|'.join([vals.get(field, '') for field in csq_fields])
+
+def random_vcf_lines(n_lines, n_samples, chroms=('chr1', 'chr2', 'chr3'), carrier_rate=0.05, extra_info=0, csq=0, seed=1):
+    """
+    Header and data lines of a synthetic multi-sample VCF, sorted by
+    chromosome and position. Most genotypes are 0/0, as in a joint-called
+    cohort. extra_info adds that many numeric INFO keys to every line, and
+    csq adds a VEP CSQ key with that many transcript entries per allele.
+    """
+    rng = random.Random(seed)
+    lines = list(header_lines)
+    for i in range(extra_info):
+        lines.append('##INFO=<ID=X{},Number=A,Type=Float,Description="Extra score {}">'.format(i, i))
+    if csq:
+        lines.append('##INFO=<ID=CSQ,Number=.,Type=String,Description="Consequence annotations from Ensembl VEP. Format: {}">'.format('|'.join(csq_fields)))
+    for chrom in chroms:
+        lines.append('##contig=<ID={},length=250000000>'.format(chrom))
+    cols = ['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO']
+    if n_samples:
+        cols += ['FORMAT'] + ['S{}'.format(i) for i in range(n_samples)]
+    lines.append('\t'.join(cols))
+    per_chrom = n_lines // len(chroms)
+    for chrom in chroms:
+        pos = 10000
+        for _ in range(per_chrom):
+            pos += rng.randint(1, 300)
+            ref = rng.choice('ACGT')
+            if rng.random() < 0.2:
+                alts = [ref + ''.join(rng.choice('ACGT') for _ in range(rng.randint(1, 5)))]
+            else:
+                alts = [b for b in 'ACGT' if b != ref][:rng.choice([1, 1, 1, 2])]
+            af = ','.join(['{:.3g}'.format(rng.random()) for _ in alts])
+            info = 'DP={};AF={}'.format(rng.randint(10, 5000), af)
+            if rng.random() < 0.3:
+                info += ';DB'
+            info += ';ANN=' + ','.join(['{}|missense_variant|GENE{}'.format(a, rng.randint(1, 99)) for a in alts])
+            for i in range(extra_info):
+                info += ';X{}={}'.format(i, ','.join(['{:.4g}'.format(rng.random()) for _ in alts]))
+            if csq:
+                gene = 'GENE{}'.format(rng.randint(1, 999))
+                info += ';CSQ=' + ','.join([csq_entry(rng, a, gene) for a in alts for _ in range(csq)])
+            row = [chrom, str(pos), '.', ref, ','.join(alts), str(rng.randint(1, 99)), rng.choice(['PASS', 'q10', '.']), info]
+            if n_samples:
+                row.append('GT:AD:DP:GQ')
+                for _ in range(n_samples):
+                    if rng.random() < carrier_rate:
+                        gt = '{}/{}'.format(rng.choice([0, 1]), rng.randint(1, len(alts)))
+                    else:
+                        gt = rng.choice(['0/0'] * 9 + ['./.'])
+                    ad = ','.join([str(rng.randint(0, 30)) for _ in range(len(alts) + 1)])
+                    row.append('{}:{}:{}:{}'.format(gt, ad, rng.randint(1, 60), rng.randint(1, 99)))
+            lines.append('\t'.join(row))
+    return [l + '\n' for l in lines]
+
+def gvcf_lines(n_lines, variant_rate=0.02, chroms=('chr1', 'chr2'), seed=1):
+    """
+    Header and data lines of a synthetic single-sample gVCF, as written by
+    GATK HaplotypeCaller at 30x: mostly reference blocks, with variant
+    sites carrying <NON_REF> as an extra ALT.
+    """
+    rng = random.Random(seed)
+    lines = [
+        '##fileformat=VCFv4.2',
+        '##ALT=<ID=NON_REF,Description="Represents any possible alternative allele">',
+        '##INFO=<ID=END,Number=1,Type=Integer,Description="End position of the reference block">',
+        '##INFO=<ID=DP,Number=1,Type=Integer,Description="Total depth">',
+        '##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">',
+        '##FORMAT=<ID=AD,Number=R,Type=Integer,Description="Allelic depths">',
+        '##FORMAT=<ID=DP,Number=1,Type=Integer,Description="Read depth">',
+        '##FORMAT=<ID=GQ,Number=1,Type=Integer,Description="Genotype quality">',
+        '##FORMAT=<ID=MIN_DP,Number=1,Type=Integer,Description="Minimum DP in the block">',
+        '##FORMAT=<ID=PL,Number=G,Type=Integer,Description="Phred-scaled likelihoods">',
+    ]
+    lines += ['##contig=<ID={},length=250000000>'.format(chrom) for chrom in chroms]
+    lines.append('\t'.join(['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO', 'FORMAT', 'SAMPLE']))
+    for chrom in chroms:
+        pos = 10000
+        for _ in range(n_lines // len(chroms)):
+            ref = rng.choice('ACGT')
+            dp = rng.randint(20, 40)
+            if rng.random() < variant_rate:
+                alt = rng.choice([b for b in 'ACGT' if b != ref])
+                row = [chrom, str(pos), '.', ref, alt + ',<NON_REF>', str(rng.randint(30, 900)), '.', 'DP={}'.format(dp),
+                    'GT:AD:DP:GQ:PL', '0/1:{},{},0:{}:99:{},0,{},{},{},{}'.format(dp // 2, dp - dp // 2, dp, *[rng.randint(100, 900) for _ in range(5)])]
+                pos += 1
+            else:
+                end = pos + rng.randint(0, 200)
+                row = [chrom, str(pos), '.', ref, '<NON_REF>', '.', '.', 'END={}'.format(end),
+                    'GT:DP:GQ:MIN_DP:PL', '0/0:{}:{}:{}:0,{},{}'.format(dp, rng.randint(20, 99), dp - 2, rng.randint(30, 90), rng.randint(400, 900))]
+                pos = end + 1
+            lines.append('\t'.join(row))
+    return [l + '\n' for l in lines]
+
+def write_lines(path, lines):
+    with open(path, 'w') as f:
+        f.writelines(lines)
+    return path
+
+def bgzip(path, out_path=None, block_size=0xff00):
+    # BGZF blocks, as written by bgzip, followed by the empty EOF block
+    out_path = out_path or path + '.gz'
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(out_path, 'wb') as out:
+        for start in range(0, len(data), block_size):
+            out.write(bgzf_block(data[start:start + block_size]))
+        out.write(bgzf_block(b''))
+    return out_path
+
+def bgzf_block(data):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+    header = struct.pack('<BBBBIBBHBBHH', 31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, len(cdata) + 25)
+    return header + cdata + struct.pack('<II', zlib.crc32(data) & 0xffffffff, len(data))
+
+def tabix_index(gz_path):
+    # Needs pysam, which only the tests and benchmarks of parallel
+    # conversion use
+    import pysam
+    pysam.tabix_index(gz_path, preset='vcf', force=True)
+    return gz_path + '.tbi'
+
+def write_bcf(vcf_path, bcf_path=None):
+    # Needs pysam. Records are read before the output is opened, since
+    # htslib adds header lines for contigs and keys the header lacks.
+    import pysam
+    bcf_path = bcf_path or os.path.splitext(vcf_path)[0] + '.bcf'
+    with pysam.VariantFile(vcf_path) as vin:
+        records = list(vin)
+        with pysam.VariantFile(bcf_path, 'wb', header=vin.header) as out:
+            for record in records:
+                out.write(record)
+    return bcf_path
+
+class RepeatReference(object):
+    """
+    Stands in for the reader get_wgs_reader returns, with the same random
+    sequence of short base runs for every chromosome, so that many indels
+    can be left aligned.
+    """
+    def __init__(self, length=1000000, seed=1):
+        rng = random.Random(seed)
+        runs = []
+        total = 0
+        while total < length:
+            run = rng.choice('ACGT') * rng.randint(1, 6)
+            runs.append(run)
+            total += len(run)
+        self.seq = ''.join(runs)[:length]
+
+    def slice(self, chrom, start, end=None):
+        # 1-based with end excluded, as the wgs modules' slice
+        if start <= 0:
+            raise IndexError(start)
+        if end is None or end < start:
+            end = start + 1
+        return self.seq[start - 1:end - 1]
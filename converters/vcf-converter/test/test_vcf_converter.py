@@ -0,0 +1,192 @@
+"""
+Tests of vcf-converter's conversion paths against a plain serial
+conversion of the same input. Run with
+
+    python -m pytest converters/vcf-converter/test
+"""
+import os
+import gzip
+import time
+import random
+import signal
+import shutil
+import tempfile
+import unittest
+import importlib.util
+import multiprocessing
+import harness
+
+def has_modules(*names):
+    return all([importlib.util.find_spec(name) is not None for name in names])
+
+class ConverterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.module = harness.load_converter()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def write_vcf(self, name, n_lines=600, n_samples=8, **kwargs):
+        return harness.write_lines(os.path.join(self.work_dir, name), harness.random_vcf_lines(n_lines, n_samples, **kwargs))
+
+    def convert(self, path, conf=None, output_dir=None, **kwargs):
+        output_dir = output_dir or tempfile.mkdtemp(dir=self.work_dir)
+        return harness.convert(path, output_dir, conf=conf, module=self.module, **kwargs)
+
+class CheckpointTest(ConverterTestCase):
+    checkpoint_lines = 40
+
+    def setUp(self):
+        super().setUp()
+        self.vcf_path = self.write_vcf('checkpoint.vcf', n_lines=900, n_samples=6, carrier_rate=0.2)
+        self.expected = self.convert(self.vcf_path)
+
+    def killed_run(self, path, output_dir, kill_at):
+        # Converts in a forked process that is killed after taking kill_at
+        # lines from the converter
+        def run():
+            converter, f = harness.make_converter(self.module, path, output_dir, conf={'checkpoint_lines': self.checkpoint_lines})
+            for n, _ in enumerate(converter.convert_file(f, exc_handler=lambda *args: None), start=1):
+                if n == kill_at:
+                    os.kill(os.getpid(), signal.SIGKILL)
+        proc = multiprocessing.get_context('fork').Process(target=run)
+        proc.start()
+        proc.join()
+        self.assertEqual(proc.exitcode, -signal.SIGKILL)
+
+    def check_resume(self, path, seed):
+        rng = random.Random(seed)
+        for kill_at in sorted(rng.sample(range(1, len(self.expected[0]) + 20), 6)):
+            output_dir = tempfile.mkdtemp(dir=self.work_dir)
+            self.killed_run(path, output_dir, kill_at)
+            shard_dir = os.path.join(output_dir, 'test.{}.shards'.format(os.path.basename(path)))
+            # A run killed in the header has not made its shard folder yet
+            segments = [x for x in os.listdir(shard_dir) if x.endswith('.segment')] if os.path.exists(shard_dir) else []
+            conf = {'checkpoint_lines': self.checkpoint_lines}
+            if segments:
+                with self.assertLogs('cravat.converter', 'INFO') as logs:
+                    resumed = self.convert(path, conf=conf, output_dir=output_dir)
+                self.assertIn('resuming conversion', '\n'.join(logs.output))
+            else:
+                resumed = self.convert(path, conf=conf, output_dir=output_dir)
+            self.assertEqual(resumed, self.expected, 'killed after {} lines'.format(kill_at))
+            self.assertFalse(os.path.exists(shard_dir))
+
+    def test_uninterrupted(self):
+        self.assertEqual(self.convert(self.vcf_path, conf={'checkpoint_lines': self.checkpoint_lines}), self.expected)
+
+    def test_resume_text(self):
+        self.check_resume(self.vcf_path, 1)
+
+    def test_resume_bgzf(self):
+        # Small blocks, so lines and checkpoints fall across block ends
+        self.check_resume(harness.bgzip(self.vcf_path, block_size=3000), 2)
+
+    def test_resume_gzip(self):
+        gz_path = self.vcf_path + '.gz'
+        with open(self.vcf_path, 'rb') as f, gzip.open(gz_path, 'wb') as out:
+            out.write(f.read())
+        self.check_resume(gz_path, 3)
+
+    def test_changed_options_restart(self):
+        output_dir = tempfile.mkdtemp(dir=self.work_dir)
+        self.killed_run(self.vcf_path, output_dir, 300)
+        conf = {'checkpoint_lines': self.checkpoint_lines, 'include_info': 'DP'}
+        self.assertEqual(self.convert(self.vcf_path, conf=conf, output_dir=output_dir),
+            self.convert(self.vcf_path, conf=conf))
+
+    def test_left_align_restart(self):
+        # Segments of a run without left alignment are not reused by a
+        # run with it
+        self.module.get_wgs_reader = lambda assembly: harness.RepeatReference()
+        output_dir = tempfile.mkdtemp(dir=self.work_dir)
+        self.killed_run(self.vcf_path, output_dir, 300)
+        aligned = self.convert(self.vcf_path, conf={'left_align': 'true'})
+        self.assertNotEqual(aligned, self.expected)
+        conf = {'checkpoint_lines': self.checkpoint_lines, 'left_align': 'true'}
+        self.assertEqual(self.convert(self.vcf_path, conf=conf, output_dir=output_dir), aligned)
+
+class BcfTest(ConverterTestCase):
+    # parity.bcf was written from parity.vcf by htslib (pysam.VariantFile)
+    test_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def convert_parsed(self, path):
+        # Converter output, with the pyvcf record each line was parsed into
+        output_dir = tempfile.mkdtemp(dir=self.work_dir)
+        converter, f = harness.make_converter(self.module, path, output_dir)
+        f.close()
+        parsed = []
+        convert_variant = converter.convert_variant
+        def recorded(variant, has_samples):
+            calls = [(c.sample, c.data._asdict()) for c in variant.samples]
+            parsed.append((variant.CHROM, variant.POS, variant.ID, variant.REF, [str(x) for x in variant.ALT],
+                variant.QUAL, variant.FILTER, variant.INFO, variant.FORMAT, has_samples, calls))
+            return convert_variant(variant, has_samples)
+        converter.convert_variant = recorded
+        records, errors, info_rows = self.convert(path, output_dir=output_dir, converter=converter)
+        # Line numbers and lines are not the same for binary input
+        return parsed, [x[2] for x in records], [x[2] for x in errors], info_rows, converter.num_ref_blocks
+
+    def assertSameAsText(self, bcf_path, vcf_path):
+        expected = self.convert_parsed(vcf_path)
+        converted = self.convert_parsed(bcf_path)
+        for name, x, y in zip(('records', 'wdicts', 'errors', 'extra info', 'reference blocks'), converted, expected):
+            self.assertEqual(x, y, name)
+
+    def test_same_as_text(self):
+        self.assertSameAsText(os.path.join(self.test_dir, 'parity.bcf'), os.path.join(self.test_dir, 'parity.vcf'))
+
+    def test_uncompressed(self):
+        bcf_path = os.path.join(self.work_dir, 'uncompressed.bcf')
+        with gzip.open(os.path.join(self.test_dir, 'parity.bcf'), 'rb') as f, open(bcf_path, 'wb') as out:
+            out.write(f.read())
+        self.assertSameAsText(bcf_path, os.path.join(self.test_dir, 'parity.vcf'))
+
+    @unittest.skipUnless(has_modules('pysam'), 'writing BCF needs pysam')
+    def test_multi_sample_same_as_text(self):
+        vcf_path = self.write_vcf('multi.vcf', n_lines=500, n_samples=40, carrier_rate=0.1)
+        self.assertSameAsText(harness.write_bcf(vcf_path), vcf_path)
+
+@unittest.skipUnless(has_modules('tabix', 'pysam'), 'parallel conversion needs pytabix, and the test index needs pysam')
+class ParallelTest(ConverterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vcf_path = self.write_vcf('parallel.vcf', chroms=('chr1', 'chr2', 'chr3', 'chr4'))
+        self.gz_path = harness.bgzip(self.vcf_path)
+        harness.tabix_index(self.gz_path)
+
+    def test_same_as_serial(self):
+        self.assertEqual(self.convert(self.gz_path, conf={'workers': 3}), self.convert(self.vcf_path))
+
+    def test_gvcf_same_as_serial(self):
+        # Skipped reference blocks come back from the shards as IGNORE
+        vcf_path = harness.write_lines(os.path.join(self.work_dir, 'parallel.g.vcf'), harness.gvcf_lines(2000))
+        gz_path = harness.bgzip(vcf_path)
+        harness.tabix_index(gz_path)
+        self.assertEqual(self.convert(gz_path, conf={'workers': 2}), self.convert(vcf_path))
+
+    def test_left_align_same_as_serial(self):
+        # Workers left align, and the merged output is sorted again
+        self.module.get_wgs_reader = lambda assembly: harness.RepeatReference()
+        conf = {'left_align': 'true'}
+        self.assertEqual(self.convert(self.gz_path, conf=dict(conf, workers=3)), self.convert(self.vcf_path, conf=conf))
+
+    def test_failed_worker_stops_the_others(self):
+        convert_shard = self.module.CravatConverter.convert_shard
+        def failing_shard(converter, path, contig, shard_path):
+            if contig == 'chr1':
+                os._exit(1)
+            time.sleep(60)
+        self.module.CravatConverter.convert_shard = failing_shard
+        try:
+            start = time.time()
+            with self.assertRaises(Exception):
+                self.convert(self.gz_path, conf={'workers': 4})
+            self.assertLess(time.time() - start, 30)
+            self.assertEqual(multiprocessing.active_children(), [])
+        finally:
+            self.module.CravatConverter.convert_shard = convert_shard
+
+if __name__ == '__main__':
+    unittest.main()
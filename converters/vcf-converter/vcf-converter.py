@@ -14,7 +14,17 @@ from io import StringIO
 import copy
 from pathlib import Path
 from math import isnan
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
+import gzip
+import struct
+import pickle
+import multiprocessing
+import json
+import shutil
+from vcf.model import _Record, _Call
+import heapq
+import zlib
+from cravat import get_wgs_reader
 
 class CravatConverter(BaseConverter):
 
@@ -37,10 +47,16 @@ class CravatConverter(BaseConverter):
         self.ex_info_writer = None
         self.curvar = None
         self.csq_fields = None
+        self.csq_columns = []
+        self.info_keys = None
+        self.num_ref_blocks = 0
+        self.bcf = False
 
     def check_format(self, f): 
         if f.name.endswith('.vcf'):
             return True
+        if f.name.endswith('.bcf'):
+            return True
         if f.name.endswith('.vcf.gz'):
             return True
         first_line = f.readline()
@@ -54,7 +70,27 @@ class CravatConverter(BaseConverter):
             self.include_info  = set(self.conf['include_info'].split(','))
         else:
             self.include_info = set()
-        reader = vcf.Reader(f, compressed=False)
+        self.workers = int(self.conf.get('workers', 1))
+        self.checkpoint_lines = int(self.conf.get('checkpoint_lines', 0))
+        self.left_align = str(self.conf.get('left_align', False)).lower() == 'true'
+        if self.left_align:
+            self.left_align_window = int(self.conf.get('left_align_window', 1000))
+            self.wgs = get_wgs_reader(assembly=self.input_assembly)
+            self.ref_chrom = None
+            self.ref_start = 0
+            self.ref_chunk = ''
+        self.logger = logging.getLogger('cravat.converter')
+        if f.name.endswith('.bcf'):
+            # Binary input. The text header embedded in the BCF is used to
+            # set up the same pyvcf reader as for text VCF.
+            self.bcf = True
+            self._bcf_reader = BcfReader(os.path.realpath(f.name))
+            # pyvcf does not take the IDX keys htslib adds to header lines
+            self._buffer.write(re.sub(r',IDX=\d+', '', self._bcf_reader.header))
+            self.open_reader()
+            reader = self._reader
+        else:
+            reader = vcf.Reader(f, compressed=False)
         self.fix_formats(reader)
         self.open_extra_info(reader)
     
@@ -121,21 +157,45 @@ class CravatConverter(BaseConverter):
                     col['hidden'] = False
                     info_cols.append(col)
             del temp
+            # INFO keys to keep when parsing. Others are dropped from the raw
+            # line, so pyvcf never splits or converts them.
+            self.info_keys = set([c['name'] for c in info_cols])
+            if any([c['name'].startswith('CSQ_') for c in info_cols]):
+                self.info_keys.add('CSQ')
+        if self.csq_fields:
+            # CSQ subfields to extract, with their position in a CSQ entry
+            col_names = set([c['name'] for c in info_cols])
+            self.csq_columns = [(cname, i) for i, cname in enumerate(self.csq_fields) if cname in col_names]
         self.ex_info_writer.add_columns(info_cols)
         self.ex_info_writer.write_definition()
         self.ex_info_writer.write_meta_line('name', 'extra_vcf_info')
         self.ex_info_writer.write_meta_line('displayname', 'Extra VCF INFO Annotations')
 
+    def open_reader(self):
+        self._first_variant = False
+        self._in_header = False
+        self._buffer.seek(0)
+        self._reader = vcf.Reader(self._buffer)
+
     def convert_line(self, l):
         if l.startswith('#'):
             if self._in_header:
                 self._buffer.write(l)
             return self.IGNORE
         if self._first_variant:
-            self._first_variant = False
-            self._in_header = False
-            self._buffer.seek(0)
-            self._reader = vcf.Reader(self._buffer)
+            self.open_reader()
+        toks = l.rstrip('\r\n').split('\t')
+        if self.is_ref_block(toks):
+            self.num_ref_blocks += 1
+            return self.IGNORE
+        carriers = self.find_carriers(toks)
+        if carriers is not None:
+            # Samples are parsed below, only for carriers
+            del toks[9:]
+        if self.info_keys is not None and len(toks) > 7:
+            toks[7] = self.project_info(toks[7])
+        if carriers is not None or self.info_keys is not None:
+            l = '\t'.join(toks)+'\n'
         self._buffer.seek(0)
         self._buffer.truncate()
         self._buffer.write(l)
@@ -144,6 +204,11 @@ class CravatConverter(BaseConverter):
             variant = next(self._reader)
         except StopIteration:
             return self.IGNORE
+        if carriers is not None:
+            variant.samples = self.parse_carrier_calls(variant, toks[8], carriers)
+        return self.convert_variant(variant, carriers is not None or len(variant.samples) > 0)
+
+    def convert_variant(self, variant, has_samples):
         wdict_blanks = {}
         for alt_index, alt in enumerate(variant.ALT):
             if alt is None:
@@ -153,6 +218,8 @@ class CravatConverter(BaseConverter):
             else:
                 alt_base = alt.sequence
             new_pos, new_ref, new_alt = self.trim_variant(variant.POS, variant.REF, alt_base)
+            if self.left_align:
+                new_pos, new_ref, new_alt = self.left_align_variant(variant.CHROM, new_pos, new_ref, new_alt)
             #new_pos, new_ref, new_alt = variant.POS, variant.REF, alt_base
             if variant.FILTER is None:
                 filter_val = None
@@ -171,7 +238,7 @@ class CravatConverter(BaseConverter):
             }
         wdicts = []
         self.gt_occur = []
-        if len(variant.samples) > 0:
+        if has_samples:
             all_gt_zero = True
             for call in variant.samples:
                 # Dedup gt but maintain order
@@ -208,16 +275,440 @@ class CravatConverter(BaseConverter):
                 self.gt_occur.append(gt)
         self.curvar = variant
         self.cur_csq = {}
-        if self.csq_fields and 'CSQ' in variant.INFO:
-            csq_entries = defaultdict(list)
-            for gt_csq in variant.INFO['CSQ']:
-                l = gt_csq.split('|')
-                csq_entries[l[0]].append(l)
-            for allele, entries in csq_entries.items():
-                transpose = zip(*entries)
-                self.cur_csq[allele] = dict([(cname, self.csq_format(value)) for cname, value in zip(self.csq_fields, transpose)])
+        if self.csq_columns and 'CSQ' in variant.INFO:
+            self.cur_csq = self.parse_csq(variant.INFO['CSQ'])
         return wdicts
 
+    def parse_csq(self, csq_entries):
+        # Group VEP transcript entries by allele, then join each selected
+        # subfield across the entries of an allele. zip transposes the
+        # entries of an allele into subfields, truncated to the shortest.
+        allele_entries = defaultdict(list)
+        for gt_csq in csq_entries:
+            vals = gt_csq.split('|')
+            allele_entries[vals[0]].append(vals)
+        csq = {}
+        for allele, entries in allele_entries.items():
+            fields = list(zip(*entries))
+            csq[allele] = {
+                cname: self.csq_format(fields[i])
+                for cname, i in self.csq_columns if i < len(fields)
+            }
+        return csq
+
+    def convert_file(self, f, *args, exc_handler=None, **kwargs):
+        contigs = self.get_index_contigs(f)
+        if self.bcf:
+            converted = self.convert_bcf(exc_handler)
+        elif contigs is None and self.checkpoint_lines > 0:
+            converted = self.convert_file_checkpointed(f, exc_handler)
+        elif contigs is None:
+            converted = super().convert_file(f, *args, exc_handler=exc_handler, **kwargs)
+        else:
+            converted = self.convert_file_parallel(f, contigs, exc_handler)
+        if self.left_align:
+            converted = self.sort_left_aligned(converted)
+        yield from converted
+        if self.num_ref_blocks:
+            self.logger.info('{} gVCF reference block lines skipped'.format(self.num_ref_blocks))
+
+    def sort_left_aligned(self, converted):
+        # Left alignment can move a variant up to left_align_window bases
+        # before the variants of earlier lines. Lines are held in a heap and
+        # released in position order once no later line can come before
+        # them. Converter state is saved with each line for
+        # addl_operation_for_unique_variant.
+        heap = []
+        chrom = None
+        seq = 0
+        for ln, l, wdicts in converted:
+            if not wdicts or wdicts is self.IGNORE:
+                yield ln, l, wdicts
+                continue
+            # Saved before lines are released, which restores their state
+            state = (self.curvar, self.gt_occur, self.cur_csq)
+            variant = self.curvar
+            if variant.CHROM != chrom:
+                while heap:
+                    yield self.pop_left_aligned(heap)
+                chrom = variant.CHROM
+            else:
+                while heap and heap[0][0] < variant.POS - self.left_align_window:
+                    yield self.pop_left_aligned(heap)
+            min_pos = min([wdict['pos'] for wdict in wdicts])
+            heapq.heappush(heap, (min_pos, seq, ln, l, wdicts, state))
+            seq += 1
+        while heap:
+            yield self.pop_left_aligned(heap)
+
+    def pop_left_aligned(self, heap):
+        _, _, ln, l, wdicts, state = heapq.heappop(heap)
+        self.curvar, self.gt_occur, self.cur_csq = state
+        return ln, l, wdicts
+
+    def convert_file_parallel(self, f, contigs, exc_handler):
+        ln = 0
+        for l in f:
+            if not l.startswith('#'):
+                break
+            ln += 1
+            yield ln, l, self.convert_line(l)
+        self.open_reader()
+        # Contigs are converted in forked workers and merged back in index
+        # order, so uids come out the same as a serial run. Finished shards
+        # are kept until the merge completes, and act as checkpoints for a
+        # rerun of an interrupted conversion.
+        shard_dir = self.open_shard_dir(f.name, 'contigs')
+        shard_paths = [os.path.join(shard_dir, '{}.shard'.format(i)) for i in range(len(contigs))]
+        ctx = multiprocessing.get_context('fork')
+        procs = []
+        for contig, shard_path in zip(contigs, shard_paths):
+            if os.path.exists(shard_path):
+                procs.append(None)
+            else:
+                procs.append(ctx.Process(target=self.convert_shard, args=(f.name, contig, shard_path)))
+        pending = [proc for proc in procs if proc is not None]
+        if len(pending) < len(procs):
+            self.logger.info('resuming conversion with {} of {} contigs checkpointed'.format(len(procs) - len(pending), len(procs)))
+        try:
+            yield from self.merge_shards(procs, pending, contigs, shard_paths, ln, exc_handler)
+        finally:
+            # Workers still running after a failure, or after the consumer
+            # stopped reading, are stopped and reaped
+            for proc in pending:
+                if proc.pid is None:
+                    continue
+                if proc.is_alive():
+                    proc.terminate()
+                proc.join()
+        shutil.rmtree(shard_dir)
+
+    def merge_shards(self, procs, pending, contigs, shard_paths, ln, exc_handler):
+        for proc in pending[:self.workers]:
+            proc.start()
+        next_proc = self.workers
+        for i, proc in enumerate(procs):
+            if proc is not None:
+                proc.join()
+                if next_proc < len(pending):
+                    pending[next_proc].start()
+                    next_proc += 1
+                if proc.exitcode != 0:
+                    raise Exception('Conversion of contig {} failed'.format(contigs[i]))
+            shard_ln, (ref_blocks,) = yield from self.replay_shard(shard_paths[i], ln, exc_handler)
+            self.num_ref_blocks += ref_blocks
+            ln += shard_ln
+
+    def convert_file_checkpointed(self, f, exc_handler):
+        # Serial conversion that saves converted lines in segments of
+        # checkpoint_lines lines. A segment ends with the line number, the
+        # input offset after its last line (a BGZF virtual offset for
+        # bgzipped input) and the reference block count. A rerun replays
+        # the finished segments and reads on from the last offset.
+        encoding = getattr(f, 'encoding', None) or 'utf-8'
+        if BgzfReader.is_bgzf(f.name):
+            reader = BgzfReader(f.name)
+        elif f.name.endswith('.gz'):
+            reader = gzip.open(f.name, 'rb')
+        else:
+            reader = open(f.name, 'rb')
+        ln = 0
+        while True:
+            offset = reader.tell()
+            l = self.decode_line(reader.readline(), encoding)
+            if not l.startswith('#'):
+                break
+            ln += 1
+            yield ln, l, self.convert_line(l)
+        self.open_reader()
+        shard_dir = self.open_shard_dir(f.name, 'lines')
+        segment = 0
+        while os.path.exists(os.path.join(shard_dir, '{}.segment'.format(segment))):
+            _, checkpoint = yield from self.replay_shard(os.path.join(shard_dir, '{}.segment'.format(segment)), 0, exc_handler)
+            ln, offset, self.num_ref_blocks = checkpoint
+            segment += 1
+        if segment:
+            self.logger.info('resuming conversion at line {} from {} checkpoints'.format(ln + 1, segment))
+        reader.seek(offset)
+        at_end = False
+        while not at_end:
+            segment_path = os.path.join(shard_dir, '{}.segment'.format(segment))
+            with open(segment_path + '.part', 'wb') as shard:
+                for _ in range(self.checkpoint_lines):
+                    raw = reader.readline()
+                    if not raw:
+                        at_end = True
+                        break
+                    ln += 1
+                    l = self.decode_line(raw, encoding)
+                    wdicts, state = self.convert_to_shard(shard, ln, l)
+                    if isinstance(state, Exception):
+                        if exc_handler:
+                            exc_handler(ln, l, state)
+                            continue
+                        else:
+                            raise state
+                    yield ln, l, wdicts
+                pickle.dump((ln, reader.tell(), self.num_ref_blocks), shard)
+            os.replace(segment_path + '.part', segment_path)
+            segment += 1
+        reader.close()
+        shutil.rmtree(shard_dir)
+
+    @staticmethod
+    def decode_line(raw, encoding):
+        # The same line text mode reading gives
+        l = raw.decode(encoding)
+        if l.endswith('\r\n'):
+            l = l[:-2] + '\n'
+        return l
+
+    def convert_to_shard(self, shard, shard_ln, l):
+        try:
+            wdicts = self.convert_line(l)
+            state = None
+            if wdicts is not self.IGNORE:
+                # Calls are not picklable and not needed after conversion
+                self.curvar.samples = []
+                state = (self.curvar, self.gt_occur, self.cur_csq)
+        except Exception as e:
+            wdicts = None
+            state = e
+        pickle.dump((shard_ln, l, wdicts, state), shard)
+        return wdicts, state
+
+    def replay_shard(self, path, ln, exc_handler):
+        # Yields the converted lines of a shard, numbered on from ln, and
+        # returns the shard's last line number and what was saved after
+        # its lines
+        shard_ln = 0
+        trailer = None
+        with open(path, 'rb') as shard:
+            while True:
+                try:
+                    record = pickle.load(shard)
+                except EOFError:
+                    break
+                if len(record) != 4:
+                    trailer = record
+                    continue
+                shard_ln, l, wdicts, state = record
+                if isinstance(state, Exception):
+                    if exc_handler:
+                        exc_handler(ln + shard_ln, l, state)
+                        continue
+                    else:
+                        raise state
+                if wdicts == self.IGNORE:
+                    # cravat-convert tests for the IGNORE object itself
+                    wdicts = self.IGNORE
+                if state is not None:
+                    self.curvar, self.gt_occur, self.cur_csq = state
+                yield ln + shard_ln, l, wdicts
+        return shard_ln, trailer
+
+    def open_shard_dir(self, path, unit):
+        # Shards of an earlier run are reused only if they were made from
+        # the same input file with the same options. Left alignment also
+        # depends on the reference of the input assembly.
+        shard_dir = os.path.join(self.output_dir, '{}.{}.shards'.format(self.run_name, os.path.basename(path)))
+        stat = os.stat(path)
+        manifest = {
+            'input': os.path.realpath(path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'include_info': sorted(self.include_info),
+            'left_align': self.left_align,
+            'left_align_window': self.left_align_window if self.left_align else None,
+            'input_assembly': self.input_assembly if self.left_align else None,
+            'unit': unit,
+            'checkpoint_lines': self.checkpoint_lines,
+        }
+        manifest_path = os.path.join(shard_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as mf:
+                if json.load(mf) == manifest:
+                    return shard_dir
+        if os.path.exists(shard_dir):
+            shutil.rmtree(shard_dir)
+        os.makedirs(shard_dir)
+        with open(manifest_path, 'w') as mf:
+            json.dump(manifest, mf)
+        return shard_dir
+
+    def convert_bcf(self, exc_handler):
+        ln = 0
+        for record in self._bcf_reader:
+            ln += 1
+            l = '\t'.join([record.chrom, str(record.pos), record.id, record.alleles[0], ','.join(record.alleles[1:]) or '.']) + '\n'
+            try:
+                yield ln, l, self.convert_bcf_record(record)
+            except Exception as e:
+                if exc_handler:
+                    exc_handler(ln, l, e)
+                    continue
+                else:
+                    raise e
+
+    def convert_bcf_record(self, record):
+        alts = record.alleles[1:]
+        if len(alts) == 1 and alts[0] in ('<NON_REF>', '<*>'):
+            self.num_ref_blocks += 1
+            return self.IGNORE
+        if alts:
+            alt = [self._reader._parse_alt(x) for x in alts]
+        else:
+            alt = [None]
+        if record.filters is None:
+            filt = None
+        else:
+            filt = [x for x in record.filters if x != 'PASS']
+        info = {}
+        for key, vals in record.info:
+            if self.info_keys is not None and key not in self.info_keys:
+                continue
+            info[key] = self.bcf_info_val(key, vals)
+        fmt_names = [x[0] for x in record.formats]
+        variant = _Record(
+            record.chrom,
+            record.pos,
+            None if record.id == '.' else record.id,
+            record.alleles[0],
+            alt,
+            record.qual,
+            filt,
+            info,
+            ':'.join(fmt_names) if fmt_names else None,
+            self._reader._sample_indexes,
+        )
+        has_samples = record.n_sample > 0 and len(fmt_names) > 0
+        variant.samples = []
+        if has_samples:
+            variant.samples = self.bcf_carrier_calls(variant, record)
+        return self.convert_variant(variant, has_samples)
+
+    def bcf_info_val(self, key, vals):
+        # Same values pyvcf makes from the text INFO field
+        info_desc = self._reader.infos.get(key)
+        if info_desc is None:
+            return vals
+        if info_desc.type == 'Flag':
+            return True
+        if isinstance(vals, str):
+            vals = vals.split(',')
+        if info_desc.num == 1:
+            return vals[0] if vals else None
+        return vals
+
+    def bcf_carrier_calls(self, variant, record):
+        fmt = variant.FORMAT
+        if fmt not in self._reader._format_cache:
+            self._reader._format_cache[fmt] = self._reader._parse_sample_format(fmt)
+        samp_fmt = self._reader._format_cache[fmt]
+        # Without GT, every sample is parsed, as the text path does
+        gts = dict(record.formats).get('GT')
+        if gts is None:
+            carriers = range(record.n_sample)
+        else:
+            carriers = gts.alt_samples(record.n_sample)
+        calls = []
+        for i in carriers:
+            sampdat = []
+            for (name, vals), num, typ in zip(record.formats, samp_fmt._nums, samp_fmt._types):
+                val = vals[i]
+                if name == 'GT':
+                    val = self.bcf_gt_str(val)
+                elif name == 'FT':
+                    val = self._reader._parse_filter(val) if val else None
+                elif isinstance(val, str):
+                    if val == '' or val == '.':
+                        val = None
+                    elif num != 1:
+                        val = val.split(',')
+                elif len(val) == 0 or val == [None]:
+                    val = None
+                elif num == 1:
+                    val = val[0]
+                sampdat.append(val)
+            calls.append(_Call(variant, self._reader.samples[i], samp_fmt(*sampdat)))
+        return calls
+
+    @staticmethod
+    def bcf_gt_str(gt):
+        gt_str = ''
+        for i, x in enumerate(gt):
+            if i > 0:
+                gt_str += '|' if x is not None and x & 1 else '/'
+            if x is None or x >> 1 == 0:
+                gt_str += '.'
+            else:
+                gt_str += str((x >> 1) - 1)
+        return gt_str
+
+    def get_index_contigs(self, f):
+        # Contig names from the tabix index of a bgzipped input, or None if
+        # the input can not be converted in parallel.
+        if self.workers <= 1 or not f.name.endswith('.gz'):
+            return None
+        index_path = f.name + '.tbi'
+        if not os.path.exists(index_path):
+            return None
+        try:
+            import tabix
+        except ImportError:
+            return None
+        with gzip.open(index_path, 'rb') as index:
+            header = index.read(36)
+            if header[:4] != b'TBI\1':
+                return None
+            l_nm = struct.unpack('<8i', header[4:])[-1]
+            names = index.read(l_nm)
+        return [name.decode() for name in names.split(b'\0') if name]
+
+    def convert_shard(self, path, contig, shard_path):
+        import tabix
+        tb = tabix.open(path)
+        self.num_ref_blocks = 0
+        # A shard only exists under its final name once it is complete
+        part_path = shard_path + '.part'
+        with open(part_path, 'wb') as shard:
+            for shard_ln, row in enumerate(tb.querys(contig), start=1):
+                self.convert_to_shard(shard, shard_ln, '\t'.join(row) + '\n')
+            pickle.dump((self.num_ref_blocks,), shard)
+        os.replace(part_path, shard_path)
+
+    def project_info(self, info):
+        kept = [x for x in info.split(';') if x.split('=',1)[0] in self.info_keys]
+        if kept:
+            return ';'.join(kept)
+        else:
+            return '.'
+
+    @staticmethod
+    def is_ref_block(toks):
+        # gVCF reference blocks have only the symbolic non-reference allele
+        # as ALT, and usually an END INFO key.
+        return len(toks) > 4 and toks[4] in ('<NON_REF>', '<*>')
+
+    def find_carriers(self, toks):
+        # Scan the GT prefix of each raw sample column for a non-reference
+        # allele. Returns None if the line can not be scanned this way.
+        if len(toks) <= 9 or toks[8].split(':',1)[0] != 'GT':
+            return None
+        carriers = []
+        for sample, col in zip(self._reader.samples, toks[9:]):
+            # Anything left after stripping 0, ., / and | is an alt allele
+            if col.split(':',1)[0].strip('0./|'):
+                carriers.append((sample, col))
+        return carriers
+
+    def parse_carrier_calls(self, variant, fmt, carriers):
+        calls = self._reader._parse_samples([c[1] for c in carriers], fmt, variant)
+        # pyvcf names calls by header position, which is lost for a subset
+        for call, (sample, _) in zip(calls, carriers):
+            call.sample = sample
+        return calls
+
     @staticmethod
     def extract_read_info(call, gt):
         tot_reads = None
@@ -255,7 +746,7 @@ class CravatConverter(BaseConverter):
     def csq_format(l):
         # Format a list of CSQ values into it's representation in OC
         # Each value comes from a VEP transcript mapping
-        if all([x=='' for x in l]):
+        if not any(l):
             return None
         else:
             return ';'.join(l)
@@ -265,20 +756,56 @@ class CravatConverter(BaseConverter):
             return pos, ref, alt
         if len(ref) == 1 and len(alt) == 1:
             return pos, ref, alt
-        ref = list(ref)
-        alt = list(alt)
+        # Shared prefix first, then shared suffix of what is left
+        max_trim = min(len(ref), len(alt))
         adj = 0
-        while ref and alt and ref[0]==alt[0]:
+        while adj < max_trim and ref[adj]==alt[adj]:
             adj += 1
-            ref.pop(0)
-            alt.pop(0)
-        while ref and alt and ref[-1]==alt[-1]:
-            ref.pop()
-            alt.pop()
-        ref = ''.join(ref) if ref else '-'
-        alt = ''.join(alt) if alt else '-'
+        max_trim -= adj
+        end_adj = 0
+        while end_adj < max_trim and ref[-1-end_adj]==alt[-1-end_adj]:
+            end_adj += 1
+        ref = ref[adj:len(ref)-end_adj] or '-'
+        alt = alt[adj:len(alt)-end_adj] or '-'
         return pos+adj, ref, alt
 
+    def left_align_variant(self, chrom, pos, ref, alt):
+        # Shifts a trimmed insertion or deletion left while the reference
+        # base before it is the same as its last base.
+        if ref == '-' and alt != '-':
+            seq = alt
+        elif alt == '-' and ref != '-':
+            seq = ref
+        else:
+            return pos, ref, alt
+        if not chrom.startswith('chr'):
+            chrom = 'chrM' if chrom == 'MT' else 'chr'+chrom
+        shift = 0
+        try:
+            while shift < self.left_align_window and pos > 1:
+                base = self.get_ref_base(chrom, pos - 1)
+                if base != seq[-1].upper():
+                    break
+                seq = base + seq[:-1]
+                pos -= 1
+                shift += 1
+        except (KeyError, IndexError):
+            pass
+        if ref == '-':
+            return pos, ref, seq
+        else:
+            return pos, seq, alt
+
+    def get_ref_base(self, chrom, pos):
+        # Served from a buffered window of reference around recent positions
+        offset = pos - self.ref_start
+        if chrom != self.ref_chrom or offset < 0 or offset >= len(self.ref_chunk):
+            self.ref_start = max(1, pos - self.left_align_window)
+            self.ref_chunk = self.wgs.slice(chrom, self.ref_start, pos + self.left_align_window).upper()
+            self.ref_chrom = chrom
+            offset = pos - self.ref_start
+        return self.ref_chunk[offset]
+
     @staticmethod
     def oc_info_val(info_type, val, force_str=False):
         if val is None or val=='.':
@@ -335,3 +862,255 @@ class CravatConverter(BaseConverter):
             else:
                 row_data.update(self.cur_csq.get(alt,{}))
         self.ex_info_writer.write_data(row_data)
+
+
+class BgzfReader(object):
+    # Line reader over a BGZF (bgzip) file. tell and seek use BGZF virtual
+    # offsets: the file offset of a block << 16 | the offset in the block.
+
+    def __init__(self, path):
+        self.f = open(path, 'rb')
+        self.load_block(0)
+
+    @staticmethod
+    def is_bgzf(path):
+        with open(path, 'rb') as f:
+            header = f.read(16)
+        return header[:4] == b'\x1f\x8b\x08\x04' and header[12:14] == b'BC'
+
+    def load_block(self, block_offset):
+        self.block_offset = block_offset
+        self.next_offset = block_offset
+        self.data = b''
+        self.pos = 0
+        self.f.seek(block_offset)
+        header = self.f.read(12)
+        if len(header) < 12:
+            return
+        xlen = struct.unpack_from('<H', header, 10)[0]
+        extra = self.f.read(xlen)
+        bsize = None
+        i = 0
+        while i + 4 <= xlen:
+            slen = struct.unpack_from('<H', extra, i + 2)[0]
+            if extra[i:i+2] == b'BC':
+                bsize = struct.unpack_from('<H', extra, i + 4)[0]
+            i += 4 + slen
+        if bsize is None:
+            raise BadFormatError('Not a BGZF block at offset {}'.format(block_offset))
+        self.data = zlib.decompress(self.f.read(bsize - xlen - 19), -15)
+        self.next_offset = block_offset + bsize + 1
+
+    def readline(self):
+        parts = []
+        while True:
+            if self.pos >= len(self.data):
+                if self.next_offset == self.block_offset:
+                    break
+                self.load_block(self.next_offset)
+                continue
+            end = self.data.find(b'\n', self.pos)
+            if end >= 0:
+                parts.append(self.data[self.pos:end + 1])
+                self.pos = end + 1
+                break
+            parts.append(self.data[self.pos:])
+            self.pos = len(self.data)
+        return b''.join(parts)
+
+    def tell(self):
+        # The end of a block is given as the start of the next one, which
+        # always fits in the 16 bits of the in-block offset
+        if self.pos >= len(self.data) and self.next_offset != self.block_offset:
+            self.load_block(self.next_offset)
+        return self.block_offset << 16 | self.pos
+
+    def seek(self, offset):
+        self.load_block(offset >> 16)
+        self.pos = offset & 0xffff
+
+    def close(self):
+        self.f.close()
+
+# struct code, size, missing value and end-of-vector value of BCF types
+BCF_TYPES = {
+    1: ('b', 1, -128, -127),
+    2: ('h', 2, -32768, -32767),
+    3: ('i', 4, -2147483648, -2147483647),
+    5: ('f', 4, 0x7F800001, 0x7F800002),
+}
+
+BCF_ALT_GT = re.compile(b'[\x04-\x7f]')
+
+BcfRecord = namedtuple('BcfRecord', ['chrom', 'pos', 'id', 'alleles', 'qual', 'filters', 'info', 'formats', 'n_sample'])
+
+class BcfReader(object):
+    # Reads the records of a BCF (version 2) file. Typed values are decoded
+    # to lists of python values, with None for missing values. FORMAT values
+    # are decoded per sample, only when asked for.
+
+    def __init__(self, path):
+        # BCF is usually BGZF compressed, but may also be written plain
+        with open(path, 'rb') as f:
+            compressed = f.read(2) == b'\x1f\x8b'
+        self.f = gzip.open(path, 'rb') if compressed else open(path, 'rb')
+        magic = self.f.read(5)
+        if magic[:3] != b'BCF':
+            raise BadFormatError('Not a BCF file')
+        l_text = struct.unpack('<I', self.f.read(4))[0]
+        self.header = self.f.read(l_text).rstrip(b'\0').decode()
+        self.read_dictionaries()
+
+    def read_dictionaries(self):
+        # FILTER, INFO and FORMAT IDs share one dictionary, with PASS first.
+        # Header lines with IDX set the index explicitly.
+        self.strings = {0: 'PASS'}
+        self.contigs = {}
+        string_names = {'PASS'}
+        contig_names = set()
+        for line in self.header.splitlines():
+            if line.startswith('##contig=<'):
+                d, names = self.contigs, contig_names
+            elif line.startswith(('##FILTER=<', '##INFO=<', '##FORMAT=<')):
+                d, names = self.strings, string_names
+            else:
+                continue
+            match = re.search(r'[<,]ID=([^,>]+)', line)
+            if match is None:
+                continue
+            name = match.group(1)
+            match = re.search(r'[<,]IDX=(\d+)', line)
+            if match:
+                d[int(match.group(1))] = name
+            elif name not in names:
+                d[len(d)] = name
+            names.add(name)
+
+    def __iter__(self):
+        while True:
+            record = self.read_record()
+            if record is None:
+                break
+            yield record
+
+    def read_record(self):
+        head = self.f.read(8)
+        if len(head) < 8:
+            return None
+        l_shared, l_indiv = struct.unpack('<II', head)
+        shared = self.f.read(l_shared)
+        indiv = self.f.read(l_indiv)
+        chrom, pos = struct.unpack_from('<ii', shared, 0)
+        qual = self.read_values(shared, 12, 5, 1)[0]
+        qual = qual[0] if qual else None
+        if qual is not None and qual.is_integer():
+            qual = int(qual)
+        n_allele_info, n_fmt_sample = struct.unpack_from('<II', shared, 16)
+        off = 24
+        rec_id, off = self.read_typed(shared, off)
+        alleles = []
+        for _ in range(n_allele_info >> 16):
+            allele, off = self.read_typed(shared, off)
+            alleles.append(allele)
+        filters, off = self.read_typed(shared, off)
+        if filters:
+            filters = [self.strings[x] for x in filters]
+        else:
+            filters = None
+        info = []
+        for _ in range(n_allele_info & 0xffff):
+            key, off = self.read_typed(shared, off)
+            vals, off = self.read_typed(shared, off)
+            info.append((self.strings[key[0]], vals))
+        n_sample = n_fmt_sample & 0xffffff
+        formats = []
+        off = 0
+        for _ in range(n_fmt_sample >> 24):
+            key, off = self.read_typed(indiv, off)
+            typ, n, off = self.read_type(indiv, off)
+            formats.append((self.strings[key[0]], BcfFormatField(self, indiv, off, typ, n)))
+            if typ == 7:
+                off += n_sample * n
+            elif typ in BCF_TYPES:
+                off += n_sample * n * BCF_TYPES[typ][1]
+        return BcfRecord(self.contigs[chrom], pos + 1, rec_id or '.', alleles, qual, filters, info, formats, n_sample)
+
+    def read_type(self, buf, off):
+        desc = buf[off]
+        off += 1
+        n = desc >> 4
+        if n == 15:
+            vals, off = self.read_typed(buf, off)
+            n = vals[0]
+        return desc & 0xf, n, off
+
+    def read_typed(self, buf, off):
+        typ, n, off = self.read_type(buf, off)
+        return self.read_values(buf, off, typ, n)
+
+    def read_values(self, buf, off, typ, n):
+        if typ == 7:
+            return buf[off:off+n].rstrip(b'\0').decode(), off + n
+        if n == 0 or typ not in BCF_TYPES:
+            return [], off
+        code, size, missing, eov = BCF_TYPES[typ]
+        raw = struct.unpack_from('<{}{}'.format(n, code), buf, off)
+        if typ == 5:
+            # Float sentinels are NaN bit patterns
+            bits = struct.unpack_from('<{}I'.format(n), buf, off)
+        else:
+            bits = raw
+        vals = []
+        for val, val_bits in zip(raw, bits):
+            if val_bits == eov:
+                break
+            elif val_bits == missing:
+                vals.append(None)
+            elif typ == 5:
+                vals.append(self.short_float(val))
+            else:
+                vals.append(val)
+        return vals, off + n * size
+
+    @staticmethod
+    def short_float(val):
+        # Shortest decimal that is the same float32, as written in text VCF
+        packed = struct.pack('<f', val)
+        for precision in range(6, 10):
+            short = float('{:.{}g}'.format(val, precision))
+            if struct.pack('<f', short) == packed:
+                return short
+        return val
+
+class BcfFormatField(object):
+    # Values of one FORMAT key for all samples of a record
+
+    def __init__(self, reader, buf, off, typ, n):
+        self.reader = reader
+        self.buf = buf
+        self.off = off
+        self.typ = typ
+        self.n = n
+        if typ == 7:
+            self.size = n
+        elif typ in BCF_TYPES:
+            self.size = n * BCF_TYPES[typ][1]
+        else:
+            self.size = 0
+
+    def __getitem__(self, i):
+        return self.reader.read_values(self.buf, self.off + i * self.size, self.typ, self.n)[0]
+
+    def alt_samples(self, n_sample):
+        # Indexes of the samples with an alt allele in a GT field. Binary GT
+        # values are (allele+1)<<1|phased, so 4 and up is an alt allele. The
+        # int8 values of nearly every GT field are scanned as raw bytes, in
+        # which the missing and end-of-vector values are 0x80 and 0x81.
+        if self.size == 0:
+            return []
+        if self.typ == 1:
+            raw = self.buf[self.off:self.off + n_sample * self.size]
+            return list(dict.fromkeys([m.start() // self.size for m in BCF_ALT_GT.finditer(raw)]))
+        code = BCF_TYPES[self.typ][0]
+        vals = struct.unpack_from('<{}{}'.format(n_sample * self.n, code), self.buf, self.off)
+        return [i for i in range(n_sample) if any([x >> 1 > 1 for x in vals[i * self.n:(i + 1) * self.n]])]